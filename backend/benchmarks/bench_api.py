@@ -0,0 +1,413 @@
+"""
+End-to-end API benchmark on synthetic Melbourne data.
+
+Seeds the database with realistic volumes (synthetic.py; by default 10k
+incidents, 50k street notes, 100k chat messages and 5k peers) and then drives
+every public and admin endpoint in turn. Each endpoint gets --concurrency
+concurrent async clients (httpx over ASGI, in this process: the full
+middleware stack and handlers, no sockets). For each endpoint it reports
+throughput, p50/p95/p99 latency and peak RSS.
+
+Storage is the in-memory backend by default, which needs no network and
+isolates the app's own cost. `--storage mongo` runs against MONGO_URL
+(database community_map_bench, emptied first) to include the database.
+
+    cd backend && python benchmarks/bench_api.py --out baseline.json
+    python benchmarks/bench_api.py --incidents 100000 --compare baseline.json
+
+--out writes the results, with the commit and settings, as JSON. --compare
+prints the change against such a file. The exit status is 1 when any endpoint's
+p95 or throughput is more than --threshold worse. Requests come from a pool of
+synthetic client IPs (X-Forwarded-For), so per-IP rate limits apply as they
+would in production rather than throttling the benchmark.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import re
+import resource
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import synthetic  # noqa: E402
+
+ADMIN_ACCOUNT = "bench-admin"
+ADMIN_PIN = "246810"
+METRICS_TOKEN = "bench-metrics-token"
+N_CLIENT_IPS = 50_000
+
+
+def _configure(storage: str) -> None:
+    """Environment for server.py; it reads its config at import time."""
+    os.environ["STORAGE_BACKEND"] = storage
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ["DB_NAME"] = "community_map_bench"
+    os.environ["ENVIRONMENT"] = "development"
+    os.environ["RATE_LIMIT_BACKEND"] = "memory"
+    os.environ["TRUSTED_PROXY_HOPS"] = "1"
+    os.environ["ADMIN_ACCOUNT"] = ADMIN_ACCOUNT
+    os.environ["ADMIN_PIN"] = ADMIN_PIN
+    os.environ["ADMIN_JWT_SECRET"] = "bench-secret-" + "x" * 32
+    os.environ["METRICS_TOKEN"] = METRICS_TOKEN
+    os.environ["TURNSTILE_SECRET"] = ""
+    # Signing is a local HMAC; these never reach Cloudinary.
+    os.environ["CLOUDINARY_CLOUD_NAME"] = "bench"
+    os.environ["CLOUDINARY_API_KEY"] = "bench"
+    os.environ["CLOUDINARY_API_SECRET"] = "bench"
+    # Gazetteer misses fall through to Nominatim: fail fast instead.
+    os.environ["NOMINATIM_SEARCH_URL"] = "http://127.0.0.1:9/search"
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+def _rss_mb() -> float:
+    """Current RSS; peak RSS where /proc is unavailable (macOS)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ── endpoints ────────────────────────────────────────────────────────────────
+class Context:
+    """Seeded ids and helpers shared by the request builders."""
+
+    def __init__(self, ids: Dict[str, List[str]], rng: random.Random):
+        self.ids = ids
+        self.rng = rng
+        self.admin_headers: Dict[str, str] = {}
+        self.note_id = ""
+        self.profile_id = ""
+
+    def pick(self, collection: str) -> str:
+        return self.rng.choice(self.ids[collection])
+
+    def take(self, collection: str) -> str:
+        """An id nothing else will use again (for deletes and one-shot actions)."""
+        pool = self.ids[collection]
+        return pool.pop() if len(pool) > 1 else str(uuid.uuid4())
+
+
+@dataclass
+class Endpoint:
+    name: str
+    method: str
+    path: Callable[[Context], str]
+    body: Optional[Callable[[Context], dict]] = None
+    admin: bool = False
+    headers: Optional[Dict[str, str]] = None
+
+
+def _point(ctx):
+    return synthetic.point(ctx.rng)
+
+
+def _query(params: dict) -> str:
+    return "&".join(f"{k}={v}" for k, v in params.items())
+
+
+def _incident_body(ctx):
+    lat, lng = _point(ctx)
+    return {"category": ctx.rng.choice(synthetic.CATEGORIES), "urgency": "medium",
+            "description": synthetic.sentence(ctx.rng), "latitude": lat, "longitude": lng}
+
+
+def _note_body(ctx):
+    lat, lng = _point(ctx)
+    return {"text": synthetic.sentence(ctx.rng, 3, 10)[:150], "latitude": lat, "longitude": lng,
+            "location_text": ctx.rng.choice(synthetic.PLACES), "duration_hours": 12,
+            "owner_id": f"user-{ctx.rng.randrange(20_000)}"}
+
+
+def _highlight_body(ctx):
+    lat, lng = _point(ctx)
+    return {"start_lat": lat, "start_lng": lng, "end_lat": lat + 0.002, "end_lng": lng + 0.002,
+            "color": "red", "reason": "poor_lighting", "description": "dark lane"}
+
+
+def _resolve_path(ctx):
+    ctx.note_id = ctx.pick("street_notes")
+    return f"/api/street-notes/{ctx.note_id}/resolve"
+
+
+def _resolve_body(ctx):
+    return {"owner_id": synthetic.owner_of(ctx.note_id), "resolved": True}
+
+
+def _peer_body(ctx):
+    lat, lng = _point(ctx)
+    return {"id": f"peer-{ctx.rng.randrange(10_000)}", "emoji": "🚲", "title": "Walker",
+            "lat": lat, "lng": lng, "ts": time.time() * 1000}
+
+
+ENDPOINTS = [
+    # Public reads
+    Endpoint("GET /api/", "GET", lambda c: "/api/"),
+    Endpoint("GET /api/incidents", "GET", lambda c: "/api/incidents"),
+    Endpoint("GET /api/incidents?bbox", "GET",
+             lambda c: "/api/incidents?" + _query(synthetic.viewport(c.rng))),
+    Endpoint("GET /api/street-notes", "GET", lambda c: "/api/street-notes"),
+    Endpoint("GET /api/street-notes?bbox", "GET",
+             lambda c: "/api/street-notes?" + _query(synthetic.viewport(c.rng))),
+    Endpoint("GET /api/street-highlights", "GET", lambda c: "/api/street-highlights"),
+    Endpoint("GET /api/peers", "GET", lambda c: "/api/peers"),
+    Endpoint("GET /api/chat/messages", "GET", lambda c: "/api/chat/messages"),
+    Endpoint("GET /api/live-updates", "GET", lambda c: "/api/live-updates"),
+    Endpoint("GET /api/welcome-notice", "GET", lambda c: "/api/welcome-notice"),
+    Endpoint("GET /api/search", "GET", lambda c: f"/api/search?q={c.rng.choice(synthetic.WORDS)}"),
+    Endpoint("GET /api/geocode/suggest", "GET",
+             lambda c: f"/api/geocode/suggest?q={c.rng.choice(synthetic.PLACES)[:4]}"),
+    Endpoint("POST /api/geocode", "POST", lambda c: "/api/geocode",
+             lambda c: {"address": c.rng.choice(synthetic.PLACES)}),
+    Endpoint("GET /api/reverse-geocode", "GET",
+             lambda c: "/api/reverse-geocode?" + _query(dict(zip(("lat", "lng"), _point(c))))),
+    # Public writes
+    Endpoint("POST /api/incidents", "POST", lambda c: "/api/incidents", _incident_body),
+    Endpoint("POST /api/incidents/{id}/react", "POST",
+             lambda c: f"/api/incidents/{c.pick('incidents')}/react", lambda c: {"reaction": "like"}),
+    Endpoint("POST /api/street-notes", "POST", lambda c: "/api/street-notes", _note_body),
+    Endpoint("POST /api/street-notes/{id}/resolve", "POST", _resolve_path, _resolve_body),
+    Endpoint("POST /api/chat/messages", "POST", lambda c: "/api/chat/messages",
+             lambda c: {"message": synthetic.sentence(c.rng, 2, 12), "author": "Bench"}),
+    Endpoint("POST /api/users/heartbeat/{id}", "POST",
+             lambda c: f"/api/users/heartbeat/session-{c.rng.randrange(10_000)}"),
+    Endpoint("POST /api/peers", "POST", lambda c: "/api/peers", _peer_body),
+    Endpoint("DELETE /api/peers/{id}", "DELETE", lambda c: f"/api/peers/{c.take('peers')}"),
+    Endpoint("POST /api/identity/token", "POST", lambda c: "/api/identity/token",
+             lambda c: {"id": f"user-{c.rng.randrange(20_000)}"}),
+    Endpoint("POST /api/reports", "POST", lambda c: "/api/reports",
+             lambda c: {"target_type": "incident", "target_id": c.pick("incidents"), "reason": "spam"}),
+    Endpoint("POST /api/uploads/sign", "POST", lambda c: "/api/uploads/sign"),
+    # Admin
+    Endpoint("POST /api/admin/verify", "POST", lambda c: "/api/admin/verify",
+             lambda c: {"account": ADMIN_ACCOUNT, "pin": ADMIN_PIN}),
+    Endpoint("GET /api/admin/incidents", "GET", lambda c: "/api/admin/incidents", admin=True),
+    Endpoint("GET /api/admin/reports", "GET", lambda c: "/api/admin/reports", admin=True),
+    Endpoint("GET /api/admin/reports?group=false", "GET",
+             lambda c: "/api/admin/reports?group=false", admin=True),
+    Endpoint("GET /api/admin/geocode/stats", "GET", lambda c: "/api/admin/geocode/stats", admin=True),
+    Endpoint("GET /api/admin/migrations", "GET", lambda c: "/api/admin/migrations", admin=True),
+    Endpoint("GET /api/admin/profiles", "GET", lambda c: "/api/admin/profiles", admin=True),
+    Endpoint("GET /api/admin/profiles/{id}", "GET",
+             lambda c: f"/api/admin/profiles/{c.profile_id}", admin=True),
+    Endpoint("PUT /api/admin/incidents/{id}", "PUT",
+             lambda c: f"/api/admin/incidents/{c.pick('incidents')}",
+             lambda c: {"description": synthetic.sentence(c.rng)}, admin=True),
+    Endpoint("DELETE /api/admin/incidents/{id}", "DELETE",
+             lambda c: f"/api/admin/incidents/{c.take('incidents')}", admin=True),
+    Endpoint("POST /api/admin/chat/messages/{id}/pin", "POST",
+             lambda c: f"/api/admin/chat/messages/{c.pick('chat_messages')}/pin",
+             lambda c: {"pinned": True}, admin=True),
+    Endpoint("POST /api/admin/live-updates", "POST", lambda c: "/api/admin/live-updates",
+             lambda c: {"content": synthetic.sentence(c.rng, 10, 40)}, admin=True),
+    Endpoint("POST /api/admin/welcome-notice", "POST", lambda c: "/api/admin/welcome-notice",
+             lambda c: {"content": synthetic.sentence(c.rng, 10, 40), "enabled": True}, admin=True),
+    Endpoint("POST /api/admin/street-highlights", "POST", lambda c: "/api/admin/street-highlights",
+             _highlight_body, admin=True),
+    Endpoint("PUT /api/admin/street-highlights/{id}", "PUT",
+             lambda c: f"/api/admin/street-highlights/{c.pick('street_highlights')}",
+             lambda c: {"color": "yellow"}, admin=True),
+    Endpoint("DELETE /api/admin/street-highlights/{id}", "DELETE",
+             lambda c: f"/api/admin/street-highlights/{c.take('street_highlights')}", admin=True),
+    Endpoint("DELETE /api/admin/street-notes/{id}", "DELETE",
+             lambda c: f"/api/admin/street-notes/{c.take('street_notes')}", admin=True),
+    Endpoint("POST /api/admin/reports/{id}/action", "POST",
+             lambda c: f"/api/admin/reports/{c.take('content_reports')}/action",
+             lambda c: {"action": "dismiss"}, admin=True),
+    Endpoint("POST /api/admin/bulk (dry run)", "POST", lambda c: "/api/admin/bulk",
+             lambda c: {"target_type": "incident", "action": "hide", "dry_run": True,
+                        "filter": {"category": c.rng.choice(synthetic.CATEGORIES),
+                                   **synthetic.viewport(c.rng, km=5)}}, admin=True),
+    Endpoint("GET /metrics", "GET", lambda c: "/metrics",
+             headers={"Authorization": f"Bearer {METRICS_TOKEN}"}),
+]
+
+
+# ── driver ───────────────────────────────────────────────────────────────────
+async def _drive(http, ctx: Context, endpoint: Endpoint, n_requests: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    remaining = n_requests
+    peak_rss = _rss_mb()
+    sampling = True
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while sampling:
+            peak_rss = max(peak_rss, _rss_mb())
+            await asyncio.sleep(0.01)
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            headers = {"X-Forwarded-For": f"10.{ctx.rng.randrange(N_CLIENT_IPS) >> 8 & 255}."
+                                          f"{ctx.rng.randrange(256)}.{ctx.rng.randrange(1, 255)}"}
+            if endpoint.admin:
+                headers.update(ctx.admin_headers)
+            headers.update(endpoint.headers or {})
+            path = endpoint.path(ctx)
+            body = endpoint.body(ctx) if endpoint.body else None
+            start = time.perf_counter()
+            res = await http.request(endpoint.method, path, json=body, headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            key = str(res.status_code)
+            statuses[key] = statuses.get(key, 0) + 1
+
+    sampler = asyncio.create_task(sample_rss())
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    sampling = False
+    await sampler
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": sum(n for code, n in statuses.items() if not code.startswith("2")),
+        "status": statuses,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 50), 2),
+        "p95_ms": round(_percentile(latencies, 95), 2),
+        "p99_ms": round(_percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+        "peak_rss_mb": round(peak_rss, 1),
+    }
+
+
+async def run(args) -> dict:
+    import httpx
+    import server
+
+    # Per-request log lines (httpx's, and the app's 4xx and SLOW ones) would swamp the table.
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("server").setLevel(logging.ERROR)
+
+    if args.storage == "mongo":
+        # Only ever empty the dedicated benchmark database.
+        assert server.db.name.endswith("_bench")
+        for name in await server.db.list_collection_names():
+            await server.db[name].delete_many({})
+
+    counts = {"incidents": args.incidents, "street_notes": args.notes,
+              "chat_messages": args.chat, "peers": args.peers, "active_users": args.peers}
+    start = time.perf_counter()
+    ids = await synthetic.seed(server.db, counts)
+    print(f"seeded {sum(len(v) for v in ids.values()):,} documents in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    await server.app.router.startup()
+    print(f"startup (indexes, search index) in {time.perf_counter() - start:.1f}s")
+
+    ctx = Context(ids, random.Random(11))
+    pattern = re.compile(args.only) if args.only else None
+    results: Dict[str, dict] = {}
+    transport = httpx.ASGITransport(app=server.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            res = await http.post("/api/admin/verify", json={"account": ADMIN_ACCOUNT, "pin": ADMIN_PIN},
+                                  headers={"X-Forwarded-For": "10.255.255.1"})
+            ctx.admin_headers = {"Authorization": f"Bearer {res.json()['token']}"}
+            # One profiled request, so the profile download has something to serve.
+            res = await http.get("/api/", headers={**ctx.admin_headers, "X-Profile": "1",
+                                                   "X-Forwarded-For": "10.255.255.1"})
+            ctx.profile_id = res.headers["x-profile-id"]
+
+            print(f"{'endpoint':<44}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+                  f"{'errors':>8}{'RSS MB':>8}")
+            for endpoint in ENDPOINTS:
+                if pattern and not pattern.search(endpoint.name):
+                    continue
+                r = results[endpoint.name] = await _drive(http, ctx, endpoint, args.requests, args.concurrency)
+                print(f"{endpoint.name:<44}{r['rps']:>9,.0f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+                      f"{r['p99_ms']:>9.2f}{r['errors']:>8}{r['peak_rss_mb']:>8.0f}")
+    finally:
+        await server.app.router.shutdown()
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "storage": args.storage,
+            "counts": counts,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "endpoints": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> int:
+    """Print per-endpoint changes; the number of endpoints that regressed."""
+    regressions = 0
+    print(f"\nvs {baseline['meta'].get('commit') or 'baseline'} "
+          f"(regression = p95 or req/s more than {threshold:.0%} worse)")
+    print(f"{'endpoint':<44}{'req/s':>10}{'p95':>10}")
+    for name, now in current["endpoints"].items():
+        base = baseline["endpoints"].get(name)
+        if not base or not base["rps"] or not base["p95_ms"]:
+            continue
+        rps_change = now["rps"] / base["rps"] - 1
+        p95_change = now["p95_ms"] / base["p95_ms"] - 1
+        regressed = rps_change < -threshold or p95_change > threshold
+        regressions += regressed
+        print(f"{name:<44}{rps_change:>+10.1%}{p95_change:>+10.1%}{'  REGRESSED' if regressed else ''}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--storage", choices=("memory", "mongo"), default="memory")
+    parser.add_argument("--incidents", type=int, default=10_000)
+    parser.add_argument("--notes", type=int, default=50_000)
+    parser.add_argument("--chat", type=int, default=100_000)
+    parser.add_argument("--peers", type=int, default=5_000)
+    parser.add_argument("--requests", type=int, default=300, help="per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--only", help="regex: run only the endpoints whose name matches")
+    parser.add_argument("--out", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    args = parser.parse_args()
+
+    _configure(args.storage)
+    results = asyncio.run(run(args))
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2) + "\n")
+        print(f"wrote {args.out}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
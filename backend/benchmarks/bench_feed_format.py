@@ -0,0 +1,73 @@
+"""
+Payload size of the map feeds: today's JSON vs `?format=columnar` vs MessagePack.
+
+Seeds synthetic Melbourne data (synthetic.py) in the in-memory store, fetches
+each feed through the app in every format, and prints raw and gzip-compressed
+bytes plus the saving against plain JSON. MessagePack rows appear only when
+the msgpack package is installed.
+
+    cd backend && python benchmarks/bench_feed_format.py --rows 1000
+"""
+import argparse
+import asyncio
+import gzip
+import logging
+import time
+
+import bench_api
+import synthetic
+
+FEEDS = (
+    ("incidents", "/api/incidents"),
+    ("street_notes", "/api/street-notes"),
+    ("peers", "/api/peers"),
+)
+FORMATS = (
+    ("json", {}, {}),
+    ("columnar", {"format": "columnar"}, {}),
+    ("msgpack", {}, {"Accept": "application/x-msgpack"}),
+)
+
+
+async def run(rows: int) -> None:
+    import httpx
+    import server
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    counts = {name: 0 for name in synthetic.DEFAULT_COUNTS}
+    counts.update(incidents=rows, street_notes=rows, peers=min(rows, 500))
+    await synthetic.seed(server.db, counts)
+    await server.app.router.startup()
+    transport = httpx.ASGITransport(app=server.app)
+    print(f"{'feed':<14}{'format':<10}{'rows':>6}{'bytes':>10}{'gzip':>9}{'vs JSON':>9}"
+          f"{'gzip vs':>9}{'ms':>7}")
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            for feed, path in FEEDS:
+                base = None
+                for name, params, headers in FORMATS:
+                    start = time.perf_counter()
+                    res = await http.get(path, params={"limit": rows, **params}, headers=headers)
+                    elapsed = (time.perf_counter() - start) * 1000
+                    if name == "msgpack" and res.headers["content-type"] != "application/x-msgpack":
+                        print(f"{feed:<14}{name:<10}  (msgpack not installed)")
+                        continue
+                    raw, packed = len(res.content), len(gzip.compress(res.content, 6))
+                    base = base or (raw, packed)
+                    n = len(res.json()) if name == "json" else None
+                    print(f"{feed:<14}{name:<10}{n if n is not None else '':>6}{raw:>10,}{packed:>9,}"
+                          f"{raw / base[0] - 1:>+9.0%}{packed / base[1] - 1:>+9.0%}{elapsed:>7.1f}")
+    finally:
+        await server.app.router.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000, help="incidents and notes (peers: up to 500)")
+    args = parser.parse_args()
+    bench_api._configure("memory")
+    asyncio.run(run(args.rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Microbenchmarks for the helpers on every request path, with a regression gate.
+
+Cases: calculate_distance, _public_token, _bbox_filter, _clamp_limit,
+_client_ip, the rate_limit() dependency, _cloudinary_sign, and Pydantic
+validation of IncidentCreate and StreetNoteCreate. Each case runs --repeat
+batches and reports the median nanoseconds per call.
+
+Raw timings depend on the machine. So each case batch is bracketed by a fixed
+pure-Python calibration loop, timed just before and after it, and the
+baseline stores the median ratio of case to calibration. Drift during a run
+(CPU frequency, a noisy neighbour) then moves both sides of each ratio
+together. A baseline saved on a laptop can gate a CI runner, within reason.
+
+    cd backend && python benchmarks/bench_micro.py                # run, compare
+    python benchmarks/bench_micro.py --save                       # new baseline
+    python benchmarks/bench_micro.py --only token --threshold 0.1
+
+The committed baseline is benchmarks/baselines/micro.json. Comparing exits 1
+when a case is more than --threshold (default 25%) slower than its baseline
+and stays that slow on --confirm (default 2) re-measurements of that case.
+After an intended slowdown, or a speed-up you want locked in, re-save it.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import re
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import bench_api
+
+BASELINE = Path(__file__).resolve().parent / "baselines" / "micro.json"
+
+
+@dataclass
+class Case:
+    name: str
+    # Builds the batch runner: run(n) makes n calls of the helper under test.
+    make: Callable[[], Callable[[int], None]]
+    number: int = 20_000
+
+
+def _sync(fn: Callable[[], object]) -> Callable[[int], None]:
+    def run(n: int) -> None:
+        for _ in range(n):
+            fn()
+    return run
+
+
+def _request(xff: str):
+    from starlette.requests import Request
+
+    return Request({
+        "type": "http", "method": "POST", "path": "/api/incidents", "query_string": b"",
+        "headers": [(b"x-forwarded-for", xff.encode())], "client": ("10.0.0.1", 50000),
+        "state": {},
+    })
+
+
+def _rate_limit_case() -> Callable[[int], None]:
+    import server
+
+    # Allow-everything limits over a pool of client IPs: the cost measured is
+    # the check itself, not the 429 path.
+    dependency = server.rate_limit("bench_micro", max_requests=10**9, window_seconds=60)
+    requests = [_request(f"203.0.113.{i % 250 + 1}, 10.0.{i // 250}.1") for i in range(1000)]
+    loop = asyncio.new_event_loop()
+
+    async def calls(n: int) -> None:
+        for i in range(n):
+            await dependency(requests[i % 1000])
+
+    return lambda n: loop.run_until_complete(calls(n))
+
+
+def _cases() -> List[Case]:
+    import server
+
+    incident = {"category": "theft", "urgency": "high",
+                "description": "Bike stolen from the rack outside the station, red frame",
+                "latitude": -37.8183, "longitude": 144.9671, "contact_email": "walker@example.com"}
+    note = {"text": "Free coffee at the corner stall until noon", "latitude": -37.8102,
+            "longitude": 144.9628, "location_text": "Swanston Street", "emoji": "☕",
+            "duration_hours": 12, "kind": "discovery", "owner_id": "user-1234"}
+    request = _request("198.51.100.7, 10.0.0.2")
+    upload = {"folder": "community-map", "timestamp": "1760000000", "upload_preset": ""}
+    return [
+        Case("calculate_distance", lambda: _sync(
+            lambda: server.calculate_distance(-37.8136, 144.9631, -37.8183, 144.9671)), 100_000),
+        Case("_public_token", lambda: _sync(lambda: server._public_token("user-1234-abcd")), 50_000),
+        Case("_bbox_filter", lambda: _sync(
+            lambda: server._bbox_filter(-37.83, 144.94, -37.80, 144.99)), 100_000),
+        Case("_clamp_limit", lambda: _sync(lambda: server._clamp_limit(250)), 200_000),
+        Case("_client_ip", lambda: _sync(lambda: server._client_ip(request)), 100_000),
+        Case("rate_limit dependency", _rate_limit_case, 20_000),
+        Case("_cloudinary_sign", lambda: _sync(lambda: server._cloudinary_sign(upload)), 50_000),
+        Case("IncidentCreate validation", lambda: _sync(
+            lambda: server.IncidentCreate.model_validate(incident)), 20_000),
+        Case("StreetNoteCreate validation", lambda: _sync(
+            lambda: server.StreetNoteCreate.model_validate(note)), 20_000),
+    ]
+
+
+CALIBRATION_NUMBER = 5_000
+
+
+def _calibration_loop(n: int) -> None:
+    for _ in range(n):
+        total = 0
+        for i in range(100):
+            total += i * i
+
+
+def _batch_ns(run: Callable[[int], None], number: int) -> float:
+    start = time.perf_counter_ns()
+    run(number)
+    return (time.perf_counter_ns() - start) / number
+
+
+def _time(run: Callable[[int], None], number: int, repeat: int) -> tuple:
+    """Median ns per call, median calibration ns and median ratio over `repeat` batches.
+
+    The calibration loop runs right before and after every batch, so each
+    ratio compares the two under the same machine conditions.
+    """
+    run(max(1, number // 10))  # warm caches and lazy imports
+    _calibration_loop(CALIBRATION_NUMBER // 10)
+    samples, calibrations, ratios = [], [], []
+    for _ in range(repeat):
+        before = _batch_ns(_calibration_loop, CALIBRATION_NUMBER)
+        ns = _batch_ns(run, number)
+        calibration = (before + _batch_ns(_calibration_loop, CALIBRATION_NUMBER)) / 2
+        samples.append(ns)
+        calibrations.append(calibration)
+        ratios.append(ns / calibration)
+    return statistics.median(samples), statistics.median(calibrations), statistics.median(ratios)
+
+
+def measure(only: str = None, repeat: int = 11) -> dict:
+    pattern = re.compile(only, re.IGNORECASE) if only else None
+    cases: Dict[str, dict] = {}
+    calibrations = []
+    for case in _cases():
+        if pattern and not pattern.search(case.name):
+            continue
+        ns, calibration, ratio = _time(case.make(), case.number, repeat)
+        calibrations.append(calibration)
+        cases[case.name] = {"ns": round(ns, 1), "relative": round(ratio, 5)}
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "calibration_ns": round(statistics.median(calibrations), 1) if calibrations else None,
+        },
+        "cases": cases,
+    }
+
+
+def _regressed(current: dict, baseline: dict, threshold: float) -> List[str]:
+    return [
+        name for name, result in current["cases"].items()
+        if name in baseline["cases"]
+        and result["relative"] / baseline["cases"][name]["relative"] - 1 > threshold
+    ]
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> int:
+    """Print current vs baseline (scaled to this machine); returns the regression count."""
+    scale = current["meta"]["calibration_ns"]
+    regressions = 0
+    print(f"{'case':<30}{'ns/call':>10}{'baseline':>10}{'change':>9}")
+    for name, result in current["cases"].items():
+        base = baseline["cases"].get(name)
+        if base is None:
+            print(f"{name:<30}{result['ns']:>10.1f}{'-':>10}{'new':>9}")
+            continue
+        expected = base["relative"] * scale
+        change = result["relative"] / base["relative"] - 1
+        regressed = change > threshold
+        regressions += regressed
+        print(f"{name:<30}{result['ns']:>10.1f}{expected:>10.1f}{change:>+9.1%}"
+              f"{'  REGRESSED' if regressed else ''}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--only", help="regex: run only the cases whose name matches")
+    parser.add_argument("--repeat", type=int, default=11)
+    parser.add_argument("--baseline", default=str(BASELINE))
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--confirm", type=int, default=2,
+                        help="re-measure a regressed case this many times; fail only if it stays slow")
+    args = parser.parse_args()
+
+    bench_api._configure("memory")
+    results = measure(args.only, args.repeat)
+    baseline_path = Path(args.baseline)
+    if args.save:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(results, indent=2, ensure_ascii=False) + "\n")
+        for name, result in results["cases"].items():
+            print(f"{name:<30}{result['ns']:>10.1f} ns")
+        print(f"wrote {baseline_path}")
+        return
+    if not baseline_path.exists():
+        sys.exit(f"no baseline at {baseline_path}; run with --save first")
+    baseline = json.loads(baseline_path.read_text())
+    if not compare(results, baseline, args.threshold):
+        return
+    suspects = _regressed(results, baseline, args.threshold)
+    for attempt in range(1, args.confirm + 1):
+        only = "^(?:" + "|".join(re.escape(name) for name in suspects) + ")$"
+        print(f"\nre-measuring {len(suspects)} regressed case(s), {attempt}/{args.confirm}")
+        rerun = measure(only, args.repeat)
+        compare(rerun, baseline, args.threshold)
+        suspects = _regressed(rerun, baseline, args.threshold)
+        if not suspects:
+            print("not reproduced: noise")
+            return
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Throughput benchmark for the middleware stack on `GET /api/` (the health check).
+
+Drives the app directly over ASGI (no sockets, no database) through two stacks
+that serve the same routes:
+
+  - before: CORSMiddleware + SecurityHeadersMiddleware + RequestTimingMiddleware,
+    the last two BaseHTTPMiddleware subclasses (reproduced here for comparison);
+  - after: the fused pure-ASGI EdgeMiddleware from server.py.
+
+Both include RequestGuardMiddleware, as in production. Each request carries an
+allowed Origin so the CORS path is exercised too:
+
+    cd backend && python benchmarks/bench_middleware.py --requests 20000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "community_map_bench")
+os.environ.setdefault("ENVIRONMENT", "development")
+os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
+
+from fastapi import FastAPI  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+from starlette.middleware.cors import CORSMiddleware  # noqa: E402
+
+import server  # noqa: E402
+
+ORIGIN = "http://localhost:5173"
+CORS_OPTIONS = dict(
+    allow_origins=[ORIGIN],
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_headers=["Authorization", "Content-Type", "CF-Turnstile-Token"],
+    expose_headers=["X-Response-Time-ms", "Retry-After"],
+)
+
+
+class LegacyTimingMiddleware(BaseHTTPMiddleware):
+    """The pre-fusion RequestTimingMiddleware."""
+
+    async def dispatch(self, request, call_next):
+        start = time.perf_counter()
+        response = await call_next(request)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        response.headers["X-Response-Time-ms"] = f"{elapsed_ms:.1f}"
+        is_slow = elapsed_ms >= server.SLOW_REQUEST_MS
+        if response.status_code >= 500 or is_slow:
+            level = logging.WARNING
+        elif response.status_code >= 400:
+            level = logging.INFO
+        else:
+            level = logging.DEBUG
+        server.logger.log(
+            level, "request method=%s path=%s status=%s elapsed_ms=%.1f%s",
+            request.method, request.url.path, response.status_code, elapsed_ms,
+            " SLOW" if is_slow else "",
+        )
+        return response
+
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    """The pre-fusion SecurityHeadersMiddleware."""
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        for key, value in server.SECURITY_HEADERS:
+            response.headers.setdefault(key.decode(), value.decode())
+        return response
+
+
+def _base_app():
+    app = FastAPI()
+    app.include_router(server.api_router)
+    app.add_middleware(
+        server.RequestGuardMiddleware,
+        router=app.router,
+        max_body_bytes=server.MAX_REQUEST_BODY_BYTES,
+        large_body_routes=server.LARGE_BODY_ROUTES,
+    )
+    return app
+
+
+def before_app():
+    app = _base_app()
+    app.add_middleware(CORSMiddleware, allow_credentials=True, **CORS_OPTIONS)
+    app.add_middleware(LegacySecurityHeadersMiddleware)
+    app.add_middleware(LegacyTimingMiddleware)
+    return app
+
+
+def after_app():
+    app = _base_app()
+    app.add_middleware(server.EdgeMiddleware, allow_credentials=True, **CORS_OPTIONS)
+    return app
+
+
+async def _request(app):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/api/", "raw_path": b"/api/",
+        "root_path": "", "query_string": b"", "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+        "headers": [(b"host", b"testserver"), (b"origin", ORIGIN.encode())],
+    }
+    status = None
+    body_sent = False
+
+    async def receive():
+        # Like a real server: the (empty) body once, then wait for a disconnect
+        # that never comes.
+        nonlocal body_sent
+        if body_sent:
+            await asyncio.Event().wait()
+        body_sent = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def run(name, app, n_requests, concurrency):
+    for _ in range(200):  # warm up: route compilation, first-call costs
+        assert await _request(app) == 200
+
+    per_worker = n_requests // concurrency
+
+    async def worker():
+        for _ in range(per_worker):
+            await _request(app)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    total = per_worker * concurrency
+    print(f"{name:<10}{total / elapsed:>14,.0f}{elapsed / total * 1e6:>14.1f}")
+    return total / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    async def both():
+        print(f"{'stack':<10}{'req/s':>14}{'us/req':>14}")
+        before = await run("before", before_app(), args.requests, args.concurrency)
+        after = await run("after", after_app(), args.requests, args.concurrency)
+        print(f"speedup   {after / before:>13.2f}x")
+
+    asyncio.run(both())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Memory and throughput benchmark for the rate limiter (rate_limiter.py).
+
+Replays N requests from N unique client IPs (1M by default — a bot flood where
+no key ever repeats) plus a hot-key phase, against both the GCRA limiter and
+the previous sliding-window design (a defaultdict of deques behind one
+threading.Lock, reproduced here for comparison). Memory is measured with
+tracemalloc:
+
+    cd backend && python benchmarks/bench_rate_limit.py --ips 1000000
+"""
+import argparse
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rate_limiter import GcraRateLimiter  # noqa: E402
+
+
+class SlidingWindowLimiter:
+    """The pre-GCRA limiter: one deque of timestamps per key, never pruned."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._store = defaultdict(deque)
+
+    def hit(self, key, limit, window, now):
+        with self._lock:
+            bucket = self._store[key]
+            cutoff = now - window
+            while bucket and bucket[0] < cutoff:
+                bucket.popleft()
+            if len(bucket) >= limit:
+                return window - (now - bucket[0])
+            bucket.append(now)
+            return 0.0
+
+
+def _ips(n):
+    for i in range(n):
+        yield f"{10 + (i >> 24) % 200}.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+
+
+def _flood(limiter, keys):
+    now = 0.0
+    for key in keys:
+        now += 0.0001
+        limiter.hit(key, 10, 60, now)
+    return now
+
+
+def run(name, factory, n_ips, hot_requests):
+    keys = [("create_note", ip) for ip in _ips(n_ips)]
+
+    # Memory: everything the limiter allocates, including its own table.
+    tracemalloc.start()
+    limiter = factory()
+    _flood(limiter, keys)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del limiter
+
+    # Throughput, untraced: a flood where no key repeats...
+    limiter = factory()
+    start = time.perf_counter()
+    now = _flood(limiter, keys)
+    flood_s = time.perf_counter() - start
+
+    # ...then a handful of keys hammering one scope (normal traffic shape).
+    hot_keys = [("heartbeat", f"192.168.0.{i}") for i in range(50)]
+    start = time.perf_counter()
+    rejected = 0
+    for i in range(hot_requests):
+        now += 0.001
+        if limiter.hit(hot_keys[i % 50], 60, 60, now):
+            rejected += 1
+    hot_s = time.perf_counter() - start
+
+    print(f"{name:<20}{n_ips / flood_s:>14,.0f}{hot_requests / hot_s:>14,.0f}"
+          f"{retained / 2**20:>14.1f}{peak / 2**20:>12.1f}{rejected:>10,}")
+    return limiter
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ips", type=int, default=1_000_000)
+    parser.add_argument("--hot", type=int, default=500_000)
+    parser.add_argument("--max-keys", type=int, default=1 << 18)
+    args = parser.parse_args()
+
+    print(f"{'limiter':<20}{'flood req/s':>14}{'hot req/s':>14}"
+          f"{'retained MiB':>14}{'peak MiB':>12}{'rejected':>10}")
+    gcra = run(
+        f"gcra ({args.max_keys:,} keys)",
+        lambda: GcraRateLimiter(max_keys=args.max_keys), args.ips, args.hot,
+    )
+    print(f"  table {gcra.memory_bytes / 2**20:.1f} MiB, {gcra.evictions:,} evictions")
+    run("sliding window", SlidingWindowLimiter, args.ips, args.hot)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Latency benchmark for the in-memory search index (search_index.py).
+
+Builds an index of synthetic Melbourne incidents, street notes and chat
+messages (100k by default) and reports build time plus p50/p95/p99 query
+latency for whole-word, multi-word, prefix (autocomplete) and bbox-constrained
+searches. No database or network needed:
+
+    cd backend && python benchmarks/bench_search.py --docs 100000
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from search_index import SearchIndex  # noqa: E402
+from synthetic import LAT_RANGE, LNG_RANGE, WORDS  # noqa: E402
+
+CBD_BBOX = (-37.825, 144.950, -37.805, 144.975)
+KINDS = ("incident", "street_note", "chat_message")
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def build(n_docs: int, seed: int = 7) -> SearchIndex:
+    rng = random.Random(seed)
+    idx = SearchIndex()
+    now = time.time()
+    for i in range(n_docs):
+        kind = KINDS[i % 3]
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 20)))
+        lat = lng = None
+        if kind != "chat_message":
+            lat = rng.uniform(*LAT_RANGE)
+            lng = rng.uniform(*LNG_RANGE)
+        idx.add(kind, f"{kind}-{i}", text, lat, lng, now - rng.uniform(0, 86400),
+                now + rng.uniform(3600, 86400))
+    return idx
+
+
+def run(n_docs: int, iterations: int) -> None:
+    start = time.perf_counter()
+    idx = build(n_docs)
+    build_s = time.perf_counter() - start
+    print(f"indexed {len(idx):,} docs in {build_s:.2f}s "
+          f"({len(idx) / build_s:,.0f} docs/s)")
+
+    rng = random.Random(11)
+    cases = {
+        "single word": lambda: dict(query=rng.choice(WORDS), prefix=False),
+        "two words": lambda: dict(query=f"{rng.choice(WORDS)} {rng.choice(WORDS)}", prefix=False),
+        "prefix (2 chars)": lambda: dict(query=rng.choice(WORDS)[:2]),
+        "prefix + word": lambda: dict(query=f"{rng.choice(WORDS)} {rng.choice(WORDS)[:3]}"),
+        "word + CBD bbox": lambda: dict(query=rng.choice(WORDS), bbox=CBD_BBOX),
+        "notes only": lambda: dict(query=rng.choice(WORDS), kinds={"street_note"}),
+    }
+    print(f"{'case':<18}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean hits':>11}")
+    for name, make in cases.items():
+        samples, hits = [], []
+        for _ in range(iterations):
+            kwargs = make()
+            t0 = time.perf_counter()
+            res = idx.search(limit=20, **kwargs)
+            samples.append((time.perf_counter() - t0) * 1000)
+            hits.append(len(res))
+        print(f"{name:<18}{_percentile(samples, 50):>10.2f}{_percentile(samples, 95):>10.2f}"
+              f"{_percentile(samples, 99):>10.2f}{statistics.mean(hits):>11.1f}")
+
+    t0 = time.perf_counter()
+    removed = idx.expire(now=time.time() + 2 * 86400)
+    print(f"expired {removed:,} docs in {(time.perf_counter() - t0):.2f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    run(args.docs, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
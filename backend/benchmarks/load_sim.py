@@ -0,0 +1,425 @@
+"""
+Load simulator: virtual users that follow the frontend's own timers.
+
+Each virtual user behaves like one open tab of frontend/app.js:
+
+    on load     GET /api/, POST /identity/token, GET /live-updates,
+                GET /incidents, GET /street-highlights (twice: map init and
+                startup), GET /welcome-notice, GET /street-notes, GET /peers,
+                POST /users/heartbeat, POST /peers (located users)
+    every 5 s   GET /chat/messages                 while the chat panel is open
+    every 20 s  POST /peers (located users), GET /peers    initPeerBroadcasting
+    every 30 s  POST /users/heartbeat/{session}            updateActiveUsersCount
+    every 60 s  GET /incidents, GET /street-notes          periodic refresh
+    every 60 s  GET /live-updates
+
+On top of that, it makes the writes people make (reactions, chat messages,
+street notes, incidents and reports) at Poisson rates per user-hour. Timers
+fire like setInterval, whether or not the previous request has returned (an
+open loop), so an overloaded server sees requests pile up rather than a
+client that politely slows down. Sessions last an exponential time (mean
+--session-minutes), and then a new user arrives in their place, so the
+on-load burst recurs at the churn rate.
+
+The run steps through user counts (--users 100,200,400, or --ramp to keep
+doubling), holding each one for --step seconds after a one-cycle warm-up. For
+every step it prints the offered and achieved QPS, latency percentiles, errors
+and peak in-flight requests. The saturation point is the first step where p95
+passes --slo-ms, more than 1% of requests fail, or achieved QPS falls below 90%
+of offered. The per-endpoint steady-state QPS of the last healthy step is the
+capacity-planning table.
+
+    cd backend && python benchmarks/load_sim.py --ramp --users 100
+    python benchmarks/load_sim.py --url http://127.0.0.1:8000 --users 200,400,800
+
+By default the app runs in this process on the in-memory store, seeded as in
+bench_api.py. The client shares that CPU, so the figures are conservative. For
+users per worker, start one uvicorn worker with TRUSTED_PROXY_HOPS=1 (each
+virtual user sends its own X-Forwarded-For, as rate limits expect) and pass
+--url. --speed N runs every timer N times faster with N times fewer virtual
+users: the offered load is the same, with less client overhead. Keep it at 10
+or below, or per-user rate limits (POST /peers: 30 a minute) start to trip.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import bench_api
+import synthetic
+from bench_api import _percentile
+
+# ── the client model (frontend/app.js) ───────────────────────────────────────
+CHAT_OPEN_SHARE = 0.15   # users with the chat panel open (it polls every 5 s)
+LOCATED_SHARE = 0.6      # users sharing location with an avatar set (POST /peers)
+ERROR_BUDGET = 0.01
+UNDERSERVED = 0.9        # achieved / offered QPS below this is saturation
+
+ON_LOAD = (
+    "GET /api/",
+    "POST /api/identity/token",
+    "GET /api/live-updates",
+    "GET /api/incidents",
+    "GET /api/street-highlights",
+    "GET /api/street-highlights",
+    "GET /api/welcome-notice",
+    "GET /api/street-notes",
+    "GET /api/peers",
+    "POST /api/users/heartbeat/{id}",
+    "POST /api/peers",
+)
+
+
+@dataclass(frozen=True)
+class Timer:
+    every: float                 # seconds, as in the setInterval call
+    requests: Tuple[str, ...]    # fired together on each tick
+    only: Optional[str] = None   # VirtualUser flag gating it: "chat_open" / "located"
+
+
+SHARES = {None: 1.0, "chat_open": CHAT_OPEN_SHARE, "located": LOCATED_SHARE}
+
+TIMERS = (
+    Timer(5, ("GET /api/chat/messages",), "chat_open"),
+    Timer(20, ("POST /api/peers",), "located"),
+    Timer(20, ("GET /api/peers",)),
+    Timer(30, ("POST /api/users/heartbeat/{id}",)),
+    Timer(60, ("GET /api/incidents", "GET /api/street-notes")),
+    Timer(60, ("GET /api/live-updates",)),
+)
+
+# Writes per user-hour, across all users.
+WRITES_PER_HOUR = {
+    "POST /api/incidents/{id}/react": 2.0,
+    "POST /api/chat/messages": 0.5,
+    "POST /api/street-notes": 0.2,
+    "POST /api/incidents": 0.1,
+    "POST /api/reports": 0.1,
+}
+
+
+def offered_rates(users: int, session_seconds: float) -> Dict[str, float]:
+    """Steady-state requests per second, per endpoint, for `users` users."""
+    rates: Dict[str, float] = defaultdict(float)
+    for name in ON_LOAD:
+        share = LOCATED_SHARE if name == "POST /api/peers" else 1.0
+        rates[name] += users * share / session_seconds
+    for timer in TIMERS:
+        for name in timer.requests:
+            rates[name] += users * SHARES[timer.only] / timer.every
+    for name, per_hour in WRITES_PER_HOUR.items():
+        rates[name] += users * per_hour / 3600
+    return dict(rates)
+
+
+# ── virtual users ────────────────────────────────────────────────────────────
+class Stats:
+    """Latencies and statuses per endpoint for one step's measured window."""
+
+    def __init__(self, measure_from: float):
+        self.measure_from = measure_from
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def record(self, name: str, started: float, status: str) -> None:
+        if started >= self.measure_from:
+            self.latencies[name].append((time.monotonic() - started) * 1000)
+            self.statuses[name][status] += 1
+
+
+class VirtualUser:
+    """One browser tab: its ids, location and what it has learned from the feed."""
+
+    def __init__(self, rng: random.Random, n: int):
+        self.rng = rng
+        self.id = f"sim-{n}-{rng.getrandbits(32):08x}"
+        self.session = f"session-{self.id}"
+        self.ip = f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255 or 1}"
+        self.located = rng.random() < LOCATED_SHARE
+        self.chat_open = rng.random() < CHAT_OPEN_SHARE
+        self.location = synthetic.point(rng, spread=0.5)
+        self.incident_ids: List[str] = []
+
+    def build(self, name: str) -> Optional[Tuple[str, str, Optional[dict]]]:
+        """(method, path, body) for a named request, or None to skip it."""
+        method, path = name.split(" ", 1)
+        if name == "POST /api/peers":
+            if not self.located:
+                return None
+            lat, lng = self.location
+            return method, path, {"id": self.id, "emoji": "🚲", "title": "Walker",
+                                  "lat": lat, "lng": lng, "ts": time.time() * 1000}
+        if name == "POST /api/users/heartbeat/{id}":
+            return method, f"/api/users/heartbeat/{self.session}", None
+        if name == "POST /api/identity/token":
+            return method, path, {"id": self.id}
+        if name == "POST /api/chat/messages":
+            return method, path, {"message": synthetic.sentence(self.rng, 2, 12),
+                                  "author": "Walker", "author_id": self.id}
+        if name == "POST /api/street-notes":
+            return method, path, {**bench_api._note_body(self), "owner_id": self.id}
+        if name == "POST /api/incidents":
+            return method, path, bench_api._incident_body(self)
+        if name in ("POST /api/incidents/{id}/react", "POST /api/reports"):
+            if not self.incident_ids:
+                return None
+            target = self.rng.choice(self.incident_ids)
+            if name == "POST /api/reports":
+                return method, path, {"target_type": "incident", "target_id": target, "reason": "spam"}
+            return method, f"/api/incidents/{target}/react", {"reaction": "like"}
+        return method, path, None
+
+    def learn(self, name: str, res) -> None:
+        if name == "GET /api/incidents" and res.status_code == 200:
+            self.incident_ids = [i["id"] for i in res.json()[:50] if "id" in i]
+
+
+async def _fire(http, stats: Stats, user: VirtualUser, name: str) -> None:
+    request = user.build(name)
+    if request is None:
+        return
+    method, path, body = request
+    stats.in_flight += 1
+    stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+    started = time.monotonic()
+    try:
+        res = await http.request(method, path, json=body, headers={"X-Forwarded-For": user.ip})
+        user.learn(name, res)
+        status = str(res.status_code)
+    except Exception as exc:  # timeouts, resets: they count against the step
+        status = type(exc).__name__
+    finally:
+        stats.in_flight -= 1
+    stats.record(name, started, status)
+
+
+async def _user_slot(http, stats: Stats, rng: random.Random, n: int, speed: float,
+                     session_seconds: float, stop_at: float, pending: set) -> None:
+    """One seat in the user population: a session, then its replacement, and so on."""
+
+    def spawn(user, name):
+        task = asyncio.create_task(_fire(http, stats, user, name))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    async def every(timer: Timer, user: VirtualUser):
+        period = timer.every / speed
+        next_at = time.monotonic() + period
+        while True:
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+            next_at += period  # setInterval keeps its cadence, however slow the server
+            for name in timer.requests:
+                spawn(user, name)
+
+    async def writes(user: VirtualUser):
+        names, weights = zip(*WRITES_PER_HOUR.items())
+        rate = sum(weights) * speed / 3600
+        while True:
+            await asyncio.sleep(rng.expovariate(rate))
+            spawn(user, rng.choices(names, weights)[0])
+
+    # Arrivals spread over the first cycle, not all at once.
+    await asyncio.sleep(rng.uniform(0, 60 / speed))
+    while time.monotonic() < stop_at:
+        user = VirtualUser(rng, n)
+        leave_at = time.monotonic() + rng.expovariate(speed / session_seconds)
+        for name in ON_LOAD:
+            await _fire(http, stats, user, name)
+        timers = [asyncio.create_task(every(t, user)) for t in TIMERS
+                  if t.only is None or getattr(user, t.only)]
+        timers.append(asyncio.create_task(writes(user)))
+        try:
+            await asyncio.sleep(max(0.0, min(leave_at, stop_at) - time.monotonic()))
+        finally:
+            for task in timers:
+                task.cancel()
+
+
+async def run_step(http, users: int, args) -> dict:
+    session_seconds = args.session_minutes * 60
+    n_slots = max(1, math.ceil(users / args.speed))
+    warmup = 60 / args.speed
+    start = time.monotonic()
+    stats = Stats(measure_from=start + warmup)
+    stop_at = start + warmup + args.step
+    rng = random.Random(users)
+    pending: set = set()
+    await asyncio.gather(*(
+        _user_slot(http, stats, rng, n, args.speed, session_seconds, stop_at, pending)
+        for n in range(n_slots)
+    ))
+    if pending:
+        _, late = await asyncio.wait(pending, timeout=30)
+        for task in late:
+            task.cancel()
+
+    offered = offered_rates(users, session_seconds)
+    endpoints = {}
+    for name in sorted(set(offered) | set(stats.latencies)):
+        latencies = sorted(stats.latencies.get(name, []))
+        statuses = stats.statuses.get(name, Counter())
+        endpoints[name] = {
+            "offered_qps": round(offered.get(name, 0.0), 2),
+            "achieved_qps": round(len(latencies) / args.step, 2),
+            "p50_ms": round(_percentile(latencies, 50), 2),
+            "p95_ms": round(_percentile(latencies, 95), 2),
+            "p99_ms": round(_percentile(latencies, 99), 2),
+            "errors": sum(n for code, n in statuses.items() if not code.startswith("2")),
+            "status": dict(statuses),
+        }
+    every_latency = sorted(v for values in stats.latencies.values() for v in values)
+    requests = len(every_latency)
+    errors = sum(e["errors"] for e in endpoints.values())
+    step = {
+        "users": users,
+        "virtual_users": n_slots,
+        "offered_qps": round(sum(offered.values()), 2),
+        "achieved_qps": round(requests / args.step, 2),
+        "p50_ms": round(_percentile(every_latency, 50), 2),
+        "p95_ms": round(_percentile(every_latency, 95), 2),
+        "p99_ms": round(_percentile(every_latency, 99), 2),
+        "errors": errors,
+        "peak_in_flight": stats.peak_in_flight,
+        "endpoints": endpoints,
+    }
+    step["saturated"] = (
+        step["p95_ms"] > args.slo_ms
+        or errors > ERROR_BUDGET * max(1, requests)
+        or step["achieved_qps"] < UNDERSERVED * step["offered_qps"]
+    )
+    return step
+
+
+# ── runner ───────────────────────────────────────────────────────────────────
+async def _in_process(args):
+    """Seed and start the app in this process; returns (transport, shutdown)."""
+    import httpx
+    import server
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("server").setLevel(logging.ERROR)
+    if args.storage == "mongo":
+        # Only ever empty the dedicated benchmark database.
+        assert server.db.name.endswith("_bench")
+        for name in await server.db.list_collection_names():
+            await server.db[name].delete_many({})
+    counts = {"incidents": args.incidents, "street_notes": args.notes,
+              "chat_messages": args.chat, "peers": args.peers, "active_users": args.peers}
+    await synthetic.seed(server.db, counts)
+    await server.app.router.startup()
+    return httpx.ASGITransport(app=server.app), server.app.router.shutdown
+
+
+def _print_model(session_seconds: float) -> None:
+    rates = offered_rates(1000, session_seconds)
+    print(f"client model: offered req/s per 1,000 users ({sum(rates.values()):.1f} total)")
+    for name, qps in sorted(rates.items(), key=lambda kv: -kv[1]):
+        print(f"  {name:<36}{qps:>8.2f}")
+
+
+async def run(args) -> dict:
+    import httpx
+
+    session_seconds = args.session_minutes * 60
+    _print_model(session_seconds)
+    shutdown = None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=30,
+                                   limits=httpx.Limits(max_connections=args.max_connections))
+    else:
+        transport, shutdown = await _in_process(args)
+        client = httpx.AsyncClient(transport=transport, base_url="http://sim", timeout=30)
+
+    steps: List[dict] = []
+    schedule = [int(u) for u in args.users.split(",")]
+    print(f"\n{'users':>7}{'offered/s':>11}{'achieved/s':>12}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'p99 ms':>9}{'errors':>8}{'in-flight':>11}")
+    try:
+        async with client as http:
+            while schedule:
+                users = schedule.pop(0)
+                step = await run_step(http, users, args)
+                steps.append(step)
+                print(f"{users:>7,}{step['offered_qps']:>11.1f}{step['achieved_qps']:>12.1f}"
+                      f"{step['p50_ms']:>9.1f}{step['p95_ms']:>9.1f}{step['p99_ms']:>9.1f}"
+                      f"{step['errors']:>8}{step['peak_in_flight']:>11}"
+                      f"{'  SATURATED' if step['saturated'] else ''}")
+                if step["saturated"]:
+                    break
+                if args.ramp and not schedule and users * 2 <= args.max_users:
+                    schedule.append(users * 2)
+    finally:
+        if shutdown is not None:
+            await shutdown()
+
+    healthy = [s for s in steps if not s["saturated"]]
+    saturated = next((s for s in steps if s["saturated"]), None)
+    if healthy:
+        best = healthy[-1]
+        print(f"\nsteady state at {best['users']:,} users:")
+        print(f"  {'endpoint':<36}{'req/s':>8}{'share':>8}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}")
+        total = max(best["achieved_qps"], 1e-9)
+        for name, e in sorted(best["endpoints"].items(), key=lambda kv: -kv[1]["achieved_qps"]):
+            print(f"  {name:<36}{e['achieved_qps']:>8.2f}{e['achieved_qps'] / total:>8.1%}"
+                  f"{e['p50_ms']:>9.1f}{e['p95_ms']:>9.1f}{e['errors']:>8}")
+    if saturated:
+        capacity = f"{healthy[-1]['users']:,} users" if healthy else f"under {saturated['users']:,} users"
+        print(f"\nsaturated at {saturated['users']:,} users; capacity: {capacity} "
+              f"(p95 <= {args.slo_ms:.0f} ms)")
+    else:
+        print("\nno step saturated; raise --users or --max-users")
+
+    return {
+        "meta": {
+            "commit": bench_api._git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "target": args.url or "in-process",
+            "step_seconds": args.step,
+            "speed": args.speed,
+            "session_minutes": args.session_minutes,
+            "slo_ms": args.slo_ms,
+        },
+        "capacity_users": healthy[-1]["users"] if healthy and saturated else None,
+        "steps": steps,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="drive a running server instead of an in-process app")
+    parser.add_argument("--users", default="100,200,400,800", help="comma-separated user counts")
+    parser.add_argument("--ramp", action="store_true", help="keep doubling the last count until saturated")
+    parser.add_argument("--max-users", type=int, default=100_000)
+    parser.add_argument("--step", type=float, default=120, help="measured seconds per step")
+    parser.add_argument("--speed", type=float, default=1.0, help="timer speed-up (see above)")
+    parser.add_argument("--session-minutes", type=float, default=10.0)
+    parser.add_argument("--slo-ms", type=float, default=500.0, help="p95 budget")
+    parser.add_argument("--max-connections", type=int, default=1000, help="--url only")
+    parser.add_argument("--storage", choices=("memory", "mongo"), default="memory")
+    parser.add_argument("--incidents", type=int, default=10_000)
+    parser.add_argument("--notes", type=int, default=50_000)
+    parser.add_argument("--chat", type=int, default=100_000)
+    parser.add_argument("--peers", type=int, default=5_000)
+    parser.add_argument("--out", help="write the steps to this JSON file")
+    args = parser.parse_args()
+
+    if not args.url:
+        bench_api._configure(args.storage)
+    results = asyncio.run(run(args))
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2) + "\n")
+        print(f"wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Synthetic Melbourne data for the API benchmarks and the load simulator.
+
+`seed(db, counts)` fills incidents, street notes, chat messages, peers,
+highlights, presence and reports, shaped as the create handlers in server.py
+write them, and spread over Greater Melbourne. Timestamps fall inside each
+collection's retention window, so nothing expires during a run: peers and
+presence are stamped up to an hour ahead, because their windows are only
+seconds long. Everything derives from `rng_seed`, so two runs seed the same
+data.
+"""
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+# Greater Melbourne, roughly.
+LAT_RANGE = (-38.05, -37.60)
+LNG_RANGE = (144.70, 145.30)
+CBD = (-37.8136, 144.9631)
+
+WORDS = (
+    "lost dog cat kitten found wallet phone keys umbrella charger coffee "
+    "free toilet fountain parking busker music protest crowd theft bike "
+    "stolen harassment tram train station park gardens street lane market "
+    "flinders swanston bourke collins elizabeth fitzroy carlton richmond "
+    "brunswick southbank docklands yarra river night lighting dark help "
+    "please anyone seen near corner outside opposite closed open queue"
+).split()
+PLACES = ("Fitzroy", "Carlton", "Richmond", "Southbank", "Docklands", "Brunswick",
+          "Flinders Street", "Swanston Street", "Federation Square", "Queen Victoria Market")
+CATEGORIES = ("protest", "theft", "harassment", "antisocial", "other")
+URGENCIES = ("low", "medium", "high")
+EMOJIS = ("🐶", "🚲", "☕", "🎸", "🌳", "🚋", "🧭", "💡")
+REPORT_REASONS = ("spam", "harassment", "misinformation", "other")
+
+DEFAULT_COUNTS = {
+    "incidents": 10_000,
+    "street_notes": 50_000,
+    "chat_messages": 100_000,
+    "peers": 5_000,
+    "active_users": 5_000,
+    "street_highlights": 200,
+    "content_reports": 2_000,
+}
+INSERT_BATCH = 5_000
+
+
+def point(rng: random.Random, spread: float = 1.0):
+    """A point in Greater Melbourne, denser towards the CBD as spread drops."""
+    if rng.random() < 0.5:
+        lat = rng.gauss(CBD[0], 0.03 * spread)
+        lng = rng.gauss(CBD[1], 0.04 * spread)
+        return (min(max(lat, LAT_RANGE[0]), LAT_RANGE[1]), min(max(lng, LNG_RANGE[0]), LNG_RANGE[1]))
+    return rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)
+
+
+def viewport(rng: random.Random, km: float = 2.0):
+    """Bbox query params for a phone-sized map view of about `km` across."""
+    lat, lng = point(rng, spread=0.5)
+    half_lat, half_lng = km / 222.0, km / 176.0
+    return {"min_lat": lat - half_lat, "max_lat": lat + half_lat,
+            "min_lng": lng - half_lng, "max_lng": lng + half_lng}
+
+
+def sentence(rng: random.Random, lo: int = 4, hi: int = 16) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(lo, hi)))
+
+
+def incident(rng: random.Random, now: datetime) -> dict:
+    lat, lng = point(rng)
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "category": rng.choice(CATEGORIES),
+        "urgency": rng.choice(URGENCIES),
+        "description": sentence(rng),
+        "latitude": lat,
+        "longitude": lng,
+        "image_url": None,
+        "contact_email": None,
+        "contact_phone": None,
+        "is_verified": False,
+        "cluster_count": 1,
+        "like_count": rng.randint(0, 20),
+        "dislike_count": rng.randint(0, 5),
+        "timestamp": now - timedelta(seconds=rng.uniform(0, 5.5 * 3600)),
+    }
+
+
+def owner_of(note_id: str) -> str:
+    """The owner_id seeded on a street note, so a client can resolve it."""
+    return f"user-{note_id[:8]}"
+
+
+def street_note(rng: random.Random, now: datetime) -> dict:
+    lat, lng = point(rng)
+    forever = rng.random() < 0.05
+    note_id = str(uuid.UUID(int=rng.getrandbits(128)))
+    return {
+        "id": note_id,
+        "text": sentence(rng, 3, 12)[:150],
+        "latitude": lat,
+        "longitude": lng,
+        "location_text": rng.choice(PLACES),
+        "image_url": "",
+        "emoji": rng.choice(EMOJIS),
+        "forever": forever,
+        "kind": "helping_hand" if rng.random() < 0.2 else "discovery",
+        "owner_id": owner_of(note_id),
+        "contact_name": None,
+        "contact_phone": None,
+        "contact_email": None,
+        "contact_public": False,
+        "resolved": False,
+        "created_at": now - timedelta(seconds=rng.uniform(0, 48 * 3600)),
+        "expires_at": None if forever else now + timedelta(hours=rng.uniform(1, 72)),
+    }
+
+
+def chat_message(rng: random.Random, now: datetime) -> dict:
+    timestamp = now - timedelta(seconds=rng.uniform(0, 23 * 3600))
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "message": sentence(rng, 2, 25),
+        "author": f"Walker{rng.randrange(5000)}",
+        "author_id": f"user-{rng.randrange(20_000)}",
+        "timestamp": timestamp,
+        "expire_at": timestamp + timedelta(hours=24),
+        "pinned": False,
+    }
+
+
+def peer(rng: random.Random, now: datetime, i: int) -> dict:
+    lat, lng = point(rng, spread=0.5)
+    ahead = now + timedelta(hours=1)
+    return {
+        "id": f"peer-{i}",
+        "emoji": rng.choice(EMOJIS),
+        "title": f"Walker{i}",
+        "lat": lat,
+        "lng": lng,
+        "ts": ahead.timestamp() * 1000,
+        "updated_at": ahead,
+    }
+
+
+def street_highlight(rng: random.Random, now: datetime) -> dict:
+    lat, lng = point(rng, spread=0.5)
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "start_lat": lat,
+        "start_lng": lng,
+        "end_lat": lat + rng.uniform(-0.004, 0.004),
+        "end_lng": lng + rng.uniform(-0.004, 0.004),
+        "color": rng.choice(("red", "yellow", "green")),
+        "reason": rng.choice(("poor_lighting", "crowded", "harassment", "protest", "other")),
+        "description": sentence(rng, 2, 8),
+        "created_at": now - timedelta(days=rng.uniform(0, 30)),
+    }
+
+
+async def seed(db, counts: Dict[str, int] = None, rng_seed: int = 7) -> Dict[str, List[str]]:
+    """
+    Insert the synthetic dataset through `db` (Motor or the memory store) and
+    return the public `id`s per collection, for requests that need one.
+    """
+    counts = {**DEFAULT_COUNTS, **(counts or {})}
+    rng = random.Random(rng_seed)
+    now = datetime.now(timezone.utc)
+    makers = {
+        "incidents": lambda i: incident(rng, now),
+        "street_notes": lambda i: street_note(rng, now),
+        "chat_messages": lambda i: chat_message(rng, now),
+        "peers": lambda i: peer(rng, now, i),
+        "active_users": lambda i: {"session_id": f"session-{i}", "last_heartbeat": now + timedelta(hours=1)},
+        "street_highlights": lambda i: street_highlight(rng, now),
+    }
+    ids: Dict[str, List[str]] = {}
+    for name, make in makers.items():
+        ids[name] = []
+        for start in range(0, counts[name], INSERT_BATCH):
+            docs = [make(i) for i in range(start, min(counts[name], start + INSERT_BATCH))]
+            ids[name].extend(d["id"] for d in docs if "id" in d)
+            await db[name].insert_many(docs)
+
+    targets = [(t, c) for t, c in (("incident", "incidents"), ("street_note", "street_notes"),
+                                   ("chat_message", "chat_messages")) if ids[c]]
+    reports = []
+    for _ in range(counts["content_reports"] if targets else 0):
+        target_type, collection = rng.choice(targets)
+        reports.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "target_type": target_type,
+            # Reports cluster on a few items, as real spam waves do.
+            "target_id": rng.choice(ids[collection][:max(1, len(ids[collection]) // 50)]),
+            "reason": rng.choice(REPORT_REASONS),
+            "details": "",
+            "status": "open" if rng.random() < 0.8 else "dismissed",
+            "resolution": None,
+            "created_at": now - timedelta(seconds=rng.uniform(0, 6 * 3600)),
+            "resolved_at": None,
+        })
+    if reports:
+        await db.content_reports.insert_many(reports)
+    ids["content_reports"] = [r["id"] for r in reports]
+    return ids
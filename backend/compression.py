@@ -0,0 +1,164 @@
+"""
+Response compression: gzip and brotli, negotiated from Accept-Encoding.
+
+Two paths share the helpers here:
+
+- `CompressionMiddleware` (pure ASGI) compresses any response whose body
+  arrives in one piece, is at least `min_size` bytes, and has a compressible
+  type. Streamed responses, and responses that already carry a
+  Content-Encoding, pass through untouched. Bodies over THREAD_BYTES are
+  compressed in a worker thread, so a 1000-pin feed never stalls the event
+  loop.
+- Cached payloads (the content cache in server.py) are compressed once per
+  version with `compress_async` and kept next to the cache entry, at a higher
+  quality than is affordable per request. At brotli 11 even a 30 KB body
+  takes tens of milliseconds, so precompression always runs in a worker
+  thread. The results leave the route already encoded, and the middleware
+  leaves them alone.
+
+Brotli needs the optional `brotli` package; without it only gzip is offered.
+A compressed response's strong ETag is sent weak (W/"..."), since the bytes
+differ from the identity representation. If-None-Match handling in server.py
+compares the opaque part, so a revalidation still gets its 304.
+"""
+import asyncio
+import gzip
+from typing import List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5            # per request: fast, still smaller than gzip -6
+PRECOMPRESS_GZIP_LEVEL = 9    # once per cached version: spend the CPU
+PRECOMPRESS_BROTLI_QUALITY = 11
+# Compressing more than this on the event loop, at the per-request levels,
+# would hold up other requests. Precompression levels always use a thread.
+THREAD_BYTES = 64 * 1024
+
+COMPRESSIBLE_TYPES = (
+    b"application/json", b"application/x-msgpack", b"text/", b"application/javascript",
+    b"image/svg+xml",
+)
+
+
+def supported() -> Tuple[str, ...]:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """The best encoding the client accepts (br over gzip), or None."""
+    if not accept_encoding:
+        return None
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        offered[name.strip()] = q
+    for encoding in supported():
+        q = offered.get(encoding, offered.get("*", 0.0))
+        if q > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str, precompress: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=PRECOMPRESS_BROTLI_QUALITY if precompress else BROTLI_QUALITY)
+    return gzip.compress(body, PRECOMPRESS_GZIP_LEVEL if precompress else GZIP_LEVEL, mtime=0)
+
+
+async def compress_async(body: bytes, encoding: str, precompress: bool = False) -> bytes:
+    """`compress`, off the event loop for precompression and bodies over THREAD_BYTES."""
+    if precompress or len(body) > THREAD_BYTES:
+        return await asyncio.to_thread(compress, body, encoding, precompress)
+    return compress(body, encoding, precompress)
+
+
+def weak_etag(etag: str) -> str:
+    return etag if etag.startswith("W/") else "W/" + etag
+
+
+def _add_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    for i, (key, value) in enumerate(headers):
+        if key.lower() == b"vary":
+            if b"accept-encoding" not in value.lower():
+                headers[i] = (key, value + b", Accept-Encoding")
+            return headers
+    headers.append((b"vary", b"Accept-Encoding"))
+    return headers
+
+
+class CompressionMiddleware:
+    """gzip / brotli for whole (non-streamed) responses of at least `min_size` bytes."""
+
+    def __init__(self, app, min_size: int = 1024):
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = None
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if start_message is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            if message.get("more_body") or not self._should_compress(start, body):
+                await send(start)
+                await send(message)
+                return
+            compressed = await compress_async(body, encoding)
+            headers = [(k, v) for k, v in start.get("headers", ()) if k.lower() != b"content-length"]
+            for i, (key, value) in enumerate(headers):
+                if key.lower() == b"etag":
+                    headers[i] = (key, weak_etag(value.decode("latin-1")).encode("latin-1"))
+            headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+            ]
+            await send({**start, "headers": _add_vary(headers)})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+        if start_message is not None:  # a response with no body message
+            await send(start_message)
+
+    def _should_compress(self, start, body: bytes) -> bool:
+        if len(body) < self.min_size or start["status"] in (204, 206, 304):
+            return False
+        content_type = b""
+        for key, value in start.get("headers", ()):
+            key = key.lower()
+            if key == b"content-encoding":
+                return False
+            if key == b"content-type":
+                content_type = value.lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES)
@@ -0,0 +1,157 @@
+"""
+MongoDB command instrumentation: a pymongo CommandListener that times every
+command the driver sends.
+
+- Per collection and command: latency goes to a histogram (metrics.py), so
+  /metrics shows which collections and commands dominate.
+- Per request: time and round trips are added to the RequestDbStats of the
+  request in progress. EdgeMiddleware opens one with track_request(). Motor
+  runs pymongo on a thread pool but copies the caller's context, so the
+  listener, running on that thread, still sees the request's stats.
+- Slow commands are logged with the filter's *shape*. Keys and operators are
+  kept and values become "?", so no user data reaches the logs.
+
+Listener callbacks run on Motor's worker threads, so shared state is only
+touched under a lock. The lock is uncontended in practice and held for a few
+increments.
+"""
+import logging
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Commands whose first field names the collection, e.g. {"find": "incidents"}.
+_COLLECTION_COMMANDS = frozenset({
+    "find", "insert", "update", "delete", "aggregate", "count", "distinct",
+    "findAndModify", "createIndexes", "listIndexes", "drop",
+})
+# Where each command keeps the filter worth showing in the slow log.
+_FILTER_PATHS = {
+    "find": ("filter",),
+    "count": ("query",),
+    "distinct": ("query",),
+    "findAndModify": ("query",),
+    "update": ("updates", 0, "q"),
+    "delete": ("deletes", 0, "q"),
+    "aggregate": ("pipeline",),
+}
+# Bounds on how much of a filter the shape describes.
+MAX_SHAPE_DEPTH = 4
+MAX_SHAPE_KEYS = 16
+
+
+def redact(value: Any, depth: int = 0) -> Any:
+    """
+    The shape of a filter or pipeline: keys and $operators are kept, values
+    become "?". {"_id": "abc", "expires_at": {"$gt": dt}} becomes
+    {"_id": "?", "expires_at": {"$gt": "?"}}.
+    """
+    if depth >= MAX_SHAPE_DEPTH:
+        return "..."
+    if isinstance(value, dict):
+        items = list(value.items())
+        shape = {k: redact(v, depth + 1) for k, v in items[:MAX_SHAPE_KEYS]}
+        if len(items) > MAX_SHAPE_KEYS:
+            shape["..."] = len(items) - MAX_SHAPE_KEYS
+        return shape
+    if isinstance(value, (list, tuple)):
+        # $in / $or lists: the length matters for performance, the items don't
+        # (except operator documents, whose first one is shown).
+        if value and isinstance(value[0], dict):
+            return [redact(value[0], depth + 1)] + (["..."] if len(value) > 1 else [])
+        return f"[{len(value)}]"
+    return "?"
+
+
+def filter_shape(command_name: str, command: dict) -> Any:
+    node: Any = command
+    for step in _FILTER_PATHS.get(command_name, ()):
+        try:
+            node = node[step]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return None if node is command else redact(node)
+
+
+def _collection(command_name: str, command: dict) -> str:
+    if command_name in _COLLECTION_COMMANDS:
+        name = command.get(command_name)
+        if isinstance(name, str):
+            return name
+    if command_name == "getMore":
+        return command.get("collection") or "-"
+    return "-"
+
+
+class RequestDbStats:
+    """Mongo time and round trips for one request."""
+
+    __slots__ = ("time_ms", "calls", "_lock")
+
+    def __init__(self):
+        self.time_ms = 0.0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def add(self, elapsed_ms: float) -> None:
+        with self._lock:
+            self.time_ms += elapsed_ms
+            self.calls += 1
+
+
+_current: ContextVar[Optional[RequestDbStats]] = ContextVar("db_request_stats", default=None)
+
+
+def track_request() -> RequestDbStats:
+    """Start counting Mongo work for the request running in this context."""
+    stats = RequestDbStats()
+    _current.set(stats)
+    return stats
+
+
+class DbCommandListener(monitoring.CommandListener):
+    """
+    Registered on the Motor client (`event_listeners=[...]`). `histogram` is a
+    metrics.Histogram labelled (collection, command); commands slower than
+    `slow_ms` are logged at WARNING with their filter shape.
+    """
+
+    def __init__(self, histogram=None, slow_ms: float = 100.0):
+        self.histogram = histogram
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        # (connection, request id) -> (collection, command name, command, request stats)
+        self._inflight: Dict[Tuple[Any, int], tuple] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        name = event.command_name
+        entry = (_collection(name, event.command), name, event.command, _current.get())
+        with self._lock:
+            self._inflight[(event.connection_id, event.request_id)] = entry
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event)
+
+    def _finish(self, event) -> None:
+        elapsed_ms = event.duration_micros / 1000
+        with self._lock:
+            entry = self._inflight.pop((event.connection_id, event.request_id), None)
+            if entry is None:
+                return
+            collection, name, command, stats = entry
+            if self.histogram is not None:
+                self.histogram.labels(collection, name).observe(elapsed_ms / 1000)
+        if stats is not None:
+            stats.add(elapsed_ms)
+        if elapsed_ms >= self.slow_ms:
+            logger.warning(
+                "slow_db_command collection=%s command=%s elapsed_ms=%.1f filter=%s",
+                collection, name, elapsed_ms, filter_shape(name, command),
+            )
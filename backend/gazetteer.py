@@ -0,0 +1,328 @@
+"""
+Offline Melbourne gazetteer: local geocoding and place autocomplete.
+
+The index is built ahead of time by scripts/build_gazetteer.py (suburbs,
+streets, landmarks, public toilets, drinking fountains) and memory-mapped on
+startup, so a lookup is a binary search over bytes the OS pages in on demand,
+with nothing parsed or copied into the Python heap.
+
+On-disk layout (little-endian):
+
+    header   MAGIC, place count, key count, places offset, keys offset
+    places   per place: lat f64, lng f64, name offset u32, name length u16,
+             kind u8, rank u8
+    keys     per key, sorted by key bytes: key offset u32, place index u32,
+             key length u16, is-full-name u8
+    strings  UTF-8 names and keys
+
+Every place is indexed under its whole normalized name (and aliases) plus the
+name starting from each later word, so "station" finds "Flinders Street
+Station". Only whole-name keys count for `geocode()`; `suggest()` uses all.
+
+`nearest()` (reverse geocoding) uses a 2-d KD-tree over the place coordinates,
+built from the mapped records the first time it is needed.
+"""
+import heapq
+import logging
+import math
+import mmap
+import re
+import struct
+import unicodedata
+from pathlib import Path
+from array import array
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CMGAZ\x00\x01\x00"
+_HEADER = struct.Struct("<8sIIII")
+_PLACE = struct.Struct("<ddIHBB")
+_KEY = struct.Struct("<IIHB")
+
+KINDS = ("landmark", "suburb", "street", "toilet", "fountain")
+# Suffix keys start at each of the first few words only, which keeps long
+# toilet/fountain descriptions from bloating the index.
+MAX_SUFFIX_WORDS = 6
+# Keys scanned per suggest() call before ranking.
+MAX_PREFIX_SCAN = 128
+
+_PUNCT_RE = re.compile(r"[^\w\s]+", re.UNICODE)
+_SPACE_RE = re.compile(r"\s+")
+# Trailing qualifiers people add to an address that the gazetteer's names
+# don't carry: "Fitzroy VIC 3065, Australia" → "fitzroy".
+_QUALIFIERS = frozenset({"vic", "victoria", "australia", "au"})
+_POSTCODE_RE = re.compile(r"^3\d{3}$")
+
+
+def normalize(text: str) -> str:
+    """Case-folded, accent-free, punctuation-free, single-spaced."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _SPACE_RE.sub(" ", _PUNCT_RE.sub(" ", text)).strip()
+
+
+def strip_qualifiers(query: str) -> str:
+    """Drop trailing state/country/postcode words (and a trailing "melbourne")."""
+    words = normalize(query).split()
+    while len(words) > 1 and (words[-1] in _QUALIFIERS or _POSTCODE_RE.match(words[-1])):
+        words.pop()
+    if len(words) > 1 and words[-1] == "melbourne":
+        words.pop()
+    return " ".join(words)
+
+
+def build_index(places: Iterable[dict], path: Path) -> Tuple[int, int]:
+    """
+    Write an index file from place dicts with name, kind, lat, lng and
+    optional display (the label returned to clients), aliases and rank.
+    Returns (places, keys) written.
+    """
+    strings = bytearray()
+    string_offsets: Dict[bytes, int] = {}
+
+    def intern(raw: bytes) -> int:
+        off = string_offsets.get(raw)
+        if off is None:
+            off = string_offsets[raw] = len(strings)
+            strings.extend(raw)
+        return off
+
+    place_rows = []
+    keys = {}  # (key bytes, place index) → is full name
+    for place in places:
+        idx = len(place_rows)
+        label = (place.get("display") or place["name"]).encode("utf-8")
+        place_rows.append((
+            float(place["lat"]), float(place["lng"]), intern(label), len(label),
+            KINDS.index(place["kind"]), int(place.get("rank", 0)),
+        ))
+        for name in [place["name"], *place.get("aliases", ())]:
+            words = normalize(name).split()
+            for i in range(min(len(words), MAX_SUFFIX_WORDS)):
+                key = " ".join(words[i:]).encode("utf-8")
+                keys[(key, idx)] = keys.get((key, idx), False) or i == 0
+
+    key_rows = []
+    for (key, idx), full in sorted(keys.items()):
+        key_rows.append((intern(key), idx, len(key), 1 if full else 0))
+
+    places_off = _HEADER.size
+    keys_off = places_off + _PLACE.size * len(place_rows)
+    strings_off = keys_off + _KEY.size * len(key_rows)
+    with open(path, "wb") as fh:
+        fh.write(_HEADER.pack(MAGIC, len(place_rows), len(key_rows), places_off, keys_off))
+        for lat, lng, off, length, kind, rank in place_rows:
+            fh.write(_PLACE.pack(lat, lng, strings_off + off, length, kind, rank))
+        for off, idx, length, full in key_rows:
+            fh.write(_KEY.pack(strings_off + off, idx, length, full))
+        fh.write(strings)
+    return len(place_rows), len(key_rows)
+
+
+# Metres per degree of latitude; longitude degrees shrink by cos(latitude).
+_M_PER_DEG = 111_320.0
+
+
+class KdTree:
+    """
+    Static 2-d tree over points on a local flat projection (fine at city
+    scale). Stored implicitly: each subtree is a slice of `order` with its
+    splitting point in the middle, so there are no node objects.
+    """
+
+    def __init__(self, lats: List[float], lngs: List[float]) -> None:
+        self._lng_scale = math.cos(math.radians(sum(lats) / len(lats))) if lats else 1.0
+        self._xs = array("d", (lng * self._lng_scale * _M_PER_DEG for lng in lngs))
+        self._ys = array("d", (lat * _M_PER_DEG for lat in lats))
+        order = list(range(len(lats)))
+        self._build(order, 0, len(order), 0)
+        self._order = array("I", order)
+
+    def _build(self, order: List[int], lo: int, hi: int, depth: int) -> None:
+        if hi - lo <= 1:
+            return
+        coords = self._xs if depth % 2 == 0 else self._ys
+        order[lo:hi] = sorted(order[lo:hi], key=coords.__getitem__)
+        mid = (lo + hi) // 2
+        self._build(order, lo, mid, depth + 1)
+        self._build(order, mid + 1, hi, depth + 1)
+
+    def nearest(self, lat: float, lng: float, k: int = 1, accept=None) -> List[Tuple[float, int]]:
+        """Up to `k` (distance in metres, point index) pairs, nearest first."""
+        qx, qy = lng * self._lng_scale * _M_PER_DEG, lat * _M_PER_DEG
+        xs, ys, order = self._xs, self._ys, self._order
+        best: List[Tuple[float, int]] = []  # max-heap of (-dist², idx)
+
+        def visit(lo: int, hi: int, depth: int) -> None:
+            if lo >= hi:
+                return
+            mid = (lo + hi) // 2
+            idx = order[mid]
+            dx, dy = xs[idx] - qx, ys[idx] - qy
+            d2 = dx * dx + dy * dy
+            if accept is None or accept(idx):
+                if len(best) < k:
+                    heapq.heappush(best, (-d2, idx))
+                elif d2 < -best[0][0]:
+                    heapq.heapreplace(best, (-d2, idx))
+            diff = dx if depth % 2 == 0 else dy
+            # Search the query's side first; cross the split only if a closer
+            # point could be there.
+            near, far = ((lo, mid), (mid + 1, hi)) if diff > 0 else ((mid + 1, hi), (lo, mid))
+            visit(near[0], near[1], depth + 1)
+            if len(best) < k or diff * diff < -best[0][0]:
+                visit(far[0], far[1], depth + 1)
+
+        visit(0, len(order), 0)
+        return sorted((math.sqrt(-d2), idx) for d2, idx in best)
+
+
+class Gazetteer:
+    """Read-only view over a memory-mapped index file."""
+
+    def __init__(self, path: Path) -> None:
+        with open(path, "rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.place_count, self.key_count, self._places_off, self._keys_off = (
+            _HEADER.unpack_from(self._mm, 0)
+        )
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a gazetteer index")
+        self._kdtree: Optional[KdTree] = None
+        self._kinds: Optional[bytes] = None
+
+    @classmethod
+    def open(cls, path: Path) -> Optional["Gazetteer"]:
+        """The gazetteer at `path`, or None (logged) if it's missing or invalid."""
+        try:
+            return cls(path)
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning("Offline gazetteer unavailable (%s): %s", path, e)
+            return None
+
+    def close(self) -> None:
+        self._kdtree = None
+        self._mm.close()
+
+    def __len__(self) -> int:
+        return self.place_count
+
+    def _key(self, i: int) -> Tuple[bytes, int, bool]:
+        off, idx, length, full = _KEY.unpack_from(self._mm, self._keys_off + i * _KEY.size)
+        return self._mm[off:off + length], idx, bool(full)
+
+    def _lower_bound(self, target: bytes) -> int:
+        lo, hi = 0, self.key_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            off, _, length, _ = _KEY.unpack_from(self._mm, self._keys_off + mid * _KEY.size)
+            if self._mm[off:off + length] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _place(self, idx: int) -> dict:
+        lat, lng, off, length, kind, rank = _PLACE.unpack_from(
+            self._mm, self._places_off + idx * _PLACE.size
+        )
+        return {
+            "display_name": self._mm[off:off + length].decode("utf-8"),
+            "latitude": lat,
+            "longitude": lng,
+            "kind": KINDS[kind],
+            "_rank": rank,
+        }
+
+    def geocode(self, query: str, limit: int = 5) -> List[dict]:
+        """Places whose whole name (or alias) is exactly the query."""
+        target = strip_qualifiers(query).encode("utf-8")
+        if not target:
+            return []
+        out = []
+        i = self._lower_bound(target)
+        # Every match for the key, then the best `limit`: a higher-ranked
+        # place can sit later in key order.
+        while i < self.key_count:
+            key, idx, full = self._key(i)
+            if key != target:
+                break
+            if full:
+                out.append(self._place(idx))
+            i += 1
+        out.sort(key=lambda p: -p["_rank"])
+        out = out[:limit]
+        for place in out:
+            del place["_rank"]
+        return out
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[dict]:
+        """
+        Places with any word-start of their name beginning with `prefix`,
+        best first: whole-name matches, then by rank, then shorter names.
+        """
+        target = normalize(prefix).encode("utf-8")
+        if not target:
+            return []
+        mm, keys_off, key_size = self._mm, self._keys_off, _KEY.size
+        best: Dict[int, tuple] = {}
+        i = self._lower_bound(target)
+        end = min(self.key_count, i + MAX_PREFIX_SCAN)
+        n = len(target)
+        while i < end:
+            off, idx, length, full = _KEY.unpack_from(mm, keys_off + i * key_size)
+            if mm[off:off + n] != target:
+                break
+            score = (full, length == n)
+            if idx not in best or score > best[idx]:
+                best[idx] = score
+            i += 1
+        ranked = []
+        for idx, (full, exact) in best.items():
+            # Rank on the fixed-size record alone; only the winners get decoded.
+            _, _, _, name_len, _, rank = _PLACE.unpack_from(
+                mm, self._places_off + idx * _PLACE.size
+            )
+            ranked.append(((exact, full, rank, -name_len), idx))
+        ranked.sort(reverse=True)
+        out = []
+        for _, idx in ranked[:limit]:
+            place = self._place(idx)
+            del place["_rank"]
+            out.append(place)
+        return out
+
+    def nearest(
+        self,
+        lat: float,
+        lng: float,
+        kinds: Optional[Collection[str]] = None,
+        max_distance_m: float = math.inf,
+    ) -> Optional[dict]:
+        """The closest place (of one of `kinds`) within `max_distance_m`, or None."""
+        if self._kdtree is None:
+            lats, lngs, kind_codes = [], [], bytearray()
+            for i in range(self.place_count):
+                p_lat, p_lng, _, _, kind, _ = _PLACE.unpack_from(
+                    self._mm, self._places_off + i * _PLACE.size
+                )
+                lats.append(p_lat)
+                lngs.append(p_lng)
+                kind_codes.append(kind)
+            self._kdtree = KdTree(lats, lngs)
+            self._kinds = bytes(kind_codes)
+        accept = None
+        if kinds is not None:
+            wanted = {KINDS.index(k) for k in kinds}
+            kind_codes = self._kinds
+            accept = lambda idx: kind_codes[idx] in wanted  # noqa: E731
+        found = self._kdtree.nearest(lat, lng, 1, accept)
+        if not found or found[0][0] > max_distance_m:
+            return None
+        distance, idx = found[0]
+        place = self._place(idx)
+        del place["_rank"]
+        place["distance_m"] = round(distance, 1)
+        return place
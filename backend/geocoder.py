@@ -0,0 +1,227 @@
+"""
+Geocoding cache in front of Nominatim.
+
+Lookups go through three layers, cheapest first:
+
+1. An in-process LRU of normalized address → results, with a TTL. The
+   normalized form is only the cache key; Nominatim is asked with the address
+   as the user typed it.
+2. A persistent cache in MongoDB (`geocode_cache`, TTL-expired), so a restart or
+   another worker doesn't have to ask Nominatim again.
+3. Nominatim itself, behind two guards:
+   - single-flight: concurrent lookups of the same address share one upstream
+     call instead of each making their own;
+   - a global pacer that spaces upstream calls `min_interval` seconds apart
+     (Nominatim's usage policy allows about one per second). Callers wait their
+     turn; once `max_queue` are already waiting, new lookups are refused rather
+     than queued for minutes.
+
+"No results" is cached too, for a shorter time; errors are never cached.
+
+The pacer is per process: with several workers, raise `min_interval` to
+workers x 1s to stay inside the policy.
+"""
+import asyncio
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_NEGATIVE_TTL_SECONDS = 3600
+DEFAULT_MIN_INTERVAL_SECONDS = 1.0
+DEFAULT_MAX_QUEUE = 30
+
+# "/" and "-" stay: "12/34" (unit 12, number 34) and "12-34" (a range) are
+# different places.
+_PUNCT_RE = re.compile(r"[^\w\s,/-]+", re.UNICODE)
+_SPACE_RE = re.compile(r"\s+")
+_COMMA_RE = re.compile(r"\s*,[\s,]*")
+
+
+class GeocodeUnavailable(Exception):
+    """The upstream can't be asked right now (queue full, outage, bad reply)."""
+
+
+def normalize_address(address: str) -> str:
+    """
+    Cache key for an address: case-folded, punctuation dropped (commas kept as
+    separators; "/" and "-" kept), whitespace collapsed. "12  Smith St., Fitzroy" and
+    "12 smith st, fitzroy" share an entry.
+    """
+    text = unicodedata.normalize("NFKC", address).casefold()
+    text = _PUNCT_RE.sub(" ", text)
+    text = _COMMA_RE.sub(", ", text)
+    return _SPACE_RE.sub(" ", text).strip(" ,")
+
+
+class RequestPacer:
+    """Spaces calls at least `interval` seconds apart, in arrival order."""
+
+    def __init__(self, interval: float, max_queue: int, clock: Callable[[], float] = time.monotonic):
+        self.interval = interval
+        self.max_queue = max_queue
+        self._clock = clock
+        self._next_slot = 0.0
+        self.waiting = 0
+
+    async def wait(self) -> None:
+        if self.waiting >= self.max_queue:
+            raise GeocodeUnavailable("geocoding queue full")
+        now = self._clock()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            self.waiting += 1
+            try:
+                await asyncio.sleep(slot - now)
+            finally:
+                self.waiting -= 1
+
+
+class GeocodeCache:
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[List[dict]]],
+        collection=None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        negative_ttl_seconds: float = DEFAULT_NEGATIVE_TTL_SECONDS,
+        min_interval: float = DEFAULT_MIN_INTERVAL_SECONDS,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._fetch = fetch
+        self._coll = collection
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._clock = clock
+        self.pacer = RequestPacer(min_interval, max_queue)
+        # key → (expires at, results)
+        self._lru: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.coalesced = 0
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+        self.rejected = 0
+
+    def clear(self) -> None:
+        self._lru.clear()
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.persistent_hits + self.coalesced
+        lookups = hits + self.upstream_calls + self.rejected
+        return {
+            "entries": len(self._lru),
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "coalesced": self.coalesced,
+            "upstream_calls": self.upstream_calls,
+            "upstream_errors": self.upstream_errors,
+            "rejected": self.rejected,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "queue_depth": self.pacer.waiting,
+            "inflight": len(self._inflight),
+        }
+
+    def _remember(self, key: str, results: List[dict], expires: float) -> None:
+        self._lru[key] = (expires, results)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    async def _load(self, key: str) -> Optional[List[dict]]:
+        if self._coll is None:
+            return None
+        try:
+            doc = await self._coll.find_one({"_id": key}, {"results": 1, "expires_at": 1})
+        except Exception as e:
+            logger.warning("Geocode cache read failed: %s", e)
+            return None
+        if not doc:
+            return None
+        expires = doc["expires_at"].timestamp()
+        # The TTL monitor only runs once a minute; don't serve what it missed.
+        if expires <= self._clock():
+            return None
+        self._remember(key, doc["results"], expires)
+        return doc["results"]
+
+    async def _store(self, key: str, results: List[dict], expires: float) -> None:
+        if self._coll is None:
+            return
+        try:
+            await self._coll.update_one(
+                {"_id": key},
+                {"$set": {
+                    "results": results,
+                    "expires_at": datetime.fromtimestamp(expires, timezone.utc),
+                }},
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning("Geocode cache write failed: %s", e)
+
+    async def _resolve(self, key: str, address: str) -> List[dict]:
+        results = await self._load(key)
+        if results is not None:
+            self.persistent_hits += 1
+            return results
+        try:
+            await self.pacer.wait()
+        except GeocodeUnavailable:
+            self.rejected += 1
+            raise
+        self.upstream_calls += 1
+        try:
+            results = await self._fetch(address)
+        except Exception:
+            self.upstream_errors += 1
+            raise
+        ttl = self.ttl_seconds if results else self.negative_ttl_seconds
+        expires = self._clock() + ttl
+        self._remember(key, results, expires)
+        await self._store(key, results, expires)
+        return results
+
+    async def lookup(self, address: str) -> List[dict]:
+        key = normalize_address(address)
+        entry = self._lru.get(key)
+        if entry is not None:
+            if entry[0] > self._clock():
+                self._lru.move_to_end(key)
+                self.memory_hits += 1
+                return entry[1]
+            del self._lru[key]
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            results = await self._resolve(key, address.strip())
+        except BaseException as e:
+            if not future.done():
+                if isinstance(e, asyncio.CancelledError):
+                    e = GeocodeUnavailable("lookup cancelled")
+                future.set_exception(e)
+                # Waiters re-raise it; don't warn when nobody was waiting.
+                future.exception()
+            raise
+        else:
+            future.set_result(results)
+            return results
+        finally:
+            del self._inflight[key]
@@ -0,0 +1,194 @@
+"""
+Shared outbound HTTP client (Cloudflare Turnstile, Nominatim).
+
+One aiohttp session lives for the whole app: connections are kept alive and
+reused, DNS answers are cached, and each upstream host gets a bounded number of
+connections, so a gated write doesn't pay a fresh TCP + TLS handshake.
+
+Each upstream host also has a circuit breaker. After `failure_threshold`
+consecutive failures (network errors, timeouts, 5xx) the circuit opens and calls
+fail immediately with `CircuitOpenError` instead of queueing behind a dead
+service. After `reset_timeout` seconds one request is let through as a probe
+(half-open): success closes the circuit, failure opens it for another period.
+
+aiohttp is imported when the session is first opened rather than with this
+module, which keeps it (about 0.2 s) off the server's import path.
+"""
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Seconds: whole request, and connection setup.
+DEFAULT_TOTAL_TIMEOUT = 8.0
+DEFAULT_CONNECT_TIMEOUT = 3.0
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a host whose circuit is open."""
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now. A half-open circuit admits one probe."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if self._clock() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def release(self) -> None:
+        """Give back a probe slot without a verdict (the call was cancelled)."""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning("Circuit opened after %d failures", self.failures)
+            self.state = self.OPEN
+            self.opened_at = self._clock()
+
+
+class HttpClient:
+    """Application-lifetime aiohttp session with per-host circuit breakers."""
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 10,
+        dns_cache_seconds: int = 300,
+        keepalive_seconds: float = 30.0,
+        timeout: Optional["aiohttp.ClientTimeout"] = None,
+        user_agent: Optional[str] = None,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        on_response: Optional[Callable[[str, str, float], None]] = None,
+    ) -> None:
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_seconds = dns_cache_seconds
+        self.keepalive_seconds = keepalive_seconds
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        # Called as on_response(host, "ok" | "error", seconds) after each call
+        # that reached the network (for latency metrics).
+        self.on_response = on_response
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    async def start(self) -> None:
+        """Create the session. Must run inside the event loop; the first request opens it if needed."""
+        if self._session is not None and not self._session.closed:
+            return
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.dns_cache_seconds,
+            keepalive_timeout=self.keepalive_seconds,
+        )
+        headers = {"User-Agent": self.user_agent} if self.user_agent else None
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=self.timeout or aiohttp.ClientTimeout(
+                total=DEFAULT_TOTAL_TIMEOUT, connect=DEFAULT_CONNECT_TIMEOUT
+            ),
+            headers=headers,
+        )
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(
+                self.failure_threshold, self.reset_timeout
+            )
+        return breaker
+
+    async def request_json(self, method: str, url: str, **kwargs) -> Tuple[int, Any]:
+        """
+        Send a request and return (status, decoded JSON body or None).
+
+        Raises CircuitOpenError without touching the network while the host's
+        circuit is open; network errors and timeouts propagate after being
+        counted against the circuit. 5xx responses are returned but also count
+        as failures.
+        """
+        import aiohttp
+
+        host = urlsplit(url).netloc
+        breaker = self.breaker(host)
+        if not breaker.allow():
+            raise CircuitOpenError(url)
+        if self._session is None or self._session.closed:
+            await self.start()
+        start = time.monotonic()
+        try:
+            async with self._session.request(method, url, **kwargs) as resp:
+                status = resp.status
+                try:
+                    data = await resp.json(content_type=None)
+                except ValueError:
+                    data = None
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            breaker.record_failure()
+            self._observe(host, "error", start)
+            raise
+        except BaseException:
+            # Cancelled by the caller: no verdict on the upstream, but a
+            # half-open probe slot must not stay taken.
+            breaker.release()
+            raise
+        if status >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        self._observe(host, "error" if status >= 500 else "ok", start)
+        return status, data
+
+    def _observe(self, host: str, outcome: str, start: float) -> None:
+        if self.on_response is not None:
+            self.on_response(host, outcome, time.monotonic() - start)
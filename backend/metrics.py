@@ -0,0 +1,255 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format (0.0.4).
+
+Dependency-free on purpose, like the rest of the observability here. Most
+updates come from the event loop, but the Mongo command listener
+(db_monitor.py) observes from pymongo's worker threads while a scrape renders
+on the loop. So each child (one per label combination) carries its own lock,
+held for the increment only, and child creation locks the metric. Render
+iterates a snapshot of the children and copies each one under its lock.
+Children are created on first use and then reused, so label values must come
+from a small fixed set — route templates, never raw paths.
+
+    REQUESTS = REGISTRY.histogram("http_request_duration_seconds", "...",
+                                  ("route", "method", "status"))
+    REQUESTS.labels("/api/incidents", "GET", 200).observe(0.012)
+    text = REGISTRY.render()
+"""
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans a cached read (~1 ms) to a slow upstream call.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[object]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}")
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+
+    def _snapshot(self) -> List[Tuple[tuple, object]]:
+        with self._lock:
+            return list(self._children.items())
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class _Value:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment the unlabelled counter."""
+        self.labels().inc(amount)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for values, child in self._snapshot():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # Per-bucket (not cumulative) counts; the last slot is +Inf.
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def read(self) -> Tuple[List[int], float]:
+        """Counts and sum from one consistent moment."""
+        with self.lock:
+            return list(self.counts), self.sum
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        le_names = self.labelnames + ("le",)
+        for values, child in self._snapshot():
+            counts, total = child.read()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(le_names, values + (le,))} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class GaugeCallback(_Metric):
+    """A gauge read at scrape time from `fn() -> [(label values, value), ...]`."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames, fn: Callable[[], Iterable[Tuple[tuple, float]]]):
+        super().__init__(name, help_text, labelnames)
+        self.fn = fn
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for values, value in self.fn():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}")
+        return lines
+
+
+class CacheStats:
+    """Hit/miss counters for one cache, exported as cache_{hits,misses}_total."""
+
+    __slots__ = ("hits", "misses")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._caches: Dict[str, Callable[[], Tuple[int, int]]] = {}
+        self.gauge_callback(
+            "cache_hit_ratio", "Hits / lookups per cache since start.", ("cache",),
+            self._hit_ratios,
+        )
+
+    def _add(self, metric):
+        if any(m.name == metric.name for m in self._metrics):
+            raise ValueError(f"duplicate metric {metric.name}")
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()) -> Counter:
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()) -> Gauge:
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge_callback(self, name, help_text, labelnames, fn) -> GaugeCallback:
+        return self._add(GaugeCallback(name, help_text, labelnames, fn))
+
+    def cache(self, name: str) -> CacheStats:
+        """Counters for a cache this process owns."""
+        stats = CacheStats()
+        self.cache_source(name, lambda: (stats.hits, stats.misses))
+        return stats
+
+    def cache_source(self, name: str, fn: Callable[[], Tuple[int, int]]) -> None:
+        """Export a cache that keeps its own counters: fn() -> (hits, misses)."""
+        self._caches[name] = fn
+
+    def _hit_ratios(self):
+        for name, fn in self._caches.items():
+            hits, misses = fn()
+            yield (name,), round(hits / (hits + misses), 4) if hits + misses else 0.0
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        if self._caches:
+            counts = {name: fn() for name, fn in self._caches.items()}
+            for suffix, index in (("hits", 0), ("misses", 1)):
+                lines.append(f"# HELP cache_{suffix}_total Cache {suffix} since start.")
+                lines.append(f"# TYPE cache_{suffix}_total counter")
+                for name, pair in counts.items():
+                    lines.append(f'cache_{suffix}_total{{cache="{_escape(name)}"}} {pair[index]}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
@@ -0,0 +1,255 @@
+"""
+Versioned data migrations that run in the background after startup.
+
+A Migration is an ordered list of BackfillSteps. Each step selects documents
+that still need work with a filter, and computes a `$set` for each one. The
+runner works through a step in `_id` order:
+
+- It reads one batch (BATCH_SIZE, default 1000) past the last `_id` seen.
+- It applies the batch with a single unordered `bulk_write`.
+- It records a checkpoint (step, last `_id`, progress) in `db.migrations`.
+
+A crash or redeploy therefore resumes from the last checkpoint instead of
+starting over. Transforms must be idempotent: a batch can be applied twice if
+the process dies between the write and the checkpoint.
+
+The app keeps serving while this runs, so read paths must handle both the old
+and new shape until `is_complete()` says otherwise (see the shims in
+server.py). With several workers or instances, a lease on the checkpoint
+document lets only one of them do the work. The rest poll until it is done.
+A worker that stalls past its lease can find it taken over: its next
+checkpoint matches nothing, so it stops and goes back to polling rather than
+backfilling the same step alongside the new owner.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+# Pause between batches so a backfill never monopolises the database.
+BATCH_PAUSE_SECONDS = 0.05
+LEASE_SECONDS = 60
+# How often a worker that doesn't hold the lease checks for completion.
+POLL_SECONDS = 30
+
+
+class LeaseLost(Exception):
+    """Another worker took over the migration's lease."""
+
+
+@dataclass
+class BackfillStep:
+    """
+    `transform(doc)` returns the fields to `$set` on one document, or None to
+    leave it alone. Documents are read with `projection` (`_id` is always
+    included).
+    """
+
+    collection: str
+    filter: dict
+    transform: Callable[[dict], Optional[dict]]
+    projection: Optional[dict] = None
+
+
+@dataclass
+class Migration:
+    id: str
+    version: int
+    description: str
+    steps: List[BackfillStep] = field(default_factory=list)
+
+
+class MigrationRunner:
+    def __init__(
+        self,
+        db,
+        migrations: List[Migration],
+        batch_size: int = BATCH_SIZE,
+        pause: float = BATCH_PAUSE_SECONDS,
+        lease_seconds: float = LEASE_SECONDS,
+        poll_seconds: float = POLL_SECONDS,
+    ) -> None:
+        self.db = db
+        self.migrations = sorted(migrations, key=lambda m: m.version)
+        self.batch_size = batch_size
+        self.pause = pause
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._done: set = set()
+        self._progress: Dict[str, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    # ── state ────────────────────────────────────────────────────────────────
+    def is_complete(self, migration_id: str) -> bool:
+        return migration_id in self._done
+
+    def status(self) -> List[dict]:
+        return [
+            {
+                "id": m.id,
+                "version": m.version,
+                "description": m.description,
+                "complete": m.id in self._done,
+                **self._progress.get(m.id, {}),
+            }
+            for m in self.migrations
+        ]
+
+    # ── lifecycle ────────────────────────────────────────────────────────────
+    def start(self) -> asyncio.Task:
+        """Run pending migrations in a background task (call from startup)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_pending())
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def run_pending(self) -> None:
+        for migration in self.migrations:
+            try:
+                await self._run(migration)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Later migrations may depend on this one; stop here and retry
+                # on the next start (resuming from the checkpoint).
+                logger.exception("Migration %s failed", migration.id)
+                return
+
+    # ── one migration ────────────────────────────────────────────────────────
+    @staticmethod
+    def _finished(doc: Optional[dict]) -> bool:
+        # Markers written before this framework only carry applied_at.
+        return bool(doc) and (doc.get("status") == "done" or (
+            "applied_at" in doc and "status" not in doc
+        ))
+
+    async def _acquire(self, migration: Migration) -> Optional[dict]:
+        """Take (or renew) the lease; None while another worker holds it."""
+        now = datetime.now(timezone.utc)
+        try:
+            return await self.db.migrations.find_one_and_update(
+                {
+                    "_id": migration.id,
+                    "status": {"$ne": "done"},
+                    "$or": [
+                        {"lease_owner": self.owner},
+                        {"lease_until": {"$lt": now}},
+                        {"lease_until": {"$exists": False}},
+                    ],
+                },
+                {
+                    "$set": {
+                        "lease_owner": self.owner,
+                        "lease_until": now + timedelta(seconds=self.lease_seconds),
+                        "version": migration.version,
+                        "description": migration.description,
+                    },
+                    "$setOnInsert": {"status": "running", "step": 0, "last_id": None,
+                                     "processed": 0, "started_at": now},
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # The document exists but didn't match: leased elsewhere (or done).
+            return None
+
+    async def _run(self, migration: Migration) -> None:
+        while True:
+            marker = await self.db.migrations.find_one({"_id": migration.id})
+            if self._finished(marker):
+                self._done.add(migration.id)
+                return
+            state = await self._acquire(migration)
+            if state is not None:
+                try:
+                    await self._apply(migration, state)
+                    return
+                except LeaseLost:
+                    logger.warning(
+                        "Migration %s: lease lost to another worker; stopped backfilling",
+                        migration.id,
+                    )
+            await asyncio.sleep(self.poll_seconds)
+
+    async def _apply(self, migration: Migration, state: dict) -> None:
+        logger.info(
+            "Migration %s: %s (resuming at step %d, %d done)",
+            migration.id, migration.description, state["step"], state["processed"],
+        )
+        step_index, last_id, processed = state["step"], state["last_id"], state["processed"]
+        while step_index < len(migration.steps):
+            step = migration.steps[step_index]
+            last_id, processed = await self._run_step(migration, step_index, step, last_id, processed)
+            step_index, last_id = step_index + 1, None
+            await self._checkpoint(migration, step_index, None, processed)
+
+        now = datetime.now(timezone.utc)
+        result = await self.db.migrations.update_one(
+            {"_id": migration.id, "lease_owner": self.owner},
+            {"$set": {"status": "done", "applied_at": now, "processed": processed},
+             "$unset": {"lease_owner": "", "lease_until": ""}},
+        )
+        if result.matched_count == 0:
+            raise LeaseLost(migration.id)
+        self._done.add(migration.id)
+        self._progress[migration.id] = {"processed": processed}
+        logger.info("Applied migration %s (%d documents updated)", migration.id, processed)
+
+    async def _run_step(self, migration, step_index, step: BackfillStep, last_id, processed):
+        coll = self.db[step.collection]
+        while True:
+            query = dict(step.filter)
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            cursor = coll.find(query, step.projection).sort("_id", 1).limit(self.batch_size)
+            batch = await cursor.to_list(self.batch_size)
+            if not batch:
+                return last_id, processed
+            ops = []
+            for doc in batch:
+                changes = step.transform(doc)
+                if changes:
+                    ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": changes}))
+            if ops:
+                await coll.bulk_write(ops, ordered=False)
+            processed += len(ops)
+            last_id = batch[-1]["_id"]
+            await self._checkpoint(migration, step_index, last_id, processed)
+            if len(batch) < self.batch_size:
+                return last_id, processed
+            if self.pause:
+                await asyncio.sleep(self.pause)
+
+    async def _checkpoint(self, migration, step_index, last_id, processed) -> None:
+        """Record progress and renew the lease; LeaseLost if it is no longer ours."""
+        result = await self.db.migrations.update_one(
+            {"_id": migration.id, "lease_owner": self.owner},
+            {"$set": {
+                "step": step_index,
+                "last_id": last_id,
+                "processed": processed,
+                "updated_at": datetime.now(timezone.utc),
+                "lease_until": datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds),
+            }},
+        )
+        if result.matched_count == 0:
+            raise LeaseLost(migration.id)
+        self._progress[migration.id] = {"step": step_index, "processed": processed}
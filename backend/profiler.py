@@ -0,0 +1,91 @@
+"""
+On-demand request profiling for admins.
+
+A request opts in with `X-Profile: 1` (or `?_profile=1`) plus an admin Bearer
+token. It then runs under cProfile, and the result lands in a small in-memory
+ring that /api/admin/profiles lists and serves, as a pstats text report or as
+a raw .prof file for snakeviz or `python -m pstats`. Requests that don't opt
+in never reach this module.
+
+cProfile is deterministic and profiles the whole thread. While a profiled
+request is awaiting, frames from other requests on the same event loop are
+recorded too, so profile on a quiet worker when possible. Only one profile
+runs at a time.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional
+
+DEFAULT_MAX_PROFILES = 20
+# Rows of the text report, by cumulative time.
+DEFAULT_REPORT_LINES = 60
+
+
+class ProfilerBusy(Exception):
+    """Another request is already being profiled."""
+
+
+class ProfileStore:
+    def __init__(self, max_profiles: int = DEFAULT_MAX_PROFILES, report_lines: int = DEFAULT_REPORT_LINES):
+        self.max_profiles = max_profiles
+        self.report_lines = report_lines
+        self.active = False
+        self._profiles: "OrderedDict[str, dict]" = OrderedDict()
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex[:12]
+
+    async def run(self, profile_id: str, meta: dict, call: Callable[[], Awaitable[None]]) -> None:
+        """
+        Await `call()` under cProfile and keep the result as `profile_id`.
+        `meta` (method, path, status, ...) is read once the call has finished,
+        so the caller can fill in the status as the response goes out.
+        """
+        if self.active:
+            raise ProfilerBusy()
+        self.active = True
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await call()
+        finally:
+            profiler.disable()
+            self.active = False
+            self._store(profile_id, meta, profiler, (time.perf_counter() - start) * 1000)
+
+    def _store(self, profile_id: str, meta: dict, profiler: cProfile.Profile, elapsed_ms: float) -> None:
+        report = io.StringIO()
+        stats = pstats.Stats(profiler, stream=report)
+        stats.sort_stats("cumulative").print_stats(self.report_lines)
+        profiler.create_stats()
+        self._profiles[profile_id] = {
+            "id": profile_id,
+            **meta,
+            "elapsed_ms": round(elapsed_ms, 1),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "text": report.getvalue(),
+            "pstats": marshal.dumps(profiler.stats),
+        }
+        while len(self._profiles) > self.max_profiles:
+            self._profiles.popitem(last=False)
+
+    def list(self) -> List[dict]:
+        """Newest first, without the report bodies."""
+        return [
+            {k: v for k, v in p.items() if k not in ("text", "pstats")}
+            for p in reversed(self._profiles.values())
+        ]
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        return self._profiles.get(profile_id)
+
+    def clear(self) -> None:
+        self._profiles.clear()
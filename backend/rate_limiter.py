@@ -0,0 +1,421 @@
+"""
+Rate limiting backends.
+
+Every backend implements the same small interface used by `rate_limit()` in
+server.py:
+
+    wait = await limiter.acquire(key, limit, window)   # 0.0 → allowed
+
+plus `clear()` (tests reset limits between cases). Three implementations:
+
+- `GcraRateLimiter` — per-process, in memory (the default; one worker).
+- `SharedMemoryRateLimiter` — the same table in a named shared-memory segment,
+  so every uvicorn worker on one host enforces one combined limit.
+- `MongoRateLimiter` — time-bucketed counters in MongoDB (atomic `$inc`, TTL
+  expiry), shared by every instance of the app.
+
+GCRA (the "generic cell rate algorithm", equivalent to a token bucket) needs a
+single number per key: the theoretical arrival time (TAT) of the next request.
+A key may burst up to `limit` requests, after which it earns one request back
+every `window / limit` seconds.
+
+The GCRA state lives in two preallocated arrays used as an open-addressing hash
+table (64-bit key fingerprint + TAT, 16 bytes per slot), so memory is fixed at
+startup no matter how many distinct IPs show up. Eviction is implicit: a slot
+whose TAT has passed holds no information (the key would be allowed a full
+burst anyway), so it is reused on demand. Only when every slot in a key's probe
+window is still "owed" time does the limiter evict, taking the slot that will
+go idle soonest (an approximate LRU).
+
+The shared backends don't consult the shared store on every request. A worker
+*leases* a slice of a key's allowance (`lease_fraction` of the limit) and hands
+it out locally, and caches a rejection until its retry time. Leased tokens are
+already counted in the shared store, so leasing can only under-admit (an unused
+lease lapses), never let a client past its limit.
+
+In-process state is only touched synchronously between awaits, so calls from
+the asyncio event loop need no lock.
+"""
+import hashlib
+import logging
+import math
+import os
+import tempfile
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Hashable, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_KEYS = 1 << 18
+PROBE_WINDOW = 8
+DEFAULT_LEASE_FRACTION = 0.1
+DEFAULT_LEASE_TTL_SECONDS = 1.0
+MAX_LOCAL_ENTRIES = 1 << 16
+
+
+def _capacity_for(max_keys: int) -> int:
+    return 1 << max(PROBE_WINDOW.bit_length(), (max(1, max_keys) - 1).bit_length())
+
+
+def _stable_fingerprint(key: Hashable) -> int:
+    """64-bit key hash that is the same in every process (unlike hash())."""
+    raw = "\x00".join(map(str, key)) if isinstance(key, tuple) else str(key)
+    digest = hashlib.blake2b(raw.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True) or 1
+
+
+class GcraRateLimiter:
+    """In-process GCRA limiter over a fixed-size table."""
+
+    def __init__(
+        self,
+        max_keys: int = DEFAULT_MAX_KEYS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.capacity = _capacity_for(max_keys)
+        self._mask = self.capacity - 1
+        self._clock = clock
+        self.evictions = 0
+        self._allocate()
+
+    def _allocate(self) -> None:
+        # PROBE_WINDOW spare slots past the end let a probe run on from the
+        # last home slot without wrapping around.
+        slots = self.capacity + PROBE_WINDOW
+        self._fps = array("q", bytes(8 * slots))
+        self._tats = array("d", bytes(8 * slots))
+
+    def clear(self) -> None:
+        """Forget every key (tests reset limits between cases)."""
+        self._allocate()
+        self.evictions = 0
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._fps.itemsize * len(self._fps) + self._tats.itemsize * len(self._tats)
+
+    def active_keys(self, now: float = None) -> int:
+        """Keys still carrying state (O(capacity); for stats, not the hot path)."""
+        now = self._clock() if now is None else now
+        return sum(1 for fp, tat in zip(self._fps, self._tats) if fp and tat > now)
+
+    def _fingerprint(self, key: Hashable) -> int:
+        return hash(key) or 1  # 0 marks an empty slot
+
+    def _take(self, fp: int, limit: int, window: float, want: int, now: float) -> Tuple[int, float]:
+        fps, tats = self._fps, self._tats
+        base = fp & self._mask
+
+        slot = free = victim = -1
+        if fps[base] == fp:
+            slot = base  # fast path: a returning key in its home slot
+        else:
+            victim_tat = math.inf
+            for j in range(base, base + PROBE_WINDOW):
+                occupant = fps[j]
+                if occupant == fp:
+                    slot = j
+                    break
+                if free < 0:
+                    tat = tats[j]
+                    if occupant == 0 or tat <= now:
+                        free = j
+                    elif tat < victim_tat:
+                        victim, victim_tat = j, tat
+
+        interval = window / limit
+        if slot >= 0:
+            tat = tats[slot]
+            if tat < now:
+                tat = now
+        else:
+            if free < 0:
+                free = victim
+                self.evictions += 1
+            slot = free
+            fps[slot] = fp
+            tat = now
+
+        # Requests the key may make right now. The epsilon keeps float rounding
+        # (e.g. 7 x 60/7) from costing a request.
+        available = int((now + window - tat) / interval + 1e-9)
+        if available <= 0:
+            return 0, tat + interval - window - now
+        granted = want if want < available else available
+        tats[slot] = tat + granted * interval
+        return granted, 0.0
+
+    def take(
+        self, key: Hashable, limit: int, window: float, want: int = 1, now: float = None
+    ) -> Tuple[int, float]:
+        """
+        Take up to `want` requests from `key`'s allowance. Returns
+        (granted, wait); wait is 0.0 when anything was granted, otherwise the
+        seconds until the key may make its next request.
+        """
+        now = self._clock() if now is None else now
+        return self._take(self._fingerprint(key), limit, window, want, now)
+
+    def hit(self, key: Hashable, limit: int, window: float, now: float = None) -> float:
+        """
+        Record a request for `key` against `limit` per `window` seconds.
+        Returns 0.0 when allowed, otherwise the seconds until the next request
+        would be allowed (the request is not counted).
+        """
+        return self.take(key, limit, window, 1, now)[1]
+
+    async def acquire(self, key: Hashable, limit: int, window: float) -> float:
+        return self.hit(key, limit, window)
+
+    def close(self) -> None:
+        pass
+
+
+class _LocalLeases:
+    """
+    Per-worker cache in front of a shared backend: leased requests still to
+    hand out and rejections still in force, per key. Bounded LRU.
+    """
+
+    def __init__(
+        self,
+        lease_fraction: float = DEFAULT_LEASE_FRACTION,
+        lease_ttl: float = DEFAULT_LEASE_TTL_SECONDS,
+        max_keys: int = MAX_LOCAL_ENTRIES,
+    ) -> None:
+        self.lease_fraction = lease_fraction
+        self.lease_ttl = lease_ttl
+        self.max_keys = max_keys
+        # key → [requests left, lease expires at, blocked until]
+        self._entries: "OrderedDict[Hashable, list]" = OrderedDict()
+        self.local_decisions = 0
+        self.remote_decisions = 0
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def lease_size(self, limit: int) -> int:
+        return max(1, int(limit * self.lease_fraction))
+
+    def try_local(self, key: Hashable, now: float) -> Optional[float]:
+        """0.0 or a wait if this worker can decide alone; None to ask the store."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] > now:
+            self.local_decisions += 1
+            return entry[2] - now
+        if entry[0] > 0 and entry[1] > now:
+            entry[0] -= 1
+            self.local_decisions += 1
+            return 0.0
+        return None
+
+    def record(self, key: Hashable, granted: int, wait: float, now: float) -> None:
+        """Remember the store's answer; one granted request is used right away."""
+        self.remote_decisions += 1
+        if granted:
+            self._entries[key] = [granted - 1, now + self.lease_ttl, 0.0]
+        else:
+            self._entries[key] = [0, 0.0, now + wait]
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+
+
+class SharedMemoryRateLimiter(GcraRateLimiter):
+    """
+    GCRA table in a named shared-memory segment, so all uvicorn workers on one
+    host share one set of limits. An update locks only the key's probe window
+    (an fcntl byte-range lock on a sidecar file), so workers contend only when
+    they touch the same slots. POSIX only.
+    """
+
+    def __init__(
+        self,
+        name: str = "community-map-ratelimit",
+        max_keys: int = DEFAULT_MAX_KEYS,
+        lease_fraction: float = DEFAULT_LEASE_FRACTION,
+        lease_ttl: float = DEFAULT_LEASE_TTL_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        import fcntl
+        from multiprocessing import resource_tracker, shared_memory
+
+        self._fcntl = fcntl
+        self.capacity = _capacity_for(max_keys)
+        self._mask = self.capacity - 1
+        # Wall clock, not monotonic: TATs are compared across processes.
+        self._clock = clock
+        self.evictions = 0
+        self.leases = _LocalLeases(lease_fraction, lease_ttl)
+
+        # The capacity is part of the name so a resized deploy never attaches
+        # to a segment with a different layout.
+        self.segment_name = f"{name}-{self.capacity}"
+        slots = self.capacity + PROBE_WINDOW
+        try:
+            self._shm = shared_memory.SharedMemory(self.segment_name, create=True, size=16 * slots)
+        except FileExistsError:
+            self._shm = shared_memory.SharedMemory(self.segment_name)
+        # The segment must outlive any one worker, so don't let this process's
+        # resource tracker unlink it on exit.
+        try:
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+        except Exception:
+            pass
+        buf = self._shm.buf
+        self._fps = buf[: 8 * slots].cast("q")
+        self._tats = buf[8 * slots: 16 * slots].cast("d")
+        self._lock_file = open(
+            os.path.join(tempfile.gettempdir(), self.segment_name + ".lock"), "a+b"
+        )
+
+    def _allocate(self) -> None:
+        # Zero in place: other workers hold views of the same segment.
+        size = 16 * len(self._fps)
+        self._shm.buf[:size] = bytes(size)
+
+    def clear(self) -> None:
+        super().clear()
+        self.leases.clear()
+
+    @property
+    def memory_bytes(self) -> int:
+        return 16 * len(self._fps)
+
+    def _fingerprint(self, key: Hashable) -> int:
+        return _stable_fingerprint(key)
+
+    def take(
+        self, key: Hashable, limit: int, window: float, want: int = 1, now: float = None
+    ) -> Tuple[int, float]:
+        fp = self._fingerprint(key)
+        start = fp & self._mask
+        fd = self._lock_file.fileno()
+        self._fcntl.lockf(fd, self._fcntl.LOCK_EX, PROBE_WINDOW, start)
+        try:
+            now = self._clock() if now is None else now
+            return self._take(fp, limit, window, want, now)
+        finally:
+            self._fcntl.lockf(fd, self._fcntl.LOCK_UN, PROBE_WINDOW, start)
+
+    async def acquire(self, key: Hashable, limit: int, window: float) -> float:
+        now = self._clock()
+        local = self.leases.try_local(key, now)
+        if local is not None:
+            return local
+        granted, wait = self.take(key, limit, window, self.leases.lease_size(limit), now)
+        self.leases.record(key, granted, wait, now)
+        return wait
+
+    def close(self) -> None:
+        self._fps.release()
+        self._tats.release()
+        self._shm.close()
+        self._lock_file.close()
+
+
+class MongoRateLimiter:
+    """
+    Sliding-window counters in MongoDB, shared by every instance.
+
+    Each (key, window) gets one document per fixed time bucket, bumped with an
+    atomic upsert `$inc` and expired by a TTL index on `expires_at`. The limit
+    is checked against the current bucket plus the previous one weighted by how
+    much of it still overlaps the sliding window. The previous bucket is
+    closed, so its count is read once and cached.
+
+    If Mongo is unreachable the limiter falls back to in-process limits rather
+    than failing every request.
+    """
+
+    def __init__(
+        self,
+        collection,
+        lease_fraction: float = DEFAULT_LEASE_FRACTION,
+        lease_ttl: float = DEFAULT_LEASE_TTL_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._coll = collection
+        self._clock = clock
+        self.leases = _LocalLeases(lease_fraction, lease_ttl)
+        self._closed_buckets: "OrderedDict[str, int]" = OrderedDict()
+        self._fallback = GcraRateLimiter()
+
+    def clear(self) -> None:
+        self.leases.clear()
+        self._closed_buckets.clear()
+        self._fallback.clear()
+
+    def close(self) -> None:
+        pass
+
+    @staticmethod
+    def _bucket_id(key: Hashable, window: float, bucket: int) -> str:
+        parts = key if isinstance(key, tuple) else (key,)
+        return "|".join(map(str, parts)) + f"|{window:g}|{bucket}"
+
+    async def _previous_count(self, bucket_id: str) -> int:
+        count = self._closed_buckets.get(bucket_id)
+        if count is None:
+            doc = await self._coll.find_one({"_id": bucket_id}, {"n": 1})
+            count = int(doc.get("n", 0)) if doc else 0
+            self._closed_buckets[bucket_id] = count
+            while len(self._closed_buckets) > MAX_LOCAL_ENTRIES:
+                self._closed_buckets.popitem(last=False)
+        return count
+
+    async def take(
+        self, key: Hashable, limit: int, window: float, want: int = 1, now: float = None
+    ) -> Tuple[int, float]:
+        """Same contract as GcraRateLimiter.take, against the shared counters."""
+        now = self._clock() if now is None else now
+        bucket = int(now // window)
+        start = bucket * window
+        bucket_id = self._bucket_id(key, window, bucket)
+        doc = await self._coll.find_one_and_update(
+            {"_id": bucket_id},
+            {
+                "$inc": {"n": want},
+                "$setOnInsert": {
+                    "expires_at": datetime.fromtimestamp(start + 2 * window, timezone.utc)
+                },
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+            projection={"n": 1},
+        )
+        used = int(doc["n"]) - want  # this bucket, before this call
+        previous = await self._previous_count(self._bucket_id(key, window, bucket - 1))
+        weight = 1.0 - (now - start) / window
+        available = int(limit - used - previous * weight + 1e-9)
+        granted = max(0, min(want, available))
+        if granted < want:
+            # Hand back what wasn't granted so the shared count stays honest.
+            await self._coll.update_one({"_id": bucket_id}, {"$inc": {"n": granted - want}})
+        if granted:
+            return granted, 0.0
+        if used + 1 > limit or previous <= 0:
+            return 0, max(0.01, start + window - now)
+        # The previous bucket's weight has to decay enough for one more request.
+        ready_at = start + window * (1.0 - (limit - 1 - used) / previous)
+        return 0, max(0.01, ready_at - now)
+
+    async def acquire(self, key: Hashable, limit: int, window: float) -> float:
+        now = self._clock()
+        local = self.leases.try_local(key, now)
+        if local is not None:
+            return local
+        try:
+            granted, wait = await self.take(key, limit, window, self.leases.lease_size(limit), now)
+        except Exception as e:
+            logger.warning("Rate-limit store unavailable, limiting in-process: %s", e)
+            return self._fallback.hit(key, limit, window)
+        self.leases.record(key, granted, wait, now)
+        return wait
@@ -0,0 +1,301 @@
+"""
+In-memory full-text search over incidents, street notes and chat messages.
+
+A token-level inverted index (token → {doc: term frequency}) plus a sorted
+vocabulary for prefix ("autocomplete") lookups. It is kept in process memory and
+updated incrementally by the write handlers in server.py, so a search never
+scans Mongo. Documents carry their own expiry, mirroring the TTL indexes: an
+expired document is skipped at query time and swept out of the postings by
+`expire()`, so the index never outlives the data it points at.
+
+Like the in-memory rate limiter this is per-process state. It is rebuilt from
+Mongo on startup, which keeps a single-instance deployment exact.
+"""
+import bisect
+import heapq
+import math
+import re
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# (kind, id) — kind is the public target type ("incident", "street_note",
+# "chat_message"), matching REPORT_TARGET_COLLECTIONS in server.py.
+DocKey = Tuple[str, str]
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Words too common to help ranking. Kept deliberately tiny: notes are short and
+# users search for things like "no parking" where aggressive stop-wording hurts.
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "at", "be", "by", "for", "in", "is", "it", "of",
+    "on", "or", "the", "to", "was", "with",
+})
+
+MAX_QUERY_TERMS = 8
+# Cap on vocabulary terms a single prefix may expand to in a search, so a
+# one-letter prefix can't fan out over the whole vocabulary. suggest() ranks
+# the whole prefix range instead.
+MAX_PREFIX_EXPANSIONS = 64
+# BM25 parameters (standard defaults).
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Prefix matches score a little below an exact whole-word match.
+PREFIX_WEIGHT = 0.7
+
+
+def _fold(text: str) -> str:
+    """Lowercase and strip accents so "Café" matches "cafe"."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into folded search tokens, dropping stopwords."""
+    if not text:
+        return []
+    return [t for t in _TOKEN_RE.findall(_fold(text)) if t not in STOPWORDS]
+
+
+class _Doc:
+    __slots__ = ("kind", "id", "text", "lat", "lng", "created", "expires", "length", "terms")
+
+    def __init__(self, kind, doc_id, text, lat, lng, created, expires, terms):
+        self.kind = kind
+        self.id = doc_id
+        self.text = text
+        self.lat = lat
+        self.lng = lng
+        self.created = created
+        self.expires = expires
+        self.terms: Dict[str, int] = terms
+        self.length = sum(terms.values())
+
+
+class SearchIndex:
+    """Inverted index with BM25 ranking, prefix expansion and per-doc expiry."""
+
+    def __init__(self) -> None:
+        self._docs: Dict[DocKey, _Doc] = {}
+        self._postings: Dict[str, Dict[DocKey, int]] = {}
+        self._vocab: List[str] = []  # sorted, for prefix range scans
+        self._expiry_heap: List[Tuple[float, DocKey]] = []
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, key: DocKey) -> bool:
+        return key in self._docs
+
+    def clear(self) -> None:
+        self.__init__()
+
+    # ── Writes ───────────────────────────────────────────────────────────────
+    def add(
+        self,
+        kind: str,
+        doc_id: str,
+        text: str,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        created_at: Optional[float] = None,
+        expires_at: Optional[float] = None,
+    ) -> None:
+        """
+        Index (or re-index) a document. `created_at` / `expires_at` are epoch
+        seconds; `expires_at=None` means the document never expires (forever
+        notes, pinned chat).
+        """
+        key = (kind, doc_id)
+        if key in self._docs:
+            self.remove(kind, doc_id)
+        terms: Dict[str, int] = {}
+        for tok in tokenize(text):
+            terms[tok] = terms.get(tok, 0) + 1
+        doc = _Doc(
+            kind, doc_id, text or "", latitude, longitude,
+            created_at if created_at is not None else time.time(),
+            expires_at, terms,
+        )
+        self._docs[key] = doc
+        self._total_length += doc.length
+        for tok, tf in terms.items():
+            posting = self._postings.get(tok)
+            if posting is None:
+                posting = self._postings[tok] = {}
+                bisect.insort(self._vocab, tok)
+            posting[key] = tf
+        if expires_at is not None:
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+
+    def remove(self, kind: str, doc_id: str) -> bool:
+        """Drop a document from the index. Returns False if it wasn't indexed."""
+        key = (kind, doc_id)
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return False
+        self._total_length -= doc.length
+        for tok in doc.terms:
+            posting = self._postings.get(tok)
+            if posting is None:
+                continue
+            posting.pop(key, None)
+            if not posting:
+                del self._postings[tok]
+                i = bisect.bisect_left(self._vocab, tok)
+                if i < len(self._vocab) and self._vocab[i] == tok:
+                    del self._vocab[i]
+        # Stale heap entries are discarded lazily by expire().
+        return True
+
+    def set_expiry(self, kind: str, doc_id: str, expires_at: Optional[float]) -> None:
+        """Change a document's expiry in place (e.g. chat pin / unpin)."""
+        doc = self._docs.get((kind, doc_id))
+        if doc is None:
+            return
+        doc.expires = expires_at
+        if expires_at is not None:
+            heapq.heappush(self._expiry_heap, (expires_at, (kind, doc_id)))
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Remove every document whose expiry has passed. Returns the count."""
+        now = time.time() if now is None else now
+        removed = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            _, key = heapq.heappop(heap)
+            doc = self._docs.get(key)
+            # Skip stale entries: the doc was removed, re-added or re-expired.
+            if doc is None or doc.expires is None or doc.expires > now:
+                continue
+            self.remove(*key)
+            removed += 1
+        return removed
+
+    # ── Reads ────────────────────────────────────────────────────────────────
+    def _prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """The slice of the sorted vocabulary holding every term that starts with `prefix`."""
+        lo = bisect.bisect_left(self._vocab, prefix)
+        # The first string past every prefix+suffix: bump the last character.
+        hi = bisect.bisect_left(self._vocab, prefix[:-1] + chr(ord(prefix[-1]) + 1), lo)
+        return lo, hi
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        lo, hi = self._prefix_range(prefix)
+        return self._vocab[lo:min(hi, lo + MAX_PREFIX_EXPANSIONS)]
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[str]:
+        """Vocabulary completions for `prefix`, most frequent first (ties alphabetical)."""
+        folded = tokenize(prefix)
+        if not folded:
+            return []
+        lo, hi = self._prefix_range(folded[-1])
+        return heapq.nlargest(limit, self._vocab[lo:hi], key=lambda t: len(self._postings[t]))
+
+    def search(
+        self,
+        query: str,
+        kinds: Optional[Iterable[str]] = None,
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+        limit: int = 20,
+        prefix: bool = True,
+        now: Optional[float] = None,
+    ) -> List[dict]:
+        """
+        Ranked conjunctive search: every query term must match. With `prefix`
+        the last term also matches any vocabulary word it starts ("do" → "dog"),
+        which is what an autocomplete box sends while the user is typing.
+
+        `bbox` is (min_lat, min_lng, max_lat, max_lng); documents without a
+        location (chat) never match a bbox-constrained search.
+        """
+        terms = tokenize(query)[:MAX_QUERY_TERMS]
+        if not terms or not self._docs:
+            return []
+        now = time.time() if now is None else now
+        kinds = set(kinds) if kinds else None
+
+        # Each query term becomes a group of (vocab term, weight) alternatives.
+        groups: List[List[Tuple[str, float]]] = []
+        for i, term in enumerate(terms):
+            alts: Dict[str, float] = {}
+            if term in self._postings:
+                alts[term] = 1.0
+            if prefix and i == len(terms) - 1:
+                for t in self._prefix_terms(term):
+                    alts.setdefault(t, PREFIX_WEIGHT)
+            if not alts:
+                return []
+            groups.append(list(alts.items()))
+
+        # Intersect the groups, smallest first, to get the candidate set.
+        def _group_docs(group):
+            if len(group) == 1:
+                return self._postings[group[0][0]].keys()
+            keys = set()
+            for t, _ in group:
+                keys.update(self._postings[t])
+            return keys
+
+        ordered = sorted(groups, key=lambda g: sum(len(self._postings[t]) for t, _ in g))
+        candidates = set(_group_docs(ordered[0]))
+        for group in ordered[1:]:
+            if not candidates:
+                return []
+            candidates.intersection_update(_group_docs(group))
+
+        docs = self._docs
+        n_docs = len(docs)
+        avg_len = (self._total_length / n_docs) or 1.0
+        k1, b = BM25_K1, BM25_B
+        # Per query-term group: (posting, BM25 weight) for each alternative, with
+        # the IDF and (k1 + 1) factors folded in up front.
+        weighted = []
+        for group in groups:
+            alts = []
+            for t, weight in group:
+                posting = self._postings[t]
+                df = len(posting)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                alts.append((posting, weight * idf * (k1 + 1)))
+            weighted.append(alts)
+
+        scored = []
+        for key in candidates:
+            doc = docs[key]
+            if doc.expires is not None and doc.expires <= now:
+                continue
+            if kinds is not None and doc.kind not in kinds:
+                continue
+            if bbox is not None:
+                if doc.lat is None or doc.lng is None:
+                    continue
+                if not (bbox[0] <= doc.lat <= bbox[2] and bbox[1] <= doc.lng <= bbox[3]):
+                    continue
+            norm = k1 * (1 - b + b * doc.length / avg_len)
+            score = 0.0
+            for alts in weighted:
+                # A term group contributes its best-matching alternative.
+                best = 0.0
+                for posting, w in alts:
+                    tf = posting.get(key)
+                    if tf:
+                        s = w * tf / (tf + norm)
+                        if s > best:
+                            best = s
+                score += best
+            scored.append((score, doc.created, doc))
+
+        top = heapq.nlargest(limit, scored, key=lambda x: (x[0], x[1]))
+        return [
+            {
+                "type": doc.kind,
+                "id": doc.id,
+                "text": doc.text,
+                "latitude": doc.lat,
+                "longitude": doc.lng,
+                "score": round(score, 4),
+            }
+            for score, _, doc in top
+        ]
@@ -1,37 +1,113 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request
+# Imported first: the start of the startup timing report (see log_startup_report).
+from startup_clock import STARTED as _IMPORT_STARTED
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
-from starlette.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse
-from motor.motor_asyncio import AsyncIOMotorClient
-import aiohttp
+from starlette.responses import JSONResponse, Response
+from pymongo import DeleteOne, IndexModel, UpdateOne
+from pymongo.read_preferences import Primary, SecondaryPreferred
+import asyncio
+import time
 import os
 import hashlib
 import hmac
+import json
 import logging
+import re
 import secrets
-import time
-import threading
-from collections import defaultdict, deque
+from collections import OrderedDict, defaultdict
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, field_validator
-from typing import List, Optional, Deque, Dict, Tuple
+from typing import List, Optional, Dict, Tuple
+from urllib.parse import parse_qs
 import uuid
 from datetime import datetime, timezone, timedelta
 import math
-import jwt
+import functools
+import importlib
+
+import compression
+import feed_format
+from compression import CompressionMiddleware
+from db_monitor import DbCommandListener, track_request
+from gazetteer import Gazetteer
+from geocoder import GeocodeCache, GeocodeUnavailable
+from http_client import CircuitOpenError, HttpClient
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY
+from migrations import BackfillStep, Migration, MigrationRunner
+from profiler import ProfilerBusy, ProfileStore
+from rate_limiter import GcraRateLimiter, MongoRateLimiter, SharedMemoryRateLimiter
+from search_index import SearchIndex
+from storage import BACKENDS as STORAGE_BACKENDS, open_client
+
+_IMPORTS_DONE = time.perf_counter()
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection. tz_aware=True makes all dates read back as timezone-aware
-# UTC datetimes (BSON dates are naive by default), so comparisons against
-# datetime.now(timezone.utc) and ISO serialization stay correct.
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+# Storage: MongoDB (default), or STORAGE_BACKEND=memory for an in-process store
+# with the same query semantics and no persistence, used by the tests and the
+# benchmarks (see storage.py). tz_aware=True makes all dates read back as
+# timezone-aware UTC datetimes (BSON dates are naive by default), so comparisons
+# against datetime.now(timezone.utc) and ISO serialization stay correct.
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "mongo").strip().lower()
+if STORAGE_BACKEND not in STORAGE_BACKENDS:
+    raise RuntimeError(
+        f"STORAGE_BACKEND must be one of {', '.join(STORAGE_BACKENDS)}, not {STORAGE_BACKEND!r}"
+    )
+# The memory store needs no URL. Without one, nothing below derives a secret
+# from it (see IDENTITY_SALT).
+mongo_url = os.environ['MONGO_URL'] if STORAGE_BACKEND == "mongo" else os.environ.get('MONGO_URL', '')
+# Every command is timed per collection/command (exported on /metrics) and per
+# request; commands slower than DB_SLOW_COMMAND_MS are logged with their filter
+# shape (values redacted). See db_monitor.py.
+DB_SLOW_COMMAND_MS = float(os.environ.get("DB_SLOW_COMMAND_MS", "100"))
+_db_listener = DbCommandListener(
+    REGISTRY.histogram(
+        "mongodb_command_duration_seconds",
+        "MongoDB command latency by collection and command.",
+        ("collection", "command"),
+    ),
+    slow_ms=DB_SLOW_COMMAND_MS,
+)
+# Pool sizing and wire compression. Compressors are tried in order and the
+# first one the server also supports wins. "zlib" needs nothing extra; zstd and
+# snappy need the zstandard / python-snappy packages, which requirements.txt
+# does not install. Empty = uncompressed.
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_COMPRESSORS = os.environ.get("MONGO_COMPRESSORS", "").strip()
+_mongo_options: Dict[str, object] = {
+    "maxPoolSize": MONGO_MAX_POOL_SIZE,
+    "minPoolSize": MONGO_MIN_POOL_SIZE,
+}
+if MONGO_COMPRESSORS:
+    _mongo_options["compressors"] = MONGO_COMPRESSORS
+client = open_client(
+    STORAGE_BACKEND, mongo_url, tz_aware=True, event_listeners=[_db_listener], **_mongo_options
+)
 db = client[os.environ['DB_NAME']]
 
+# Read routing. `db` uses the primary and serves writes, admin views and any
+# read that must see a write just made. `feed_db` serves the high-volume public
+# polling reads (incidents, street notes and highlights, peers, chat) from a
+# secondary when one is within MONGO_FEED_MAX_STALENESS_SECONDS of the primary
+# (MongoDB's minimum is 90; -1 = no bound), falling back to the primary. Those
+# feeds are already polled every few seconds and tolerate a short lag, and this
+# keeps their load off the node taking writes. MONGO_FEED_READS=primary turns
+# the routing off.
+MONGO_FEED_READS = os.environ.get("MONGO_FEED_READS", "secondaryPreferred").strip()
+MONGO_FEED_MAX_STALENESS_SECONDS = int(os.environ.get("MONGO_FEED_MAX_STALENESS_SECONDS", "90"))
+if MONGO_FEED_READS == "primary":
+    _feed_read_preference = Primary()
+elif MONGO_FEED_READS == "secondaryPreferred":
+    _feed_read_preference = SecondaryPreferred(max_staleness=MONGO_FEED_MAX_STALENESS_SECONDS)
+else:
+    raise RuntimeError(
+        f"MONGO_FEED_READS must be 'secondaryPreferred' or 'primary', not {MONGO_FEED_READS!r}"
+    )
+feed_db = client.get_database(os.environ['DB_NAME'], read_preference=_feed_read_preference)
+
 logger = logging.getLogger(__name__)
 
 # ── Data retention (drives TTL indexes + on-fetch cleanup fallbacks) ──────────
@@ -49,6 +125,10 @@ PEER_TTL_SECONDS = 60                  # live avatar markers expire after 60s
 # set ENVIRONMENT=development in backend/.env.
 ENVIRONMENT = os.environ.get("ENVIRONMENT", "production").strip().lower()
 IS_PRODUCTION = ENVIRONMENT in ("production", "prod")
+if IS_PRODUCTION and STORAGE_BACKEND == "memory":
+    # The memory store loses everything on restart, and without MONGO_URL there
+    # is no deployment secret to derive the fallback admin/identity secrets from.
+    raise RuntimeError("STORAGE_BACKEND=memory is for tests and benchmarks; it cannot run in production.")
 
 # ── Admin credentials ─────────────────────────────────────────────────────────
 DEFAULT_ADMIN_ACCOUNT = "admin"
@@ -89,6 +169,26 @@ TURNSTILE_SECRET = os.environ.get("TURNSTILE_SECRET", "").strip()
 TURNSTILE_VERIFY_URL = "https://challenges.cloudflare.com/turnstile/v0/siteverify"
 TURNSTILE_ENABLED = bool(TURNSTILE_SECRET)
 
+# ── Outbound HTTP (Turnstile, Nominatim) ──────────────────────────────────────
+# One pooled, keep-alive session for the app's lifetime (opened on startup,
+# closed on shutdown) with a circuit breaker per upstream host; see
+# http_client.py. Nominatim's usage policy requires an identifying User-Agent.
+NOMINATIM_SEARCH_URL = os.environ.get(
+    "NOMINATIM_SEARCH_URL", "https://nominatim.openstreetmap.org/search"
+)
+UPSTREAM_DURATION = REGISTRY.histogram(
+    "upstream_request_duration_seconds",
+    "Outbound calls (Turnstile, Nominatim) by host; outcome is ok or error (5xx/network).",
+    ("host", "outcome"),
+)
+_http = HttpClient(
+    limit_per_host=int(os.environ.get("OUTBOUND_HTTP_CONNECTIONS_PER_HOST", "10")),
+    user_agent="CommunityMapApp/1.0",
+    failure_threshold=int(os.environ.get("OUTBOUND_HTTP_FAILURE_THRESHOLD", "5")),
+    reset_timeout=float(os.environ.get("OUTBOUND_HTTP_RESET_SECONDS", "30")),
+    on_response=lambda host, outcome, seconds: UPSTREAM_DURATION.labels(host, outcome).observe(seconds),
+)
+
 # ── Public identity tokens (privacy) ──────────────────────────────────────────
 # Raw client user ids (chat author, note owner, peer marker) must NEVER be
 # returned to the public, because the same id is reused across chat, notes and
@@ -97,10 +197,12 @@ TURNSTILE_ENABLED = bool(TURNSTILE_SECRET)
 # still consistent per user (so client-side block/mute and owner checks work)
 # but is non-reversible and reveals nothing about the raw id. The salt is stable
 # across restarts (derived from MONGO_URL) unless an explicit IDENTITY_SALT is
-# set, so tokens stay consistent over time.
-IDENTITY_SALT = os.environ.get("IDENTITY_SALT", "").strip() or hashlib.sha256(
-    ("identity-token-v1:" + mongo_url).encode("utf-8")
-).hexdigest()
+# set, so tokens stay consistent over time. The memory store with no MONGO_URL
+# keeps nothing across restarts anyway, so it gets a random per-process salt.
+IDENTITY_SALT = os.environ.get("IDENTITY_SALT", "").strip() or (
+    hashlib.sha256(("identity-token-v1:" + mongo_url).encode("utf-8")).hexdigest()
+    if mongo_url else secrets.token_hex(32)
+)
 
 
 def _public_token(raw_id: Optional[str]) -> Optional[str]:
@@ -189,6 +291,8 @@ def create_admin_token(account: str) -> str:
         "iat": int(now.timestamp()),
         "exp": int((now + timedelta(hours=ADMIN_TOKEN_TTL_HOURS)).timestamp()),
     }
+    import jwt
+
     return jwt.encode(payload, ADMIN_JWT_SECRET, algorithm=ADMIN_JWT_ALGORITHM)
 
 
@@ -202,6 +306,8 @@ async def require_admin(
     if credentials is None or not credentials.credentials:
         raise HTTPException(status_code=401, detail="Admin authentication required")
     token = credentials.credentials
+    import jwt
+
     try:
         payload = jwt.decode(token, ADMIN_JWT_SECRET, algorithms=[ADMIN_JWT_ALGORITHM])
     except jwt.ExpiredSignatureError:
@@ -213,13 +319,47 @@ async def require_admin(
     return payload.get("sub", "admin")
 
 
-# ── Lightweight in-memory rate limiting ───────────────────────────────────────
-# Sliding-window limiter keyed by client IP + scope. Suitable for a single
-# instance (Render free tier). For multi-instance deployments swap for a Redis
-# backed limiter. CORS is NOT a substitute for this — it only constrains
-# browsers, not curl/bots/direct API calls.
-_rate_lock = threading.Lock()
-_rate_store: Dict[Tuple[str, str], Deque[float]] = defaultdict(deque)
+# ── Rate limiting ─────────────────────────────────────────────────────────────
+# GCRA (token-bucket) limits keyed by client IP + scope; see rate_limiter.py.
+# RATE_LIMIT_BACKEND picks where the counters live:
+#   memory — per process (default). Each key costs 16 bytes in a table
+#            preallocated for RATE_LIMIT_MAX_KEYS keys, so bot traffic from
+#            millions of IPs can't grow memory. Right for a single worker.
+#   shared — the same table in shared memory, so every uvicorn worker on the
+#            host enforces one combined limit instead of one limit per worker.
+#   mongo  — time-bucketed counters in the rate_limits collection, shared by
+#            every instance (TTL-expired).
+# The shared backends lease RATE_LIMIT_LEASE_FRACTION of a limit at a time and
+# cache rejections locally, so most requests never touch the shared store.
+# CORS is NOT a substitute for this — it only constrains browsers, not
+# curl/bots/direct API calls.
+RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory").strip().lower()
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", str(1 << 18)))
+RATE_LIMIT_LEASE_FRACTION = float(os.environ.get("RATE_LIMIT_LEASE_FRACTION", "0.1"))
+
+
+def _make_rate_limiter():
+    if RATE_LIMIT_BACKEND == "shared":
+        return SharedMemoryRateLimiter(
+            name=f"community-map-ratelimit-{os.environ['DB_NAME']}",
+            max_keys=RATE_LIMIT_MAX_KEYS,
+            lease_fraction=RATE_LIMIT_LEASE_FRACTION,
+        )
+    if RATE_LIMIT_BACKEND == "mongo":
+        return MongoRateLimiter(db.rate_limits, lease_fraction=RATE_LIMIT_LEASE_FRACTION)
+    if RATE_LIMIT_BACKEND != "memory":
+        logger.warning("Unknown RATE_LIMIT_BACKEND %r; using memory", RATE_LIMIT_BACKEND)
+    return GcraRateLimiter(max_keys=RATE_LIMIT_MAX_KEYS)
+
+
+_rate_limiter = _make_rate_limiter()
+
+RATE_LIMIT_DETAIL = "Too many requests. Please slow down."
+RATE_LIMIT_REJECTIONS = REGISTRY.counter(
+    "rate_limit_rejections_total", "Requests answered 429, by rate-limit scope.", ("scope",)
+)
+# Request-state key RequestGuardMiddleware sets to the scope it already charged.
+PREROUTED_RATE_LIMIT = "rate_limit_scope"
 
 
 # Number of trusted reverse-proxy hops in front of the app. Render's edge
@@ -258,24 +398,25 @@ def _client_ip(request: Request) -> str:
 def rate_limit(scope: str, max_requests: int, window_seconds: int):
     """
     Returns a FastAPI dependency enforcing `max_requests` per `window_seconds`
-    per client IP for the given scope.
+    per client IP for the given scope: a burst of up to `max_requests`, then
+    one more every `window_seconds / max_requests`.
     """
     async def _dependency(request: Request):
-        now = time.monotonic()
-        key = (scope, _client_ip(request))
-        with _rate_lock:
-            bucket = _rate_store[key]
-            cutoff = now - window_seconds
-            while bucket and bucket[0] < cutoff:
-                bucket.popleft()
-            if len(bucket) >= max_requests:
-                retry_after = max(1, int(window_seconds - (now - bucket[0])))
-                raise HTTPException(
-                    status_code=429,
-                    detail="Too many requests. Please slow down.",
-                    headers={"Retry-After": str(retry_after)},
-                )
-            bucket.append(now)
+        # Normally RequestGuardMiddleware has already charged this request
+        # before routing; the dependency only acts when it hasn't.
+        if request.scope.get("state", {}).get(PREROUTED_RATE_LIMIT) == scope:
+            return
+        wait = await _rate_limiter.acquire(
+            (scope, _client_ip(request)), max_requests, window_seconds
+        )
+        if wait:
+            RATE_LIMIT_REJECTIONS.labels(scope).inc()
+            raise HTTPException(
+                status_code=429,
+                detail=RATE_LIMIT_DETAIL,
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+    _dependency.rate_limit_spec = (scope, max_requests, window_seconds)
     return _dependency
 
 
@@ -314,96 +455,457 @@ async def verify_turnstile(request: Request) -> None:
         "remoteip": _client_ip(request),
     }
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                TURNSTILE_VERIFY_URL,
-                data=payload,
-                timeout=aiohttp.ClientTimeout(total=8),
-            ) as resp:
-                data = await resp.json()
+        _, data = await _http.request_json("POST", TURNSTILE_VERIFY_URL, data=payload)
     except Exception as e:
         logger.warning("Turnstile verification request failed: %s", e)
         raise HTTPException(
             status_code=503, detail="CAPTCHA verification unavailable"
         )
+    if not isinstance(data, dict):
+        raise HTTPException(
+            status_code=503, detail="CAPTCHA verification unavailable"
+        )
     if not data.get("success"):
         logger.info("Turnstile rejected token: %s", data.get("error-codes"))
         raise HTTPException(status_code=403, detail="CAPTCHA verification failed")
 
 
-# ── Security headers middleware ───────────────────────────────────────────────
+# ── Edge middleware: timing, security headers, CORS ───────────────────────────
 # Requests slower than this (ms) are logged at WARNING so slow endpoints surface
 # in production logs. Override via SLOW_REQUEST_MS in the environment.
 SLOW_REQUEST_MS = int(os.environ.get("SLOW_REQUEST_MS", "1500"))
 
-
-class RequestTimingMiddleware(BaseHTTPMiddleware):
-    """
-    Lightweight, dependency-free observability for Phase 2 "Add monitoring":
-    times every request and surfaces failures + slow endpoints in the logs.
-
-    - Adds an `X-Response-Time-ms` header to every response.
-    - Logs 5xx responses and slow requests at WARNING; client errors (4xx) at
-      INFO; healthy fast requests at DEBUG (so production INFO logs stay focused
-      on problems while uvicorn still emits its own access log).
-    - Logs unhandled exceptions with timing, then re-raises.
+# Sent on every response unless the route already set its own value.
+SECURITY_HEADERS = (
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    (b"cross-origin-resource-policy", b"same-site"),
+    (b"permissions-policy", b"geolocation=(), microphone=(), camera=()"),
+    # API only serves JSON; lock it down hard.
+    (b"content-security-policy", b"default-src 'none'; frame-ancestors 'none'; base-uri 'none'"),
+)
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Request duration, by route template, method and status.",
+    ("route", "method", "status"),
+)
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "Requests currently being handled, by method.", ("method",)
+)
+# Label values must stay a small fixed set: anything else is counted as "OTHER".
+METRIC_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+# Request headers a browser may always send without asking (Fetch spec).
+CORS_SAFELISTED_HEADERS = ("Accept", "Accept-Language", "Content-Language", "Content-Type")
+
+
+class EdgeMiddleware:
+    """
+    One pure-ASGI pass for everything applied to every response, replacing
+    three stacked middlewares (two of them BaseHTTPMiddleware, which spawned a
+    task and an anyio stream per request and buffered streamed bodies):
+
+    - Timing: `X-Response-Time-ms` (time to the response headers) on every
+      response. 5xx and slow requests are logged at WARNING, client errors
+      (4xx) at INFO, healthy fast requests at DEBUG, so production INFO logs
+      stay focused on problems while uvicorn still emits its own access log.
+      Unhandled exceptions are logged with timing, then re-raised.
+    - Database time: MongoDB time and round trips per request (db_monitor.py)
+      are added to the request log line and, with `db_headers` (dev), sent as
+      `X-Db-Time-ms` / `X-Db-Calls`.
+    - Profiling: an admin request with `X-Profile: 1` or `?_profile=1` (or
+      `=true`) runs under the profiler (see _run_profiled). Anyone else's
+      request, flag or not, is served normally and never touches it.
+    - Security headers: SECURITY_HEADERS, unless the route set its own.
+    - CORS: same semantics as Starlette's CORSMiddleware — preflights are
+      answered here, other responses get the allow/expose headers when the
+      Origin is allowed.
+
+    Headers are added to the `http.response.start` message as it passes, so
+    the body is never touched and streaming responses stream.
 
     Pairs with an UptimeRobot ping on `GET /api/` and (optionally) Sentry.
     """
 
-    async def dispatch(self, request: Request, call_next):
+    def __init__(
+        self,
+        app,
+        allow_origins: List[str],
+        allow_methods: List[str],
+        allow_headers: List[str],
+        expose_headers: List[str],
+        allow_credentials: bool = False,
+        max_age: int = 600,
+        db_headers: bool = False,
+    ):
+        self.app = app
+        self.db_headers = db_headers
+        self.allow_all_origins = "*" in allow_origins
+        self.allow_origins = frozenset(o.encode("latin-1") for o in allow_origins)
+        self.allow_methods = frozenset(m.encode("latin-1") for m in allow_methods)
+        allowed = sorted(set(CORS_SAFELISTED_HEADERS) | set(allow_headers))
+        self.allow_headers = frozenset(h.lower() for h in allowed)
+
+        simple = []
+        if self.allow_all_origins:
+            simple.append((b"access-control-allow-origin", b"*"))
+        if allow_credentials:
+            simple.append((b"access-control-allow-credentials", b"true"))
+        if expose_headers:
+            simple.append((b"access-control-expose-headers", ", ".join(expose_headers).encode("latin-1")))
+        self.cors_headers = tuple(simple)
+        self.cors_names = frozenset(key for key, _ in simple)
+        # An explicit origin is echoed back unless "*" is allowed without credentials.
+        self.explicit_origin = not self.allow_all_origins or allow_credentials
+
+        preflight = [] if self.explicit_origin else [(b"access-control-allow-origin", b"*")]
+        preflight += [
+            (b"access-control-allow-methods", ", ".join(allow_methods).encode("latin-1")),
+            (b"access-control-max-age", str(max_age).encode("latin-1")),
+            (b"access-control-allow-headers", ", ".join(allowed).encode("latin-1")),
+        ]
+        if allow_credentials:
+            preflight.append((b"access-control-allow-credentials", b"true"))
+        self.preflight_headers = tuple(preflight)
+
+    def _origin_allowed(self, origin: bytes) -> bool:
+        return self.allow_all_origins or origin in self.allow_origins
+
+    async def _preflight(self, send, origin: bytes, method: bytes, requested: Optional[bytes]) -> None:
+        headers = list(self.preflight_headers)
+        failures = []
+        if self._origin_allowed(origin):
+            if self.explicit_origin:
+                headers.append((b"access-control-allow-origin", origin))
+        else:
+            failures.append("origin")
+        if method not in self.allow_methods:
+            failures.append("method")
+        if requested is not None and any(
+            h.strip() not in self.allow_headers
+            for h in requested.decode("latin-1").lower().split(",")
+        ):
+            failures.append("headers")
+        if self.explicit_origin:
+            headers.append((b"vary", b"Origin"))
+
+        body = ("Disallowed CORS " + ", ".join(failures) if failures else "OK").encode()
+        headers += [
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"content-type", b"text/plain; charset=utf-8"),
+        ]
+        await send({"type": "http.response.start", "status": 400 if failures else 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         start = time.perf_counter()
+        origin = cors_method = cors_headers = profile = authorization = None
+        for key, value in scope["headers"]:
+            if key == b"origin":
+                origin = value
+            elif key == b"access-control-request-method":
+                cors_method = value
+            elif key == b"access-control-request-headers":
+                cors_headers = value
+            elif key == b"authorization":
+                authorization = value
+            elif key == b"x-profile":
+                profile = value
+        query_string = scope.get("query_string", b"")
+        # Substring check first: almost no request carries the flag.
+        if profile is None and b"_profile" in query_string:
+            values = parse_qs(query_string.decode("latin-1")).get("_profile")
+            if values and values[-1].lower() not in ("0", "false", "no"):
+                profile = b"1"
+        method = scope["method"] if scope["method"] in METRIC_METHODS else "OTHER"
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        preflight = origin is not None and cors_method is not None and scope["method"] == "OPTIONS"
+        simple_cors = origin is not None and not preflight
+        db_stats = track_request()
+        status = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", ()))
+                present = {key.lower() for key, _ in headers}
+                headers += [h for h in SECURITY_HEADERS if h[0] not in present]
+                if simple_cors:
+                    headers = [h for h in headers if h[0] not in self.cors_names]
+                    headers += self.cors_headers
+                    if self.explicit_origin and self._origin_allowed(origin):
+                        headers = _with_cors_origin(headers, origin)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                headers.append((b"x-response-time-ms", f"{elapsed_ms:.1f}".encode("latin-1")))
+                if self.db_headers:
+                    headers.append((b"x-db-time-ms", f"{db_stats.time_ms:.1f}".encode("latin-1")))
+                    headers.append((b"x-db-calls", str(db_stats.calls).encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
         try:
-            response = await call_next(request)
+            if preflight:
+                await self._preflight(send_wrapper, origin, cors_method, cors_headers)
+            elif profile is not None and profile != b"0":
+                await _run_profiled(self.app, scope, receive, send_wrapper, authorization)
+            else:
+                await self.app(scope, receive, send_wrapper)
         except Exception:
             elapsed_ms = (time.perf_counter() - start) * 1000
             logger.exception(
                 "request_error method=%s path=%s elapsed_ms=%.1f",
-                request.method, request.url.path, elapsed_ms,
+                scope["method"], scope["path"], elapsed_ms,
             )
+            HTTP_REQUEST_DURATION.labels(_route_label(scope), method, 500).observe(elapsed_ms / 1000)
             raise
+        finally:
+            in_flight.dec()
 
         elapsed_ms = (time.perf_counter() - start) * 1000
-        response.headers["X-Response-Time-ms"] = f"{elapsed_ms:.1f}"
-
+        HTTP_REQUEST_DURATION.labels(_route_label(scope), method, status or 500).observe(elapsed_ms / 1000)
         is_slow = elapsed_ms >= SLOW_REQUEST_MS
-        if response.status_code >= 500 or is_slow:
+        if status is None or status >= 500 or is_slow:
             level = logging.WARNING
-        elif response.status_code >= 400:
+        elif status >= 400:
             level = logging.INFO
         else:
             level = logging.DEBUG
-        logger.log(
-            level,
-            "request method=%s path=%s status=%s elapsed_ms=%.1f%s",
-            request.method, request.url.path, response.status_code, elapsed_ms,
-            " SLOW" if is_slow else "",
-        )
-        return response
+        if logger.isEnabledFor(level):
+            logger.log(
+                level,
+                "request method=%s path=%s status=%s elapsed_ms=%.1f db_ms=%.1f db_calls=%d%s",
+                scope["method"], scope["path"], status, elapsed_ms,
+                db_stats.time_ms, db_stats.calls, " SLOW" if is_slow else "",
+            )
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        response.headers.setdefault("X-Content-Type-Options", "nosniff")
-        response.headers.setdefault("X-Frame-Options", "DENY")
-        response.headers.setdefault("Referrer-Policy", "strict-origin-when-cross-origin")
-        response.headers.setdefault("Cross-Origin-Resource-Policy", "same-site")
-        response.headers.setdefault(
-            "Permissions-Policy",
-            "geolocation=(), microphone=(), camera=()",
+# Admin-triggered request profiles, kept in memory (newest PROFILE_RING_SIZE).
+_profiles = ProfileStore(max_profiles=int(os.environ.get("PROFILE_RING_SIZE", "20")))
+
+
+async def _run_profiled(app, scope, receive, send, authorization: Optional[bytes]) -> None:
+    """
+    Run one request under the profiler once require_admin accepts its Bearer
+    token. The response carries `X-Profile-Id` for /api/admin/profiles/{id}.
+    Without a valid admin token the request is served unprofiled, as if the
+    flag were absent.
+    """
+    scheme, _, token = (authorization or b"").decode("latin-1").partition(" ")
+    try:
+        await require_admin(
+            HTTPAuthorizationCredentials(scheme=scheme, credentials=token.strip())
+            if scheme.lower() == "bearer" else None
         )
-        # API only serves JSON; lock it down hard.
-        response.headers.setdefault(
-            "Content-Security-Policy",
-            "default-src 'none'; frame-ancestors 'none'; base-uri 'none'",
+    except HTTPException:
+        await app(scope, receive, send)
+        return
+
+    profile_id = _profiles.new_id()
+    meta = {"method": scope["method"], "path": scope["path"], "status": None}
+
+    async def profiled_send(message):
+        if message["type"] == "http.response.start":
+            meta["status"] = message["status"]
+            message["headers"] = list(message.get("headers", ())) + [
+                (b"x-profile-id", profile_id.encode("latin-1"))
+            ]
+        await send(message)
+
+    try:
+        await _profiles.run(profile_id, meta, lambda: app(scope, receive, profiled_send))
+    except ProfilerBusy:
+        await JSONResponse(
+            {"detail": "Another request is being profiled"}, status_code=409
+        )(scope, receive, send)
+
+
+def _route_label(scope) -> str:
+    """The matched route's template ("/api/incidents/{incident_id}"), never the raw path."""
+    route = scope.get("route")
+    return route.path if route is not None else "unmatched"
+
+
+def _with_cors_origin(headers: list, origin: bytes) -> list:
+    """Echo the allowed Origin back and make sure caches vary on it."""
+    out = []
+    vary = None
+    for key, value in headers:
+        if key == b"access-control-allow-origin":
+            continue
+        if key == b"vary":
+            vary = value
+            continue
+        out.append((key, value))
+    out.append((b"access-control-allow-origin", origin))
+    if vary is None:
+        vary = b"Origin"
+    elif b"origin" not in vary.lower():
+        vary = vary + b", Origin"
+    out.append((b"vary", vary))
+    return out
+
+
+class RequestGuardMiddleware:
+    """
+    Pure-ASGI guard that runs before routing and before any of the body is read:
+
+    - Rate limits: every route carrying a `rate_limit(...)` dependency is
+      charged here from the method, path and client IP alone, so a flood of
+      429s never pays for reading a multi-megabyte body or Pydantic validation.
+      The dependency sees the request was charged and skips itself.
+    - Body size: a Content-Length over the route's limit gets a 413 straight
+      away; a chunked body is counted as it streams and cut off at the limit,
+      so an oversized upload is never buffered.
+
+    Routes are compiled lazily on the first request, once every route exists.
+    """
+
+    def __init__(self, app, router, max_body_bytes: int, large_body_routes: Dict[Tuple[str, str], int]):
+        self.app = app
+        self.router = router
+        self.max_body_bytes = max_body_bytes
+        self.large_body_routes = large_body_routes
+        self._static = None
+        self._dynamic = None
+
+    def _compile(self) -> None:
+        static: Dict[Tuple[str, str], tuple] = {}
+        dynamic = []
+        for route in self.router.routes:
+            methods = getattr(route, "methods", None)
+            dependencies = getattr(route, "dependencies", None)
+            if not methods or dependencies is None:
+                continue
+            spec = next(
+                (
+                    dep.dependency.rate_limit_spec
+                    for dep in dependencies
+                    if hasattr(dep.dependency, "rate_limit_spec")
+                ),
+                None,
+            )
+            for method in methods:
+                max_body = self.large_body_routes.get((method, route.path), self.max_body_bytes)
+                if spec is None and max_body == self.max_body_bytes:
+                    continue
+                entry = (spec, max_body)
+                if route.param_convertors:
+                    dynamic.append((method, route.path_regex, entry))
+                else:
+                    static[(method, route.path)] = entry
+        self._static, self._dynamic = static, dynamic
+
+    def _lookup(self, method: str, path: str):
+        entry = self._static.get((method, path))
+        if entry is None:
+            for m, regex, candidate in self._dynamic:
+                if m == method and regex.match(path):
+                    return candidate
+        return entry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if self._static is None:
+            self._compile()
+        spec, max_body = self._lookup(scope["method"], scope["path"]) or (None, self.max_body_bytes)
+
+        if spec is not None:
+            name, max_requests, window_seconds = spec
+            wait = await _rate_limiter.acquire(
+                (name, _client_ip(Request(scope))), max_requests, window_seconds
+            )
+            if wait:
+                RATE_LIMIT_REJECTIONS.labels(name).inc()
+                await self._reject(
+                    scope, receive, send, 429, RATE_LIMIT_DETAIL,
+                    {"Retry-After": str(max(1, math.ceil(wait)))},
+                )
+                return
+            scope.setdefault("state", {})[PREROUTED_RATE_LIMIT] = name
+
+        length = None
+        for key, value in scope["headers"]:
+            if key == b"content-length":
+                length = int(value) if value.isdigit() else -1
+                break
+        if length is not None:
+            # The server enforces Content-Length itself; only the header needs checking.
+            if length > max_body or length < 0:
+                await self._reject(scope, receive, send, 413, "Request body too large")
+                return
+            await self.app(scope, receive, send)
+            return
+
+        received = 0
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body:
+                    # Answer now and tell the app the client went away; no
+                    # response has started since the body isn't fully read.
+                    rejected = True
+                    await self._reject(scope, receive, send, 413, "Request body too large")
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            if not rejected:
+                await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
+
+    @staticmethod
+    async def _reject(scope, receive, send, status_code, detail, headers=None):
+        # Connection: close tells the server not to wait for (or drain) the
+        # rest of a body we are refusing.
+        headers = {**(headers or {}), "Connection": "close"}
+        await JSONResponse({"detail": detail}, status_code=status_code, headers=headers)(
+            scope, receive, send
         )
-        return response
 
 
 # Create the main app without a prefix
 app = FastAPI()
 
+# (hook name, milliseconds) for each startup hook, in run order.
+_startup_timings: List[Tuple[str, float]] = []
+# Background work started by startup hooks (kept referenced until done).
+_background_tasks: set = set()
+
+
+def startup_hook(fn):
+    """Register `fn` as a startup hook, timed for the startup report."""
+    @functools.wraps(fn)
+    async def timed():
+        start = time.perf_counter()
+        try:
+            return await fn()
+        finally:
+            _startup_timings.append((fn.__name__, (time.perf_counter() - start) * 1000))
+    app.add_event_handler("startup", timed)
+    return fn
+
+
+def _run_in_background(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
@@ -563,6 +1065,60 @@ class AdminAuth(BaseModel):
 class AddressSearch(BaseModel):
     address: str = Field(min_length=1, max_length=300)
 
+
+async def _fetch_nominatim(query: str) -> List[dict]:
+    params = {"q": query, "format": "json", "limit": "5"}
+    try:
+        status, results = await _http.request_json("GET", NOMINATIM_SEARCH_URL, params=params)
+    except CircuitOpenError:
+        raise GeocodeUnavailable("circuit open")
+    if status != 200 or not isinstance(results, list):
+        raise GeocodeUnavailable(f"Nominatim returned {status}")
+    return [{
+        'display_name': result.get('display_name', ''),
+        'latitude': float(result.get('lat', 0)),
+        'longitude': float(result.get('lon', 0))
+    } for result in results]
+
+
+# Offline gazetteer (see gazetteer.py), built by scripts/build_gazetteer.py and
+# memory-mapped on startup. Answers known places without a network round trip.
+GAZETTEER_PATH = Path(
+    os.environ.get("GAZETTEER_PATH", str(ROOT_DIR / "data" / "melbourne-gazetteer.idx"))
+)
+_gazetteer: Optional[Gazetteer] = None
+DEFAULT_SUGGEST_LIMIT = 8
+MAX_SUGGEST_LIMIT = 20
+MAX_SUGGEST_QUERY_LEN = 100
+
+# Reverse geocoding resolves the centre of a ~110 m grid cell and caches the
+# answer per cell (LRU): the gazetteer only changes with a deploy, so entries
+# never go stale.
+REVERSE_GEOCODE_CELL_DEG = 0.001
+REVERSE_GEOCODE_PLACE_RADIUS_M = 500
+REVERSE_GEOCODE_SUBURB_RADIUS_M = 5000
+REVERSE_GEOCODE_CACHE_MAX_CELLS = 65536
+_reverse_cache: "OrderedDict[Tuple[int, int], dict]" = OrderedDict()
+_reverse_cache_stats = REGISTRY.cache("reverse_geocode")
+_VIC_SUFFIX_RE = re.compile(r"\s*VIC(\s+\d{4})?$")
+
+# Two-tier geocode cache (see geocoder.py). Popular Melbourne addresses repeat
+# constantly, and Nominatim allows about one request per second.
+_geocoder = GeocodeCache(
+    _fetch_nominatim,
+    db.geocode_cache,
+    max_entries=int(os.environ.get("GEOCODE_CACHE_MAX_ENTRIES", "4096")),
+    ttl_seconds=float(os.environ.get("GEOCODE_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+    min_interval=float(os.environ.get("GEOCODE_MIN_INTERVAL_SECONDS", "1.0")),
+)
+REGISTRY.cache_source(
+    "geocode",
+    lambda: (
+        _geocoder.memory_hits + _geocoder.persistent_hits + _geocoder.coalesced,
+        _geocoder.upstream_calls + _geocoder.rejected,
+    ),
+)
+
 # Helper function to calculate distance between two coordinates
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
@@ -644,37 +1200,130 @@ async def verify_admin(auth: AdminAuth):
 )
 async def geocode_address(address_search: AddressSearch):
     """
-    Geocode an address using Nominatim (OpenStreetMap)
+    Geocode an address: the offline gazetteer first (suburbs, streets,
+    landmarks, amenities), then Nominatim (OpenStreetMap) through the geocode
+    cache (memory, then Mongo, then a paced and coalesced upstream call).
     """
-    import urllib.parse
-    import aiohttp
-    
-    encoded_address = urllib.parse.quote(address_search.address)
-    url = f"https://nominatim.openstreetmap.org/search?q={encoded_address}&format=json&limit=5"
-    
-    headers = {
-        'User-Agent': 'CommunityMapApp/1.0'
-    }
-    
+    if _gazetteer is not None:
+        local = _gazetteer.geocode(address_search.address)
+        if local:
+            return {"success": True, "locations": local}
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    results = await response.json()
-                    if results:
-                        locations = [{
-                            'display_name': result.get('display_name', ''),
-                            'latitude': float(result.get('lat', 0)),
-                            'longitude': float(result.get('lon', 0))
-                        } for result in results]
-                        return {"success": True, "locations": locations}
-                    else:
-                        return {"success": False, "message": "No locations found"}
-                else:
-                    return {"success": False, "message": "Geocoding service unavailable"}
+        locations = await _geocoder.lookup(address_search.address)
+    except GeocodeUnavailable:
+        return {"success": False, "message": "Geocoding service unavailable"}
     except Exception as e:
         logger.error(f"Geocoding error: {str(e)}")
         return {"success": False, "message": "Error searching address"}
+    if not locations:
+        return {"success": False, "message": "No locations found"}
+    return {"success": True, "locations": locations}
+
+
+@api_router.get(
+    "/geocode/suggest",
+    dependencies=[Depends(rate_limit("geocode_suggest", max_requests=120, window_seconds=60))],
+)
+async def geocode_suggest(q: str, limit: Optional[int] = None):
+    """
+    Place autocomplete from the offline gazetteer only. Nominatim's usage
+    policy forbids autocomplete traffic, so a miss is just an empty list.
+    """
+    q = (q or "").strip()
+    if len(q) > MAX_SUGGEST_QUERY_LEN:
+        raise HTTPException(status_code=422, detail="Query too long")
+    limit = max(1, min(limit or DEFAULT_SUGGEST_LIMIT, MAX_SUGGEST_LIMIT))
+    suggestions = _gazetteer.suggest(q, limit) if (_gazetteer is not None and q) else []
+    return {"query": q, "suggestions": suggestions}
+
+
+@api_router.get(
+    "/reverse-geocode",
+    dependencies=[Depends(rate_limit("reverse_geocode", max_requests=120, window_seconds=60))],
+)
+async def reverse_geocode(lat: float, lng: float):
+    """
+    Describe a point from the offline gazetteer: the nearest landmark or street
+    and the nearest suburb, e.g. "Federation Square, Melbourne" (used to fill a
+    street note's location_text). Answers are cached per grid cell, so nearby
+    requests share one lookup.
+    """
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise HTTPException(status_code=422, detail="Invalid coordinates")
+    cell = (round(lat / REVERSE_GEOCODE_CELL_DEG), round(lng / REVERSE_GEOCODE_CELL_DEG))
+    result = _reverse_cache.get(cell)
+    if result is not None:
+        _reverse_cache.move_to_end(cell)
+        _reverse_cache_stats.hits += 1
+        return result
+    _reverse_cache_stats.misses += 1
+    if _gazetteer is None:
+        return {"success": False, "message": "Reverse geocoding unavailable"}
+
+    # Resolve the cell centre so every point in the cell gets the same answer.
+    c_lat, c_lng = cell[0] * REVERSE_GEOCODE_CELL_DEG, cell[1] * REVERSE_GEOCODE_CELL_DEG
+    place = _gazetteer.nearest(
+        c_lat, c_lng, ("landmark", "street"), REVERSE_GEOCODE_PLACE_RADIUS_M
+    )
+    suburb = _gazetteer.nearest(c_lat, c_lng, ("suburb",), REVERSE_GEOCODE_SUBURB_RADIUS_M)
+    # A landmark/street label already names its suburb ("Federation Square,
+    # Melbourne VIC 3000"), which beats the nearest suburb centre near a border.
+    label = (place or suburb or {}).get("display_name")
+    if label:
+        result = {
+            "success": True,
+            "location_text": _VIC_SUFFIX_RE.sub("", label).rstrip(", "),
+            "place": place,
+            "suburb": suburb,
+        }
+    else:
+        result = {"success": False, "message": "No nearby places"}
+    _reverse_cache[cell] = result
+    if len(_reverse_cache) > REVERSE_GEOCODE_CACHE_MAX_CELLS:
+        _reverse_cache.popitem(last=False)
+    return result
+
+
+@api_router.get("/admin/geocode/stats")
+async def geocode_stats(_admin: str = Depends(require_admin)):
+    """Geocode cache hit rate, upstream calls and throttle-queue depth."""
+    return _geocoder.stats()
+
+
+@api_router.get("/admin/migrations")
+async def migration_status(_admin: str = Depends(require_admin)):
+    """Background data migrations: complete or not, and progress so far."""
+    return {"success": True, "migrations": _migrations.status() if _migrations else []}
+
+
+@api_router.get("/admin/profiles")
+async def list_profiles(_admin: str = Depends(require_admin)):
+    """Stored request profiles (newest first); trigger one with `X-Profile: 1`."""
+    return {"success": True, "profiles": _profiles.list()}
+
+
+@api_router.get("/admin/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = "text",
+    _admin: str = Depends(require_admin),
+):
+    """
+    A stored profile: `format=text` is the pstats report (by cumulative time),
+    `format=pstats` the raw .prof file for snakeviz / `python -m pstats`.
+    """
+    profile = _profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "pstats":
+        return Response(
+            content=profile["pstats"],
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"'},
+        )
+    if format != "text":
+        raise HTTPException(status_code=422, detail="format must be text or pstats")
+    return Response(content=profile["text"], media_type="text/plain")
 
 @api_router.post(
     "/incidents",
@@ -726,16 +1375,43 @@ async def create_incident(input: IncidentCreate):
     # Store timestamp as a real BSON date so the TTL index can expire it.
     doc = incident_obj.model_dump()
     _ = await db.incidents.insert_one(doc)
+    _search_index_put("incident", doc)
     return incident_obj
 
+def _wants_columnar(request: Request, fmt: Optional[str]) -> bool:
+    """`?format=columnar`, or an Accept header asking for MessagePack."""
+    if fmt in (None, "", "json"):
+        return feed_format.wants_msgpack(request.headers.get("accept"))
+    if fmt == "columnar":
+        return True
+    raise HTTPException(status_code=422, detail="format must be 'json' or 'columnar'")
+
+
+def _columnar_response(request: Request, rows: List[Dict], columns) -> Response:
+    """
+    A map feed as parallel arrays (see feed_format.py): MessagePack when the
+    client accepts it and msgpack is installed, otherwise compact JSON.
+    """
+    payload = feed_format.encode(rows, columns)
+    headers = {"Vary": "Accept"}
+    if feed_format.wants_msgpack(request.headers.get("accept")):
+        packed = feed_format.pack(payload)
+        if packed is not None:
+            return Response(content=packed, media_type="application/x-msgpack", headers=headers)
+    rendered = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return Response(content=rendered, media_type="application/json", headers=headers)
+
+
 @api_router.get("/incidents", response_model=List[Incident])
 async def get_incidents(
+    request: Request,
     hours: Optional[int] = None,
     min_lat: Optional[float] = None,
     min_lng: Optional[float] = None,
     max_lat: Optional[float] = None,
     max_lng: Optional[float] = None,
     limit: Optional[int] = None,
+    fmt: Optional[str] = Query(None, alias="format"),
 ):
     """
     Get incidents, optionally constrained to a map viewport (bbox) and/or a
@@ -745,14 +1421,16 @@ async def get_incidents(
     returns the most recent incidents (up to DEFAULT_LIST_LIMIT). Supplying all
     four bbox corners limits results to the visible map area so the payload
     scales with the viewport, not the whole city.
+
+    `format=columnar` (or `Accept: application/x-msgpack`) returns the same
+    incidents as parallel arrays; see feed_format.py.
     """
+    columnar = _wants_columnar(request, fmt)
     # Auto-cleanup fallback: remove incidents older than the TTL window. The TTL
     # index normally handles this in the background; this covers the gap between
     # sweeps so the public feed is never stale.
     cutoff_time = datetime.now(timezone.utc) - timedelta(seconds=INCIDENT_TTL_SECONDS)
-    await db.incidents.delete_many({
-        "timestamp": {"$lt": cutoff_time}
-    })
+    await db.incidents.delete_many(_date_range("timestamp", lt=cutoff_time))
 
     # Hide moderated content; optionally restrict to the requested viewport.
     query: Dict = {"hidden": {"$ne": True}}
@@ -760,7 +1438,7 @@ async def get_incidents(
     if bbox:
         query.update(bbox)
 
-    incidents = await db.incidents.find(query, {
+    incidents = await feed_db.incidents.find(query, {
         "_id": 0,
         "contact_email": 0,
         "contact_phone": 0
@@ -781,6 +1459,8 @@ async def get_incidents(
         time_filter = datetime.now(timezone.utc) - timedelta(hours=hours)
         incidents = [i for i in incidents if i['timestamp'] >= time_filter]
 
+    if columnar:
+        return _columnar_response(request, incidents, feed_format.INCIDENT_COLUMNS)
     return incidents
 
 @api_router.get("/admin/incidents", response_model=List[dict])
@@ -823,6 +1503,7 @@ async def delete_incident(incident_id: str, _admin: str = Depends(require_admin)
     Delete an incident (admin only)
     """
     result = await db.incidents.delete_one({"id": incident_id})
+    _search_index.remove("incident", incident_id)
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Incident not found")
@@ -866,6 +1547,8 @@ async def update_incident(incident_id: str, update_data: dict, _admin: str = Dep
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Incident not found")
+    if {"description", "latitude", "longitude"} & update_data.keys():
+        await _search_index_refresh("incident", incident_id)
     
     return {"success": True, "message": "Incident updated"}
 
@@ -1030,7 +1713,7 @@ async def get_chat_messages(
     # the gap between background sweeps.
     cutoff_time = datetime.now(timezone.utc) - timedelta(hours=CHAT_TTL_HOURS)
     await db.chat_messages.delete_many({
-        "timestamp": {"$lt": cutoff_time},
+        **_date_range("timestamp", lt=cutoff_time),
         "pinned": {"$ne": True}
     })
     
@@ -1040,13 +1723,13 @@ async def get_chat_messages(
     if before:
         try:
             before_dt = datetime.fromisoformat(before)
-            query["timestamp"] = {"$lt": before_dt}
+            query.update(_date_range("timestamp", lt=before_dt))
         except ValueError:
             pass
 
     # Fetch the most recent `limit` matching messages (newest-first), then
     # reverse to oldest-first so the chat renders in chronological order.
-    messages = await db.chat_messages.find(
+    messages = await feed_db.chat_messages.find(
         query, {"_id": 0, "expire_at": 0}
     ).sort("timestamp", -1).to_list(_clamp_limit(limit))
     messages.reverse()
@@ -1093,6 +1776,7 @@ async def create_chat_message(message_data: ChatMessageCreate):
     }
     
     await db.chat_messages.insert_one(message_doc)
+    _search_index_put("chat_message", message_doc)
     
     return {
         "success": True,
@@ -1130,29 +1814,104 @@ async def pin_chat_message(message_id: str, req: ChatPinRequest, _admin: str = D
     result = await db.chat_messages.update_one({"id": message_id}, update)
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Message not found")
+    _search_index.set_expiry(
+        "chat_message", message_id, _as_epoch(update["$set"].get("expire_at"))
+    )
     return {"success": True, "pinned": bool(req.pinned)}
 
+# ── Singleton content cache (live updates + welcome notice) ──────────────────
+# Both are single documents read on every page load but edited maybe once a
+# week, so each worker keeps the rendered JSON in memory for a short TTL instead
+# of hitting Mongo per request. The admin update handlers and the content
+# migration overwrite the entry immediately; the TTL only bounds how long
+# *another* worker can serve the previous version. Each entry carries a version
+# stamp (a hash of the body) used as a strong ETag, so browsers and the CDN can
+# revalidate with If-None-Match and get an empty 304.
+CONTENT_CACHE_TTL_SECONDS = int(os.environ.get("CONTENT_CACHE_TTL_SECONDS", "60"))
+# Street highlights are map data an admin edits to warn people, so another
+# worker's copy may lag an edit by this much at most.
+STREET_HIGHLIGHTS_CACHE_TTL_SECONDS = float(os.environ.get("STREET_HIGHLIGHTS_CACHE_TTL_SECONDS", "5"))
+_CONTENT_CACHE_TTLS = {"street_highlights": STREET_HIGHLIGHTS_CACHE_TTL_SECONDS}
+CONTENT_CACHE_CONTROL = os.environ.get(
+    "CONTENT_CACHE_CONTROL",
+    "public, max-age=300, stale-while-revalidate=86400",
+)
+
+# Responses of at least this many bytes are gzip/brotli-compressed when the
+# client accepts it (compression.py). Cached content is compressed once per
+# version, at maximum quality, and the encoded bytes kept beside the entry.
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+
+# name → (expires_at monotonic, rendered JSON bytes, ETag, {encoding: bytes})
+_content_cache: Dict[str, Tuple[float, bytes, str, Dict[str, bytes]]] = {}
+_content_cache_stats = REGISTRY.cache("content")
+
+
+def _content_cache_put(name: str, body) -> Tuple[bytes, str, Dict[str, bytes]]:
+    """Render `body` once and store it with its version stamp (ETag)."""
+    rendered = json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    etag = '"' + hashlib.sha256(rendered).hexdigest()[:20] + '"'
+    # A new version starts with no encoded variants; they fill in on demand.
+    variants: Dict[str, bytes] = {}
+    ttl = _CONTENT_CACHE_TTLS.get(name, CONTENT_CACHE_TTL_SECONDS)
+    _content_cache[name] = (time.monotonic() + ttl, rendered, etag, variants)
+    return rendered, etag, variants
+
+
+async def _content_cache_get(name: str, loader) -> Tuple[bytes, str, Dict[str, bytes]]:
+    entry = _content_cache.get(name)
+    if entry and entry[0] > time.monotonic():
+        _content_cache_stats.hits += 1
+        return entry[1], entry[2], entry[3]
+    _content_cache_stats.misses += 1
+    return _content_cache_put(name, await loader())
+
+
+async def _cached_content_response(
+    request: Request,
+    rendered: bytes,
+    etag: str,
+    variants: Dict[str, bytes],
+    cache_control: str = CONTENT_CACHE_CONTROL,
+) -> Response:
+    encoding = None
+    if len(rendered) >= COMPRESS_MIN_BYTES:
+        encoding = compression.choose_encoding(request.headers.get("accept-encoding"))
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if encoding:
+        headers["ETag"] = compression.weak_etag(etag)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # Intermediaries may weaken the tag (W/"..."); compare the opaque part.
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    if encoding:
+        body = variants.get(encoding)
+        if body is None:
+            body = await compression.compress_async(rendered, encoding, precompress=True)
+            variants[encoding] = body
+        headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
+    return Response(content=rendered, media_type="application/json", headers=headers)
+
+
+async def _load_live_updates() -> dict:
+    content = await db.live_updates.find_one({"_id": "content"}, {"text": 1})
+    return {
+        "success": True,
+        "content": (content or {}).get("text", DEFAULT_LIVE_UPDATES_TEXT),
+    }
+
+
 # Live Updates Content Management
 @api_router.get("/live-updates")
-async def get_live_updates():
+async def get_live_updates(request: Request):
     """
-    Get the current live updates content
+    Get the current live updates content (served from the singleton cache)
     """
-    # Try to get from database, if not found use default
-    content = await db.live_updates.find_one({"_id": "content"})
-    
-    default_content = "📝 NEW: Street Notes with emoji shortcuts 🚽 ☕ 🧋 🅿️ 🎵 — share tips with your neighbours  •  Choose how long your note lasts: 1 hour, 3 days, or forever  •  Tap the blue crosshair to find yourself on the map  •  Add this app to your home screen for a native-app feel  •  Tap the active users badge to chat with the community"
-    
-    if content:
-        return {
-            "success": True,
-            "content": content.get("text", default_content)
-        }
-    
-    return {
-        "success": True,
-        "content": default_content
-    }
+    rendered, etag, variants = await _content_cache_get("live_updates", _load_live_updates)
+    return await _cached_content_response(request, rendered, etag, variants)
 
 class LiveUpdatesRequest(BaseModel):
     content: str = Field(max_length=5000)
@@ -1167,6 +1926,7 @@ async def update_live_updates(update: LiveUpdatesRequest, _admin: str = Depends(
         {"$set": {"text": update.content, "updated_at": datetime.now(timezone.utc).isoformat()}},
         upsert=True
     )
+    _content_cache_put("live_updates", {"success": True, "content": update.content})
     
     return {
         "success": True,
@@ -1233,22 +1993,35 @@ class StreetHighlight(BaseModel):
     created_at: datetime
     created_by: str = "admin"
 
-@api_router.get("/street-highlights")
-async def get_street_highlights():
-    """
-    Get all admin-created street highlights (persistent, not auto-cleared)
-    """
-    highlights = await db.street_highlights.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    
+async def _load_street_highlights(database=None) -> list:
+    if database is None:
+        database = feed_db
+    highlights = await database.street_highlights.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
+
     # Convert timestamps
     for highlight in highlights:
-        if isinstance(highlight.get('created_at'), str):
-            highlight['created_at'] = highlight['created_at']
-        elif isinstance(highlight.get('created_at'), datetime):
+        if isinstance(highlight.get('created_at'), datetime):
             highlight['created_at'] = highlight['created_at'].isoformat()
-    
     return highlights
 
+
+async def _refresh_street_highlights() -> None:
+    # Read back from the primary so the new version includes the admin's write.
+    _content_cache_put("street_highlights", await _load_street_highlights(db))
+
+
+@api_router.get("/street-highlights")
+async def get_street_highlights(request: Request):
+    """
+    Get all admin-created street highlights (persistent, not auto-cleared),
+    served from the singleton cache. Browsers revalidate every time
+    (no-cache), usually getting a 304. An admin edit is served at once by the
+    worker that handled it; other workers pick it up within
+    STREET_HIGHLIGHTS_CACHE_TTL_SECONDS.
+    """
+    rendered, etag, variants = await _content_cache_get("street_highlights", _load_street_highlights)
+    return await _cached_content_response(request, rendered, etag, variants, cache_control="no-cache")
+
 @api_router.post("/admin/street-highlights")
 async def create_street_highlight(highlight_data: StreetHighlightCreate, _admin: str = Depends(require_admin)):
     """
@@ -1271,6 +2044,7 @@ async def create_street_highlight(highlight_data: StreetHighlightCreate, _admin:
     }
     
     await db.street_highlights.insert_one(highlight_doc)
+    await _refresh_street_highlights()
     
     # Serialize for the JSON response (DB keeps the real date).
     highlight_doc.pop("_id", None)
@@ -1315,6 +2089,7 @@ async def update_street_highlight(highlight_id: str, update_data: dict, _admin:
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Street highlight not found")
+    await _refresh_street_highlights()
     
     # Return updated highlight
     updated = await db.street_highlights.find_one({"id": highlight_id}, {"_id": 0})
@@ -1336,6 +2111,7 @@ async def delete_street_highlight(highlight_id: str, _admin: str = Depends(requi
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Street highlight not found")
+    await _refresh_street_highlights()
     
     return {"success": True, "message": "Street highlight deleted"}
 
@@ -1422,11 +2198,13 @@ class StreetNoteResolve(BaseModel):
 
 @api_router.get("/street-notes")
 async def get_street_notes(
+    request: Request,
     min_lat: Optional[float] = None,
     min_lng: Optional[float] = None,
     max_lat: Optional[float] = None,
     max_lng: Optional[float] = None,
     limit: Optional[int] = None,
+    fmt: Optional[str] = Query(None, alias="format"),
 ):
     """
     Get all non-expired street notes. Notes with expires_at == None are permanent
@@ -1434,8 +2212,10 @@ async def get_street_notes(
 
     Optionally constrained to a map viewport (all four bbox corners) and capped
     to `limit`. Both are optional and backward compatible: with no params this
-    returns the most recent notes (up to DEFAULT_LIST_LIMIT).
+    returns the most recent notes (up to DEFAULT_LIST_LIMIT). `format=columnar`
+    as for incidents.
     """
+    columnar = _wants_columnar(request, fmt)
     now = datetime.now(timezone.utc)
 
     # Auto-cleanup fallback: delete notes whose expires_at is in the past (skip
@@ -1450,7 +2230,7 @@ async def get_street_notes(
     if bbox:
         query.update(bbox)
 
-    notes = await db.street_notes.find(
+    notes = await feed_db.street_notes.find(
         query, {"_id": 0}
     ).sort("created_at", -1).to_list(_clamp_limit(limit))
 
@@ -1472,6 +2252,8 @@ async def get_street_notes(
             note['contact_phone'] = None
             note['contact_email'] = None
 
+    if columnar:
+        return _columnar_response(request, notes, feed_format.NOTE_COLUMNS)
     return notes
 
 @api_router.post(
@@ -1524,6 +2306,7 @@ async def create_street_note(note_data: StreetNoteCreate):
 
     await db.street_notes.insert_one(note_doc)
     note_doc.pop("_id", None)
+    _search_index_put("street_note", note_doc)
 
     # Serialize dates for the JSON response (DB keeps the real BSON dates).
     response_note = dict(note_doc)
@@ -1560,59 +2343,34 @@ async def delete_street_note(note_id: str, _admin: str = Depends(require_admin))
     Delete a street note (admin only).
     """
     result = await db.street_notes.delete_one({"id": note_id})
+    _search_index.remove("street_note", note_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Note not found")
     return {"success": True}
 
 # Welcome Popup Notice (first-time visitor notice)
-@api_router.get("/welcome-notice")
-async def get_welcome_notice():
-    """
-    Get the welcome notice content (shown to first-time visitors)
-    """
-    notice = await db.welcome_notice.find_one({})
-    
+async def _load_welcome_notice() -> dict:
+    notice = await db.welcome_notice.find_one({}, {"content": 1, "enabled": 1})
     if notice:
         return {
             "content": notice.get("content", ""),
             "enabled": notice.get("enabled", True)
         }
-    
-    # Default content
-    default_content = """<h2>Welcome to Melbourne Community Map</h2>
-<p>Your friendly neighbourhood map for staying informed and helping each other out around Melbourne.</p>
-
-<h3>🚨 Report Incidents</h3>
-<p>Spotted something the community should know about? Tap <strong>Report Incident</strong> to flag it on the map. Description is optional — share as much or as little as you like.</p>
-
-<h3>📝 Street Notes</h3>
-<p>Share quick tips with your neighbours — where the nearest toilet is, a milk-tea deal, a busker worth checking out, or just a thought about the moment.</p>
-<ul>
-<li>Tap a quick-shortcut emoji to auto-fill your note (🚽 ☕ 🧋 🍜 🅿️ 🎵 ❤️ 😊 and more)</li>
-<li>Choose how long it lasts — from <strong>1 hour</strong> up to <strong>3 days</strong>, or keep it <strong>forever</strong></li>
-<li>Add an optional image; everything else is optional too</li>
-</ul>
-
-<h3>🗺️ Map Tricks</h3>
-<ul>
-<li>Tap the blue crosshair button to centre the map on your current location</li>
-<li>Swipe up anywhere to hide the header for a fullscreen map view — tap the minimise button to bring it back</li>
-<li>Streets highlighted by admins flag helpful context like poor lighting or crowded areas</li>
-</ul>
-
-<h3>💬 Live Updates & Community Chat</h3>
-<p>Tap the active users badge in the Live Updates banner to drop into the community group chat. Messages clear every 24 hours.</p>
-
-<h3>📲 Install on your home screen</h3>
-<p>For the full experience, add this app to your home screen — it opens like a native app, no browser bars.</p>
-
-<p style="margin-top: 1.5rem; padding-top: 1rem; border-top: 1px solid #e5e7eb; font-size: 0.85rem; color: #6b7280;">In an emergency, always call <strong>000</strong> first. This app is for community awareness only.</p>"""
-
     return {
-        "content": default_content,
+        "content": DEFAULT_WELCOME_NOTICE_CONTENT,
         "enabled": True
     }
 
+
+@api_router.get("/welcome-notice")
+async def get_welcome_notice(request: Request):
+    """
+    Get the welcome notice content (shown to first-time visitors), served from
+    the singleton cache
+    """
+    rendered, etag, variants = await _content_cache_get("welcome_notice", _load_welcome_notice)
+    return await _cached_content_response(request, rendered, etag, variants)
+
 class WelcomeNoticeRequest(BaseModel):
     content: str = Field(max_length=20000)
     enabled: bool = True
@@ -1633,6 +2391,7 @@ async def update_welcome_notice(update: WelcomeNoticeRequest, _admin: str = Depe
         },
         upsert=True
     )
+    _content_cache_put("welcome_notice", {"content": update.content, "enabled": update.enabled})
     
     return {
         "success": True,
@@ -1682,16 +2441,20 @@ async def upsert_peer(peer: PeerLocation):
     return {"ok": True}
 
 @api_router.get("/peers")
-async def list_peers():
-    """Return all peers seen within the last PEER_TTL_SECONDS seconds."""
+async def list_peers(request: Request, fmt: Optional[str] = Query(None, alias="format")):
+    """
+    Return all peers seen within the last PEER_TTL_SECONDS seconds.
+    `format=columnar` as for incidents.
+    """
+    columnar = _wants_columnar(request, fmt)
     cutoff_ms = (datetime.now(timezone.utc).timestamp() - PEER_TTL_SECONDS) * 1000
-    peers = await db.peers.find(
+    peers = await feed_db.peers.find(
         {"ts": {"$gte": cutoff_ms}},
         {"_id": 0}
     ).to_list(500)
     # Privacy: expose a one-way token instead of the raw id, so live locations
     # can't be tied back to a trackable identity (or to chat/notes by the same id).
-    return [
+    rows = [
         {
             "token": _public_token(p.get("id")),
             "emoji": p.get("emoji"),
@@ -1702,6 +2465,9 @@ async def list_peers():
         }
         for p in peers
     ]
+    if columnar:
+        return _columnar_response(request, rows, feed_format.PEER_COLUMNS)
+    return rows
 
 @api_router.delete("/peers/{peer_id}")
 async def remove_peer(peer_id: str):
@@ -1728,6 +2494,129 @@ async def identity_token(req: IdentityRequest):
     """
     return {"token": _public_token(req.id)}
 
+# ── Full-text search ──────────────────────────────────────────────────────────
+# In-memory inverted index over incident descriptions, street-note text /
+# location_text and chat messages (see search_index.py). It is built from Mongo
+# on startup and then kept current by the write handlers, so a search is a dict
+# lookup rather than a collection scan. Hidden (moderated) content is never
+# indexed, and every document carries the same expiry as its TTL index.
+_search_index = SearchIndex()
+
+# Fields each indexed collection needs loaded to (re)build its entries.
+SEARCH_PROJECTIONS = {
+    "incident": {"_id": 0, "id": 1, "description": 1, "latitude": 1, "longitude": 1, "timestamp": 1, "hidden": 1},
+    "street_note": {"_id": 0, "id": 1, "text": 1, "location_text": 1, "latitude": 1, "longitude": 1,
+                    "created_at": 1, "expires_at": 1, "hidden": 1},
+    "chat_message": {"_id": 0, "id": 1, "message": 1, "timestamp": 1, "expire_at": 1, "hidden": 1},
+}
+MAX_SEARCH_QUERY_LEN = 200
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+
+def _as_epoch(value) -> Optional[float]:
+    """Epoch seconds for a BSON date or legacy ISO string; None if absent."""
+    if isinstance(value, str) and value:
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return None
+
+
+def _search_index_put(target_type: str, doc: Optional[dict]) -> None:
+    """Index (or re-index) a stored document; hidden content is dropped instead."""
+    if not doc or not doc.get("id"):
+        return
+    if doc.get("hidden"):
+        _search_index.remove(target_type, doc["id"])
+        return
+    if target_type == "incident":
+        created = _as_epoch(doc.get("timestamp"))
+        _search_index.add(
+            "incident", doc["id"], doc.get("description", ""),
+            doc.get("latitude"), doc.get("longitude"), created,
+            created + INCIDENT_TTL_SECONDS if created is not None else None,
+        )
+    elif target_type == "street_note":
+        text = " ".join(p for p in (doc.get("text"), doc.get("location_text")) if p)
+        _search_index.add(
+            "street_note", doc["id"], text,
+            doc.get("latitude"), doc.get("longitude"),
+            _as_epoch(doc.get("created_at")), _as_epoch(doc.get("expires_at")),
+        )
+    elif target_type == "chat_message":
+        _search_index.add(
+            "chat_message", doc["id"], doc.get("message", ""), None, None,
+            _as_epoch(doc.get("timestamp")), _as_epoch(doc.get("expire_at")),
+        )
+    _search_index.expire()
+
+
+async def _search_index_refresh(target_type: str, target_id: str) -> None:
+    """Re-read a document after an update and re-index (or drop) it."""
+    collection = REPORT_TARGET_COLLECTIONS.get(target_type)
+    if not collection:
+        return
+    doc = await db[collection].find_one({"id": target_id}, SEARCH_PROJECTIONS[target_type])
+    if doc:
+        _search_index_put(target_type, doc)
+    else:
+        _search_index.remove(target_type, target_id)
+
+
+@api_router.get(
+    "/search",
+    dependencies=[Depends(rate_limit("search", max_requests=120, window_seconds=60))],
+)
+async def search(
+    q: str,
+    types: Optional[str] = None,
+    min_lat: Optional[float] = None,
+    min_lng: Optional[float] = None,
+    max_lat: Optional[float] = None,
+    max_lng: Optional[float] = None,
+    limit: Optional[int] = None,
+    prefix: bool = True,
+):
+    """
+    Ranked full-text search across incidents, street notes and chat.
+
+    `types` is an optional comma-separated subset of incident, street_note and
+    chat_message. The four bbox params (all together) restrict results to a map
+    viewport; chat has no location, so it drops out of bbox searches. With
+    `prefix` (default) the last word also matches words it starts, for
+    search-as-you-type.
+    """
+    q = (q or "").strip()
+    if not q:
+        raise HTTPException(status_code=422, detail="q is required")
+    if len(q) > MAX_SEARCH_QUERY_LEN:
+        raise HTTPException(status_code=422, detail="Query too long")
+    kinds = None
+    if types:
+        kinds = {t.strip().lower() for t in types.split(",") if t.strip()}
+        unknown = kinds - set(SEARCH_PROJECTIONS)
+        if unknown:
+            raise HTTPException(status_code=422, detail=f"Unknown type(s): {sorted(unknown)}")
+    bbox = None
+    bbox_filter = _bbox_filter(min_lat, min_lng, max_lat, max_lng)
+    if bbox_filter:
+        bbox = (
+            bbox_filter["latitude"]["$gte"], bbox_filter["longitude"]["$gte"],
+            bbox_filter["latitude"]["$lte"], bbox_filter["longitude"]["$lte"],
+        )
+    page = DEFAULT_SEARCH_LIMIT if limit is None else max(1, min(int(limit), MAX_SEARCH_LIMIT))
+
+    _search_index.expire()
+    results = _search_index.search(q, kinds=kinds, bbox=bbox, limit=page, prefix=prefix)
+    return {"query": q, "count": len(results), "results": results}
+
+
 # ── Moderation: user reports + admin review queue ─────────────────────────────
 # Maps a report target type to the collection it lives in. Used to verify the
 # target exists, hide/unhide it, and delete it from the admin queue.
@@ -1829,31 +2718,130 @@ async def create_report(report: ReportCreate):
     return {"success": True, "message": "Thanks — our moderators will review this."}
 
 
+# Only the fields _report_preview reads, so enriching a page of reports never
+# drags image blobs or contact details over the wire.
+REPORT_PREVIEW_PROJECTIONS = {
+    "incident": {"_id": 0, "id": 1, "hidden": 1, "description": 1, "category": 1, "urgency": 1},
+    "street_note": {"_id": 0, "id": 1, "hidden": 1, "text": 1, "kind": 1, "location_text": 1},
+    "chat_message": {"_id": 0, "id": 1, "hidden": 1, "message": 1, "author": 1},
+}
+DEFAULT_REPORT_PAGE = 100
+MAX_REPORT_PAGE = 500
+
+
+async def _fetch_report_targets(reports: List[dict]) -> Dict[Tuple[str, str], dict]:
+    """
+    Load the reported documents for a page of reports: one `$in` query per
+    target collection, run concurrently, instead of one find_one per report.
+    """
+    ids_by_type: Dict[str, set] = defaultdict(set)
+    for r in reports:
+        if r.get("target_type") in REPORT_TARGET_COLLECTIONS and r.get("target_id"):
+            ids_by_type[r["target_type"]].add(r["target_id"])
+
+    async def _load(target_type: str, ids: set) -> List[Tuple[Tuple[str, str], dict]]:
+        docs = await db[REPORT_TARGET_COLLECTIONS[target_type]].find(
+            {"id": {"$in": list(ids)}}, REPORT_PREVIEW_PROJECTIONS[target_type]
+        ).to_list(len(ids))
+        return [((target_type, d["id"]), d) for d in docs]
+
+    batches = await asyncio.gather(*(_load(t, ids) for t, ids in ids_by_type.items()))
+    return {key: doc for batch in batches for key, doc in batch}
+
+
 @api_router.get("/admin/reports")
-async def list_reports(status: Optional[str] = "open", _admin: str = Depends(require_admin)):
+async def list_reports(
+    status: Optional[str] = "open",
+    group: bool = True,
+    skip: int = 0,
+    limit: Optional[int] = None,
+    _admin: str = Depends(require_admin),
+):
     """
     Admin moderation queue. Returns reports (default: open) enriched with a
     snapshot of the reported content so moderators can decide without leaving
     the dashboard.
+
+    By default reports are collapsed to one row per reported item: the row is
+    the most recent report, plus `report_count`, `report_ids` (capped) and a
+    per-reason breakdown, so a spam wave of 50 reports on one post is one row.
+    Pass `group=false` for the flat list. Both modes page with `skip`/`limit`;
+    `total` is the number of rows across all pages.
     """
     query = {}
     if status and status != "all":
         query["status"] = status
-    reports = await db.content_reports.find({**query}, {"_id": 0}).sort("created_at", -1).to_list(500)
-
+    skip = max(0, int(skip))
+    page = DEFAULT_REPORT_PAGE if limit is None else max(1, min(int(limit), MAX_REPORT_PAGE))
+
+    if group:
+        pipeline = [
+            {"$match": query},
+            {"$sort": {"created_at": -1}},
+            # Count per (target, reason) first, then fold reasons into one row
+            # per target, keeping the newest report as the row's face.
+            {"$group": {
+                "_id": {"type": "$target_type", "id": "$target_id", "reason": "$reason"},
+                "latest": {"$first": "$$ROOT"},
+                "ids": {"$push": "$id"},
+                "n": {"$sum": 1},
+            }},
+            {"$sort": {"latest.created_at": -1}},
+            {"$group": {
+                "_id": {"type": "$_id.type", "id": "$_id.id"},
+                "latest": {"$first": "$latest"},
+                "report_count": {"$sum": "$n"},
+                "ids": {"$push": "$ids"},
+                "reasons": {"$push": {"k": "$_id.reason", "v": "$n"}},
+            }},
+            {"$sort": {"latest.created_at": -1}},
+            {"$facet": {
+                "rows": [{"$skip": skip}, {"$limit": page}],
+                "total": [{"$count": "n"}],
+            }},
+        ]
+        facet = (await db.content_reports.aggregate(pipeline).to_list(1))[0]
+        total = facet["total"][0]["n"] if facet["total"] else 0
+        reports = []
+        for row in facet["rows"]:
+            r = row["latest"]
+            r.pop("_id", None)
+            r["report_count"] = row["report_count"]
+            r["report_ids"] = [i for ids in row["ids"] for i in ids][:MAX_REPORT_PAGE]
+            r["reasons"] = {item["k"]: item["v"] for item in row["reasons"]}
+            reports.append(r)
+    else:
+        total = await db.content_reports.count_documents(query)
+        reports = await db.content_reports.find(query, {"_id": 0}).sort(
+            "created_at", -1
+        ).skip(skip).to_list(page)
+        for r in reports:
+            r["report_count"] = 1
+
+    targets = await _fetch_report_targets(reports)
     for r in reports:
         if isinstance(r.get("created_at"), datetime):
             r["created_at"] = r["created_at"].isoformat()
         if isinstance(r.get("resolved_at"), datetime):
             r["resolved_at"] = r["resolved_at"].isoformat()
-        collection = REPORT_TARGET_COLLECTIONS.get(r.get("target_type"))
-        target = None
-        if collection:
-            target = await db[collection].find_one({"id": r.get("target_id")}, {"_id": 0})
+        target = targets.get((r.get("target_type"), r.get("target_id")))
         r["target"] = _report_preview(r.get("target_type"), target)
 
     open_count = await db.content_reports.count_documents({"status": "open"})
-    return {"reports": reports, "open_count": open_count}
+    return {
+        "reports": reports,
+        "open_count": open_count,
+        "total": total,
+        "skip": skip,
+        "limit": page,
+    }
+
+
+def _norm_moderation_action(v: Optional[str]) -> str:
+    v = (v or "").strip().lower()
+    if v not in {"dismiss", "hide", "unhide", "delete"}:
+        raise ValueError("action must be one of dismiss, hide, unhide, delete")
+    return v
 
 
 class ReportActionRequest(BaseModel):
@@ -1862,10 +2850,7 @@ class ReportActionRequest(BaseModel):
     @field_validator("action")
     @classmethod
     def _check_action(cls, v: str) -> str:
-        v = (v or "").strip().lower()
-        if v not in {"dismiss", "hide", "unhide", "delete"}:
-            raise ValueError("action must be one of dismiss, hide, unhide, delete")
-        return v
+        return _norm_moderation_action(v)
 
 
 @api_router.post("/admin/reports/{report_id}/action")
@@ -1892,12 +2877,229 @@ async def action_report(report_id: str, req: ReportActionRequest, _admin: str =
     elif req.action == "delete" and collection:
         await db[collection].delete_one({"id": target_id})
 
+    # Keep search in step with moderation: hidden/deleted content must not be
+    # findable, and unhidden content becomes searchable again.
+    if collection and req.action in ("hide", "delete"):
+        _search_index.remove(report.get("target_type"), target_id)
+    elif collection and req.action == "unhide":
+        await _search_index_refresh(report.get("target_type"), target_id)
+
+    # The queue shows one row per reported item, so resolving it resolves every
+    # open report on the same target along with this one.
     new_status = "dismissed" if req.action == "dismiss" else "actioned"
-    await db.content_reports.update_one(
-        {"id": report_id},
+    result = await db.content_reports.update_many(
+        {"$or": [
+            {"id": report_id},
+            {"target_type": report.get("target_type"), "target_id": target_id, "status": "open"},
+        ]},
         {"$set": {"status": new_status, "resolution": req.action, "resolved_at": now}},
     )
-    return {"success": True, "status": new_status, "resolution": req.action}
+    return {
+        "success": True,
+        "status": new_status,
+        "resolution": req.action,
+        "resolved_count": result.modified_count,
+    }
+
+
+# ── Bulk moderation ───────────────────────────────────────────────────────────
+# Cleaning up a spam wave one id per request means hundreds of round-trips. The
+# bulk endpoint resolves a list of ids (or a filter) to at most MAX_BULK_ITEMS
+# targets of one type and applies the action with a single bulk_write, then
+# resolves every open report on those targets with one update_many.
+MAX_BULK_ITEMS = 1000
+
+# Creation-time field per target type, for the since/until filter.
+REPORT_TARGET_TIME_FIELDS = {
+    "incident": "timestamp",
+    "street_note": "created_at",
+    "chat_message": "timestamp",
+}
+
+
+class BulkTargetFilter(BaseModel):
+    category: Optional[str] = None      # incidents only
+    min_lat: Optional[float] = None
+    min_lng: Optional[float] = None
+    max_lat: Optional[float] = None
+    max_lng: Optional[float] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    # Only targets with an open report for this reason.
+    reason: Optional[str] = None
+
+    @field_validator("category")
+    @classmethod
+    def _check_category(cls, v: Optional[str]) -> Optional[str]:
+        if v is None:
+            return v
+        v = v.strip().lower()
+        if v not in ALLOWED_CATEGORIES:
+            raise ValueError(f"category must be one of {sorted(ALLOWED_CATEGORIES)}")
+        return v
+
+    @field_validator("reason")
+    @classmethod
+    def _check_reason(cls, v: Optional[str]) -> Optional[str]:
+        if v is None:
+            return v
+        v = v.strip().lower()
+        if v not in ALLOWED_REPORT_REASONS:
+            raise ValueError(f"reason must be one of {sorted(ALLOWED_REPORT_REASONS)}")
+        return v
+
+
+class BulkModerationRequest(BaseModel):
+    target_type: str
+    action: str  # dismiss | hide | unhide | delete
+    ids: Optional[List[str]] = Field(default=None, max_length=MAX_BULK_ITEMS)
+    filter: Optional[BulkTargetFilter] = None
+    # Resolve and return the matching ids without changing anything.
+    dry_run: bool = False
+
+    @field_validator("target_type")
+    @classmethod
+    def _check_target_type(cls, v: str) -> str:
+        v = (v or "").strip().lower()
+        if v not in REPORT_TARGET_COLLECTIONS:
+            raise ValueError(f"target_type must be one of {sorted(REPORT_TARGET_COLLECTIONS)}")
+        return v
+
+    @field_validator("action")
+    @classmethod
+    def _check_action(cls, v: str) -> str:
+        return _norm_moderation_action(v)
+
+
+async def _resolve_bulk_targets(req: BulkModerationRequest) -> Tuple[List[str], bool]:
+    """
+    Turn the request's ids / filter into the list of target ids to act on.
+    Returns (ids, truncated) where truncated means the filter matched more than
+    MAX_BULK_ITEMS and only the newest batch was taken.
+    """
+    if req.ids is not None:
+        # De-duplicate but keep the caller's order for the per-item results.
+        return list(dict.fromkeys(i for i in req.ids if i)), False
+
+    f = req.filter
+    query: Dict = {}
+    if f.category:
+        if req.target_type != "incident":
+            raise HTTPException(status_code=422, detail="category filter applies to incidents only")
+        query["category"] = f.category
+    bbox = _bbox_filter(f.min_lat, f.min_lng, f.max_lat, f.max_lng)
+    if bbox:
+        if req.target_type == "chat_message":
+            raise HTTPException(status_code=422, detail="chat messages have no location")
+        query.update(bbox)
+    time_field = REPORT_TARGET_TIME_FIELDS[req.target_type]
+    if f.since or f.until:
+        bounds = {"gte": f.since, "lt": f.until}
+        query.update(_date_range(time_field, **{op: v for op, v in bounds.items() if v}))
+    if f.reason:
+        reported = await db.content_reports.distinct(
+            "target_id",
+            {"target_type": req.target_type, "reason": f.reason, "status": "open"},
+        )
+        query["id"] = {"$in": reported}
+    if not query:
+        raise HTTPException(status_code=422, detail="filter must set at least one criterion")
+
+    docs = await db[REPORT_TARGET_COLLECTIONS[req.target_type]].find(
+        query, {"_id": 0, "id": 1}
+    ).sort(time_field, -1).to_list(MAX_BULK_ITEMS + 1)
+    ids = [d["id"] for d in docs if d.get("id")]
+    return ids[:MAX_BULK_ITEMS], len(ids) > MAX_BULK_ITEMS
+
+
+@api_router.post("/admin/bulk")
+async def bulk_moderate(req: BulkModerationRequest, _admin: str = Depends(require_admin)):
+    """
+    Apply one moderation action to many items of one type.
+
+    Targets come from `ids` (up to MAX_BULK_ITEMS) or from `filter` (category,
+    bbox, since/until, open-report reason). Content changes go through a single
+    bulk_write and every open report on the affected items is resolved with a
+    single update_many. Returns a per-item status (`ok` | `not_found`).
+    """
+    if (req.ids is None) == (req.filter is None):
+        raise HTTPException(status_code=422, detail="Provide exactly one of ids or filter")
+    ids, truncated = await _resolve_bulk_targets(req)
+    collection = db[REPORT_TARGET_COLLECTIONS[req.target_type]]
+
+    existing = set()
+    if ids:
+        existing = {
+            d["id"] for d in await collection.find(
+                {"id": {"$in": ids}}, {"_id": 0, "id": 1}
+            ).to_list(len(ids))
+        }
+    results = [{"id": i, "status": "ok" if i in existing else "not_found"} for i in ids]
+    response = {
+        "success": True,
+        "target_type": req.target_type,
+        "action": req.action,
+        "dry_run": req.dry_run,
+        "truncated": truncated,
+        "matched": len(existing),
+        "modified": 0,
+        "reports_resolved": 0,
+        "results": results,
+    }
+    if req.dry_run or not ids:
+        return response
+
+    found = [i for i in ids if i in existing]
+    ops = []
+    if req.action in ("hide", "unhide"):
+        hidden = req.action == "hide"
+        ops = [UpdateOne({"id": i}, {"$set": {"hidden": hidden}}) for i in found]
+    elif req.action == "delete":
+        ops = [DeleteOne({"id": i}) for i in found]
+    if ops:
+        result = await collection.bulk_write(ops, ordered=False)
+        response["modified"] = result.modified_count + result.deleted_count
+
+    if req.action in ("hide", "delete"):
+        for i in found:
+            _search_index.remove(req.target_type, i)
+    elif req.action == "unhide" and found:
+        async for doc in collection.find(
+            {"id": {"$in": found}}, SEARCH_PROJECTIONS[req.target_type]
+        ):
+            _search_index_put(req.target_type, doc)
+
+    # Reports on items that no longer exist are resolved too, so a bulk
+    # cleanup leaves nothing dangling in the queue.
+    reports = await db.content_reports.update_many(
+        {"target_type": req.target_type, "target_id": {"$in": ids}, "status": "open"},
+        {"$set": {
+            "status": "dismissed" if req.action == "dismiss" else "actioned",
+            "resolution": req.action,
+            "resolved_at": datetime.now(timezone.utc),
+        }},
+    )
+    response["reports_resolved"] = reports.modified_count
+    return response
+
+
+# ── Metrics ───────────────────────────────────────────────────────────────────
+# Prometheus scrape target (see metrics.py). With METRICS_TOKEN set the scraper
+# sends it as a Bearer token; without one, only loopback clients (a sidecar or
+# an SSH tunnel) may read it. The socket peer is checked, not X-Forwarded-For.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "").strip()
+METRICS_LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    if METRICS_TOKEN:
+        supplied = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied.encode(), METRICS_TOKEN.encode()):
+            raise HTTPException(status_code=401, detail="Metrics token required")
+    elif not request.client or request.client.host not in METRICS_LOOPBACK_HOSTS:
+        raise HTTPException(status_code=403, detail="Metrics are only served to localhost")
+    return Response(content=REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
 
 
 # Include the router in the main app
@@ -1920,22 +3122,41 @@ _cors_origins = [
 # Guard against the insecure combination of credentials + wildcard origin.
 _allow_credentials = "*" not in _cors_origins
 
+# gzip/brotli for the feeds and other large JSON. Added before everything else
+# so it is innermost: the timing in EdgeMiddleware includes compression, and
+# cached content arrives already encoded and is passed through.
+app.add_middleware(CompressionMiddleware, min_size=COMPRESS_MIN_BYTES)
+
+# Rate limits and body-size caps enforced before routing / body parsing. Added
+# next so it sits inside CORS, and its 413/429 responses still carry CORS
+# headers the frontend can read.
+MAX_REQUEST_BODY_BYTES = int(os.environ.get("MAX_REQUEST_BODY_BYTES", str(512 * 1024)))
+# Routes that accept an inline base64 image_url get room for one.
+MAX_UPLOAD_BODY_BYTES = MAX_IMAGE_URL_LEN + 64 * 1024
+LARGE_BODY_ROUTES = {
+    ("POST", "/api/incidents"): MAX_UPLOAD_BODY_BYTES,
+    ("PUT", "/api/admin/incidents/{incident_id}"): MAX_UPLOAD_BODY_BYTES,
+    ("POST", "/api/street-notes"): MAX_UPLOAD_BODY_BYTES,
+}
 app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=_allow_credentials,
+    RequestGuardMiddleware,
+    router=app.router,
+    max_body_bytes=MAX_REQUEST_BODY_BYTES,
+    large_body_routes=LARGE_BODY_ROUTES,
+)
+
+# Timing, security headers and CORS in one pure-ASGI pass. Added last so it
+# is the outermost middleware and measures the full request lifecycle.
+app.add_middleware(
+    EdgeMiddleware,
     allow_origins=_cors_origins,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Authorization", "Content-Type", "CF-Turnstile-Token"],
-    expose_headers=["X-Response-Time-ms", "Retry-After"],
+    expose_headers=["X-Response-Time-ms", "X-Db-Time-ms", "X-Db-Calls", "Retry-After"],
+    allow_credentials=_allow_credentials,
+    db_headers=not IS_PRODUCTION,
 )
 
-# Security headers on every response.
-app.add_middleware(SecurityHeadersMiddleware)
-
-# Request timing / error + slow-endpoint logging. Added last so it is the
-# outermost middleware and measures the full request lifecycle.
-app.add_middleware(RequestTimingMiddleware)
-
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -1975,7 +3196,7 @@ DEFAULT_WELCOME_NOTICE_CONTENT = """<h2>Welcome to Melbourne Community Map</h2>
 
 <p style="margin-top: 1.5rem; padding-top: 1rem; border-top: 1px solid #e5e7eb; font-size: 0.85rem; color: #6b7280;">In an emergency, always call <strong>000</strong> first. This app is for community awareness only.</p>"""
 
-@app.on_event("startup")
+@startup_hook
 async def run_content_migrations():
     """
     One-time refresh of live updates and welcome notice when a new content version
@@ -2010,120 +3231,259 @@ async def run_content_migrations():
             "_id": f"content_refresh_{DEFAULT_CONTENT_VERSION}",
             "applied_at": now_iso
         })
+        _content_cache_put("live_updates", {"success": True, "content": DEFAULT_LIVE_UPDATES_TEXT})
+        _content_cache_put(
+            "welcome_notice", {"content": DEFAULT_WELCOME_NOTICE_CONTENT, "enabled": True}
+        )
         logger.info(f"Applied content refresh migration {DEFAULT_CONTENT_VERSION}")
     except Exception as e:
         logger.exception(f"Content migration failed: {e}")
 
-@app.on_event("startup")
-async def migrate_dates_to_datetimes():
+def _parse_legacy_date(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _convert_string_date(field: str):
+    def transform(doc: dict) -> Optional[dict]:
+        parsed = _parse_legacy_date(doc.get(field))
+        return {field: parsed} if parsed is not None else None
+    return transform
+
+
+def _backfill_chat_expiry(doc: dict) -> dict:
+    ts = _parse_legacy_date(doc.get("timestamp")) or datetime.now(timezone.utc)
+    return {"expire_at": ts + timedelta(hours=CHAT_TTL_HOURS)}
+
+
+# Convert legacy ISO-string date fields to real BSON dates so the TTL indexes
+# work and date range queries are correct. Until it completes, date-range
+# filters go through _date_range() to match both shapes.
+DATES_MIGRATION_ID = "dates_to_bson_v1"
+MIGRATIONS = [
+    Migration(
+        id=DATES_MIGRATION_ID,
+        version=1,
+        description="ISO-string dates to BSON dates; backfill chat expire_at",
+        steps=[
+            *(
+                BackfillStep(coll_name, {field: {"$type": "string"}}, _convert_string_date(field), {field: 1})
+                for coll_name, field in (
+                    ("incidents", "timestamp"),
+                    ("street_notes", "created_at"),
+                    ("street_notes", "expires_at"),
+                    ("street_highlights", "created_at"),
+                    ("chat_messages", "timestamp"),
+                    ("active_users", "last_heartbeat"),
+                )
+            ),
+            # Non-pinned chat messages need an expire_at for the TTL index.
+            BackfillStep(
+                "chat_messages",
+                {"expire_at": {"$exists": False}, "pinned": {"$ne": True}},
+                _backfill_chat_expiry,
+                {"timestamp": 1},
+            ),
+        ],
+    ),
+]
+_migrations: Optional[MigrationRunner] = None
+
+
+def _date_range(field: str, **bounds: datetime) -> dict:
     """
-    One-time migration: convert legacy ISO-string date fields to real BSON dates
-    so the TTL indexes work and date range queries are correct. Runs once
-    (guarded by a migration marker) and is safe to ship repeatedly.
+    A filter for `field` within `bounds` ($gte/$lt/...). While the dates
+    migration is still running, documents with a legacy ISO-string date match
+    too (ISO strings in one timezone compare in date order).
     """
-    marker_id = "dates_to_bson_v1"
-    try:
-        if await db.migrations.find_one({"_id": marker_id}):
-            return
+    condition = {f"${op}": value for op, value in bounds.items()}
+    if _migrations is not None and _migrations.is_complete(DATES_MIGRATION_ID):
+        return {field: condition}
+    legacy = {f"${op}": value.isoformat() for op, value in bounds.items()}
+    return {"$or": [{field: condition}, {field: legacy}]}
 
-        def _parse(value):
-            if isinstance(value, datetime):
-                return value
-            if isinstance(value, str) and value:
-                try:
-                    return datetime.fromisoformat(value)
-                except ValueError:
-                    return None
-            return None
 
-        # (collection, [date fields]) — convert any string values in place.
-        string_date_fields = [
-            ("incidents", ["timestamp"]),
-            ("street_notes", ["created_at", "expires_at"]),
-            ("street_highlights", ["created_at"]),
-            ("chat_messages", ["timestamp"]),
-            ("active_users", ["last_heartbeat"]),
-        ]
-        for coll_name, fields in string_date_fields:
-            coll = db[coll_name]
-            for field in fields:
-                async for doc in coll.find({field: {"$type": "string"}}, {field: 1}):
-                    parsed = _parse(doc.get(field))
-                    if parsed is not None:
-                        await coll.update_one({"_id": doc["_id"]}, {"$set": {field: parsed}})
-
-        # Backfill chat expire_at for non-pinned messages (drives the TTL index).
-        async for doc in db.chat_messages.find(
-            {"expire_at": {"$exists": False}}, {"timestamp": 1, "pinned": 1}
-        ):
-            if doc.get("pinned"):
-                continue
-            ts = _parse(doc.get("timestamp")) or datetime.now(timezone.utc)
-            await db.chat_messages.update_one(
-                {"_id": doc["_id"]},
-                {"$set": {"expire_at": ts + timedelta(hours=CHAT_TTL_HOURS)}},
-            )
+@startup_hook
+async def start_migrations():
+    """
+    Run pending data migrations (MIGRATIONS) in the background: batched,
+    checkpointed in db.migrations and resumable, so startup never waits for a
+    backfill. See migrations.py.
+    """
+    global _migrations
+    _migrations = MigrationRunner(db, MIGRATIONS)
+    _migrations.start()
 
-        await db.migrations.insert_one(
-            {"_id": marker_id, "applied_at": datetime.now(timezone.utc)}
-        )
-        logger.info("Applied date migration %s", marker_id)
-    except Exception as e:
-        logger.exception("Date migration failed: %s", e)
+
+# Indexes per collection, created with one create_indexes call each. TTL
+# indexes only delete documents whose indexed field is a Date in the past;
+# missing/None values are ignored (so 'forever' notes and pinned chat messages
+# are never removed).
+INDEX_MODELS: Dict[str, List[IndexModel]] = {
+    # incidents: fast id lookups + 6h TTL on creation time
+    "incidents": [
+        IndexModel("id"),
+        IndexModel("timestamp", expireAfterSeconds=INCIDENT_TTL_SECONDS),
+        # Compound lat/lng indexes back the map-viewport (bbox) range queries
+        # on the feeds. (A 2dsphere index for true nearest-neighbour search can
+        # be layered on later once docs carry a GeoJSON point.)
+        IndexModel([("latitude", 1), ("longitude", 1)]),
+    ],
+    # street notes: id lookups, recency sort, and per-document expiry
+    "street_notes": [
+        IndexModel("id"),
+        IndexModel("created_at"),
+        IndexModel("expires_at", expireAfterSeconds=0),
+        IndexModel([("latitude", 1), ("longitude", 1)]),
+    ],
+    # chat: recency sort + 24h TTL (pinned messages have no expire_at)
+    "chat_messages": [
+        IndexModel("timestamp"),
+        IndexModel("expire_at", expireAfterSeconds=0),
+    ],
+    # live presence markers
+    "peers": [
+        IndexModel("ts"),
+        IndexModel("updated_at", expireAfterSeconds=PEER_TTL_SECONDS),
+    ],
+    # active users presence window
+    "active_users": [
+        IndexModel("last_heartbeat", expireAfterSeconds=ACTIVE_USER_TTL_SECONDS),
+    ],
+    # moderation queue, and lookups by target
+    "content_reports": [
+        IndexModel("status"),
+        IndexModel("created_at"),
+        IndexModel([("target_type", 1), ("target_id", 1)]),
+    ],
+    # persistent geocode cache
+    "geocode_cache": [IndexModel("expires_at", expireAfterSeconds=0)],
+    # shared rate-limit buckets (RATE_LIMIT_BACKEND=mongo)
+    "rate_limits": [IndexModel("expires_at", expireAfterSeconds=0)],
+}
+# Build indexes in the background once the app is serving instead of during
+# startup (they already exist on every start after the first).
+DEFER_INDEX_BUILD = os.environ.get("DEFER_INDEX_BUILD", "").strip().lower() in ("1", "true", "yes")
 
 
-@app.on_event("startup")
+async def _create_collection_indexes(coll_name: str, models: List[IndexModel]) -> None:
+    try:
+        await db[coll_name].create_indexes(models)
+        return
+    except Exception:
+        pass
+    # One index with conflicting options fails the whole batch; retry one by
+    # one so a single clash never blocks the others.
+    for model in models:
+        try:
+            await db[coll_name].create_indexes([model])
+        except Exception as e:
+            logger.warning("Could not create index %s on %s: %s", model.document["key"], coll_name, e)
+
+
+async def _build_indexes() -> None:
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _create_collection_indexes(coll_name, models) for coll_name, models in INDEX_MODELS.items()
+    ))
+    logger.info("Index/TTL setup complete in %.0f ms", (time.perf_counter() - start) * 1000)
+
+
+@startup_hook
 async def ensure_indexes():
     """
     Create the indexes that keep reads fast and let MongoDB auto-expire stale
-    data via TTL indexes. Idempotent: create_index is a no-op when the index
-    already exists with the same options. TTL indexes only delete documents
-    whose indexed field is a Date in the past; missing/None values are ignored
-    (so 'forever' notes and pinned chat messages are never removed).
-    """
-    index_specs = [
-        # incidents: fast id lookups + 6h TTL on creation time
-        ("incidents", "id", {}),
-        ("incidents", "timestamp", {"expireAfterSeconds": INCIDENT_TTL_SECONDS}),
-        # street notes: id lookups, recency sort, and per-document expiry
-        ("street_notes", "id", {}),
-        ("street_notes", "created_at", {}),
-        ("street_notes", "expires_at", {"expireAfterSeconds": 0}),
-        # chat: recency sort + 24h TTL (pinned messages have no expire_at)
-        ("chat_messages", "timestamp", {}),
-        ("chat_messages", "expire_at", {"expireAfterSeconds": 0}),
-        # live presence markers
-        ("peers", "ts", {}),
-        ("peers", "updated_at", {"expireAfterSeconds": PEER_TTL_SECONDS}),
-        # active users presence window
-        ("active_users", "last_heartbeat", {"expireAfterSeconds": ACTIVE_USER_TTL_SECONDS}),
-        # moderation queue
-        ("content_reports", "status", {}),
-        ("content_reports", "created_at", {}),
-    ]
-    for coll_name, field, opts in index_specs:
-        try:
-            await db[coll_name].create_index(field, **opts)
-        except Exception as e:
-            # Most likely an existing index with conflicting options; log and
-            # continue so a single clash never blocks startup.
-            logger.warning("Could not create index on %s.%s: %s", coll_name, field, e)
-    # Compound index for moderation lookups by target.
+    data via TTL indexes: one create_indexes per collection, all collections
+    concurrently. Idempotent (a no-op for indexes that already exist). With
+    DEFER_INDEX_BUILD set this runs in the background after startup.
+    """
+    if DEFER_INDEX_BUILD:
+        _run_in_background(_build_indexes())
+    else:
+        await _build_indexes()
+
+
+@startup_hook
+async def build_search_index():
+    """
+    Load every visible, unexpired incident, street note and chat message into
+    the in-memory search index (legacy string dates are read via _as_epoch, so
+    this doesn't wait for the dates migration); from here on the write handlers
+    keep it current.
+    """
     try:
-        await db.content_reports.create_index([("target_type", 1), ("target_id", 1)])
+        _search_index.clear()
+        for target_type, projection in SEARCH_PROJECTIONS.items():
+            collection = REPORT_TARGET_COLLECTIONS[target_type]
+            async for doc in db[collection].find({"hidden": {"$ne": True}}, projection):
+                _search_index_put(target_type, doc)
+        _search_index.expire()
+        logger.info("Search index built: %d documents", len(_search_index))
     except Exception as e:
-        logger.warning("Could not create content_reports target index: %s", e)
-    # Compound lat/lng indexes back the map-viewport (bbox) range queries on the
-    # incident and street-note feeds. (A 2dsphere index for true nearest-neighbour
-    # search can be layered on later once docs carry a GeoJSON point.)
-    for coll_name in ("incidents", "street_notes"):
-        try:
-            await db[coll_name].create_index([("latitude", 1), ("longitude", 1)])
-        except Exception as e:
-            logger.warning("Could not create %s geo index: %s", coll_name, e)
-    logger.info("Index/TTL setup complete")
+        logger.exception("Search index build failed: %s", e)
+
+
+@startup_hook
+async def load_gazetteer():
+    """Memory-map the offline gazetteer (geocoding falls back to Nominatim without it)."""
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = Gazetteer.open(GAZETTEER_PATH)
+        if _gazetteer is not None:
+            logger.info("Offline gazetteer loaded: %d places", len(_gazetteer))
+
+
+async def _warm_http_client() -> None:
+    # aiohttp is only needed for Turnstile/Nominatim calls; import it off the
+    # event loop once the app is serving, then open the pooled session.
+    await asyncio.to_thread(importlib.import_module, "aiohttp")
+    await _http.start()
+
+
+@startup_hook
+async def start_http_client():
+    """Open the pooled outbound HTTP session (Turnstile, Nominatim) after startup."""
+    _run_in_background(_warm_http_client())
+
+
+@app.on_event("startup")
+async def log_startup_report():
+    """
+    Log where cold-start time went: imports, the module body, and each startup
+    hook. Registered last, so every hook has finished by now.
+    """
+    ready = time.perf_counter()
+    STARTUP_REPORT.update(
+        imports_ms=(_IMPORTS_DONE - _IMPORT_STARTED) * 1000,
+        module_ms=(_MODULE_LOADED - _IMPORTS_DONE) * 1000,
+        hooks_ms=dict(_startup_timings),
+        total_ms=(ready - _IMPORT_STARTED) * 1000,
+    )
+    logger.info(
+        "startup_report total_ms=%.0f imports_ms=%.0f module_ms=%.0f %s",
+        STARTUP_REPORT["total_ms"], STARTUP_REPORT["imports_ms"], STARTUP_REPORT["module_ms"],
+        " ".join(f"{name}_ms={ms:.0f}" for name, ms in _startup_timings),
+    )
+    _startup_timings.clear()
 
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    if _migrations is not None:
+        await _migrations.stop()
+    for task in list(_background_tasks):
+        task.cancel()
+    _rate_limiter.close()
+    await _http.close()
+    client.close()
+
+
+# Filled in by log_startup_report.
+STARTUP_REPORT: Dict[str, object] = {}
+_MODULE_LOADED = time.perf_counter()
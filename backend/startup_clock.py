@@ -0,0 +1,9 @@
+"""
+Process start time for the startup timing report in server.py.
+
+Kept in its own module so server.py can import it before everything else and
+still keep all its imports at the top of the file.
+"""
+import time
+
+STARTED = time.perf_counter()
@@ -0,0 +1,954 @@
+"""
+Storage backends: MongoDB through Motor, or an in-process memory store.
+
+The handlers speak Motor's collection API (`db.incidents.find(...)`,
+`update_one`, `bulk_write`, `aggregate`, ...), so that API is the storage
+interface. STORAGE_BACKEND picks what sits behind it:
+
+- `mongo` (default): an AsyncIOMotorClient.
+- `memory`: MemoryClient below. It implements the part of the Motor API this
+  app uses, with MongoDB's semantics, on plain dicts in this process. With it
+  the whole API can be tested, load-tested and profiled without a network or a
+  mongod. Nothing persists past the process.
+
+What the memory store covers:
+
+- Queries: equality (on dotted paths and array elements), $eq, $ne, $gt, $gte,
+  $lt, $lte, $in, $nin, $exists, $type, $or, $and, $nor. Comparisons only match
+  values of the same BSON type, as in MongoDB, so a datetime bound never
+  matches a legacy string date.
+- Projections, sort / skip / limit, count_documents and distinct.
+- Updates: $set, $unset, $inc, $push, $setOnInsert and upserts; bulk_write with
+  InsertOne, UpdateOne, UpdateMany, ReplaceOne, DeleteOne and DeleteMany.
+- aggregate: $match, $sort, $skip, $limit, $count, $facet and $group (with
+  $first, $last, $push, $addToSet, $sum, $min, $max and $avg).
+- Indexes: `_id` and unique indexes raise DuplicateKeyError. TTL indexes expire
+  documents on a sweep that runs before an operation at most every
+  TTL_SWEEP_SECONDS, which is stricter than mongod's 60 s monitor.
+
+Documents are copied on the way in and out. Datetimes are stored as UTC with
+millisecond precision, as BSON stores them, and come back timezone-aware.
+Read preferences are accepted and ignored (there is one node). Each operation
+is reported to the client's `event_listeners` as one pymongo command event
+(find, insert, update, ...), so db_monitor times it like a round trip to mongod.
+A bulk_write is reported as one command named after its first operation.
+"""
+import itertools
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import IndexModel, ReturnDocument, monitoring
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.read_preferences import Primary
+from pymongo.results import (
+    BulkWriteResult,
+    DeleteResult,
+    InsertManyResult,
+    InsertOneResult,
+    UpdateResult,
+)
+
+BACKENDS = ("mongo", "memory")
+
+TTL_SWEEP_SECONDS = 1.0
+
+_MISSING = object()
+# What command events report as the server address.
+_CONNECTION = ("memory", 0)
+_request_ids = itertools.count(1)
+
+
+def open_client(backend: str, mongo_url: str = "", **options):
+    """A Motor client for `mongo`, a MemoryClient for `memory`."""
+    if backend == "memory":
+        return MemoryClient(**options)
+    if backend == "mongo":
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        return AsyncIOMotorClient(mongo_url, **options)
+    raise ValueError(f"storage backend must be one of {BACKENDS}, not {backend!r}")
+
+
+# ── values ────────────────────────────────────────────────────────────────────
+def _bsonify(value: Any) -> Any:
+    """A stored copy of `value`: containers copied, datetimes as BSON keeps them."""
+    if isinstance(value, dict):
+        return {k: _bsonify(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_bsonify(v) for v in value]
+    if isinstance(value, datetime):
+        value = value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+
+def _clone(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _clone(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_clone(v) for v in value]
+    return value
+
+
+def _bracket(value: Any) -> int:
+    """BSON comparison order: values of different types never compare equal."""
+    if value is None or value is _MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, bytes):
+        return 6
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def _sort_key(value: Any) -> tuple:
+    bracket = _bracket(value)
+    if bracket == 1:
+        return (1, 0)
+    if bracket in (4, 5, 10):
+        return (bracket, repr(value))
+    return (bracket, value)
+
+
+def _key(value: Any) -> tuple:
+    """A hashable identity for `_id`s and group keys (1 and 1.0 are one key)."""
+    bracket = _bracket(value)
+    if bracket in (4, 5, 10):
+        return (bracket, repr(value))
+    return (bracket, value)
+
+
+def _equal(a: Any, b: Any) -> bool:
+    return _bracket(a) == _bracket(b) and a == b
+
+
+# ── paths ─────────────────────────────────────────────────────────────────────
+def _get(doc: Any, path: str) -> Any:
+    node = doc
+    for part in path.split("."):
+        if isinstance(node, dict):
+            node = node.get(part, _MISSING)
+        elif isinstance(node, list) and part.isdigit() and int(part) < len(node):
+            node = node[int(part)]
+        else:
+            return _MISSING
+        if node is _MISSING:
+            return node
+    return node
+
+
+def _candidates(doc: dict, path: str) -> List[Any]:
+    """Every value a query on `path` tests: arrays along the way fan out, and an
+    array value is tested both whole and per element, as in MongoDB."""
+    if "." not in path:
+        if path not in doc:
+            return []
+        value = doc[path]
+        return [value, *value] if isinstance(value, list) else [value]
+    nodes = [doc]
+    for part in path.split("."):
+        found = []
+        for node in nodes:
+            if isinstance(node, dict):
+                if part in node:
+                    found.append(node[part])
+            elif isinstance(node, list):
+                if part.isdigit():
+                    if int(part) < len(node):
+                        found.append(node[int(part)])
+                else:
+                    found.extend(item[part] for item in node if isinstance(item, dict) and part in item)
+        nodes = found
+    values = []
+    for node in nodes:
+        values.append(node)
+        if isinstance(node, list):
+            values.extend(node)
+    return values
+
+
+def _set_path(doc: dict, path: str, value: Any) -> None:
+    parts = path.split(".")
+    node = doc
+    for part in parts[:-1]:
+        if isinstance(node, list) and part.isdigit():
+            node = node[int(part)]
+            continue
+        child = node.get(part)
+        if not isinstance(child, (dict, list)):
+            child = node[part] = {}
+        node = child
+    last = parts[-1]
+    if isinstance(node, list) and last.isdigit():
+        index = int(last)
+        node.extend([None] * (index + 1 - len(node)))
+        node[index] = value
+    else:
+        node[last] = value
+
+
+def _unset_path(doc: dict, path: str) -> None:
+    parts = path.split(".")
+    parent = _get(doc, ".".join(parts[:-1])) if len(parts) > 1 else doc
+    if isinstance(parent, dict):
+        parent.pop(parts[-1], None)
+    elif isinstance(parent, list) and parts[-1].isdigit() and int(parts[-1]) < len(parent):
+        parent[int(parts[-1])] = None
+
+
+# ── queries ───────────────────────────────────────────────────────────────────
+_TYPES: Dict[str, Tuple[type, ...]] = {
+    "double": (float,), "int": (int,), "long": (int,), "number": (int, float),
+    "string": (str,), "object": (dict,), "array": (list,), "bool": (bool,),
+    "date": (datetime,), "objectId": (ObjectId,), "null": (type(None),),
+}
+
+
+def _is_operator_doc(value: Any) -> bool:
+    return isinstance(value, dict) and bool(value) and all(k.startswith("$") for k in value)
+
+
+def _eq_any(values: List[Any], target: Any) -> bool:
+    if target is None:
+        return not values or any(v is None for v in values)
+    return any(_equal(v, target) for v in values)
+
+
+class _InList(list):
+    """An $in / $nin operand with its items' keys hashed once per query."""
+
+    def __init__(self, items: List[Any]):
+        super().__init__(items)
+        self.keys = {_key(item) for item in items}
+        self.has_none = any(item is None for item in items)
+
+
+def _in(values: List[Any], items: List[Any]) -> bool:
+    # One hash probe per value, not a scan of `items`: moderation and admin
+    # queries pass hundreds of ids.
+    if not isinstance(items, _InList):
+        items = _InList(items)
+    if items.has_none and _eq_any(values, None):
+        return True
+    return any(_key(v) in items.keys for v in values)
+
+
+def _compile(query: Any) -> Any:
+    """`query` with its $in / $nin lists pre-hashed, for matching many docs."""
+    if isinstance(query, dict):
+        return {k: _InList(v) if k in ("$in", "$nin") and isinstance(v, list) else _compile(v)
+                for k, v in query.items()}
+    if isinstance(query, list):
+        return [_compile(v) for v in query]
+    return query
+
+
+def _compare(values: List[Any], bound: Any, test: Callable[[Any, Any], bool]) -> bool:
+    bracket = _bracket(bound)
+    return any(_bracket(v) == bracket and test(v, bound) for v in values)
+
+
+def _check_operator(op: str, arg: Any, values: List[Any]) -> bool:
+    if op == "$eq":
+        return _eq_any(values, arg)
+    if op == "$ne":
+        return not _eq_any(values, arg)
+    if op == "$gt":
+        return _compare(values, arg, lambda v, b: v > b)
+    if op == "$gte":
+        return _compare(values, arg, lambda v, b: v >= b)
+    if op == "$lt":
+        return _compare(values, arg, lambda v, b: v < b)
+    if op == "$lte":
+        return _compare(values, arg, lambda v, b: v <= b)
+    if op == "$in":
+        return _in(values, arg)
+    if op == "$nin":
+        return not _in(values, arg)
+    if op == "$exists":
+        return bool(values) == bool(arg)
+    if op == "$type":
+        names = arg if isinstance(arg, list) else [arg]
+        for name in names:
+            if name not in _TYPES:
+                raise OperationFailure(f"unknown $type {name!r}")
+            types = _TYPES[name]
+            if any(isinstance(v, types) and (bool not in types) != isinstance(v, bool) for v in values):
+                return True
+        return False
+    raise OperationFailure(f"unknown operator: {op}")
+
+
+def _matches(doc: dict, query: Optional[dict]) -> bool:
+    for key, cond in (query or {}).items():
+        if key == "$or":
+            if not any(_matches(doc, q) for q in cond):
+                return False
+        elif key == "$and":
+            if not all(_matches(doc, q) for q in cond):
+                return False
+        elif key == "$nor":
+            if any(_matches(doc, q) for q in cond):
+                return False
+        elif key.startswith("$"):
+            raise OperationFailure(f"unknown top level operator: {key}")
+        else:
+            values = _candidates(doc, key)
+            if _is_operator_doc(cond):
+                if not all(_check_operator(op, arg, values) for op, arg in cond.items()):
+                    return False
+            elif not _eq_any(values, cond):
+                return False
+    return True
+
+
+def _sorted(docs: List[dict], spec: Iterable[Tuple[str, int]]) -> List[dict]:
+    docs = list(docs)
+    for field, direction in reversed(list(spec)):
+        docs.sort(key=lambda d: _sort_key(_get(d, field)), reverse=direction < 0)
+    return docs
+
+
+def _sort_spec(key_or_list, direction=None) -> List[Tuple[str, int]]:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, 1 if direction is None else direction)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return [(k, d) for k, d in key_or_list]
+
+
+def _project(doc: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return _clone(doc)
+    if isinstance(projection, (list, tuple)):
+        projection = {name: 1 for name in projection}
+    include_id = bool(projection.get("_id", 1))
+    fields = {k: bool(v) for k, v in projection.items() if k != "_id"}
+    if fields and len(set(fields.values())) > 1:
+        raise OperationFailure("Cannot do exclusion on a field in inclusion projection")
+    if any(fields.values()) or (not fields and projection.get("_id") == 1):
+        out: dict = {}
+        if include_id and "_id" in doc:
+            out["_id"] = _clone(doc["_id"])
+        for path in fields:
+            value = _get(doc, path)
+            if value is not _MISSING:
+                _set_path(out, path, _clone(value))
+        return out
+    out = _clone(doc)
+    for path in fields:
+        _unset_path(out, path)
+    if not include_id:
+        out.pop("_id", None)
+    return out
+
+
+# ── updates ───────────────────────────────────────────────────────────────────
+def _apply_update(doc: dict, update: dict, inserting: bool = False) -> None:
+    if not _is_operator_doc(update):
+        raise ValueError("update only works with $ operators")
+    for op, fields in update.items():
+        for path, value in fields.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                _set_path(doc, path, _bsonify(value))
+            elif op == "$setOnInsert":
+                continue
+            elif op == "$unset":
+                _unset_path(doc, path)
+            elif op == "$inc":
+                current = _get(doc, path)
+                if current is _MISSING:
+                    current = 0
+                if _bracket(current) != 2 or _bracket(value) != 2:
+                    raise OperationFailure(f"Cannot apply $inc to a non-numeric value at {path!r}")
+                _set_path(doc, path, current + value)
+            elif op == "$push":
+                current = _get(doc, path)
+                if current is _MISSING:
+                    current = []
+                    _set_path(doc, path, current)
+                elif not isinstance(current, list):
+                    raise OperationFailure(f"The field {path!r} must be an array")
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                current.extend(_bsonify(item) for item in items)
+            else:
+                raise OperationFailure(f"Unknown modifier: {op}")
+
+
+def _upsert_seed(query: dict) -> dict:
+    """The document an upsert starts from: the query's equality conditions."""
+    doc: dict = {}
+    for key, cond in (query or {}).items():
+        if key.startswith("$"):
+            continue
+        if _is_operator_doc(cond):
+            if "$eq" in cond:
+                _set_path(doc, key, _bsonify(cond["$eq"]))
+        else:
+            _set_path(doc, key, _bsonify(cond))
+    return doc
+
+
+# ── aggregation ───────────────────────────────────────────────────────────────
+def _expr(doc: dict, expr: Any) -> Any:
+    if isinstance(expr, str) and expr.startswith("$"):
+        if expr == "$$ROOT":
+            return doc
+        if expr.startswith("$$"):
+            raise OperationFailure(f"unsupported variable {expr}")
+        return _get(doc, expr[1:])
+    if isinstance(expr, dict):
+        if _is_operator_doc(expr):
+            raise OperationFailure(f"unsupported expression {next(iter(expr))}")
+        out = {}
+        for k, v in expr.items():
+            value = _expr(doc, v)
+            if value is not _MISSING:
+                out[k] = value
+        return out
+    if isinstance(expr, list):
+        return [_expr(doc, v) for v in expr]
+    return expr
+
+
+def _group(docs: List[dict], spec: dict) -> List[dict]:
+    groups: Dict[tuple, dict] = {}
+    counts: Dict[tuple, Dict[str, int]] = {}
+    for doc in docs:
+        group_id = _expr(doc, spec["_id"])
+        if group_id is _MISSING:
+            group_id = None
+        key = _key(group_id)
+        row = groups.get(key)
+        if row is None:
+            row = groups[key] = {"_id": _clone(group_id)}
+            counts[key] = {}
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            (op, arg), = accumulator.items()
+            value = _expr(doc, arg)
+            present = value is not _MISSING
+            if op == "$first":
+                row.setdefault(field, _clone(value) if present else None)
+            elif op == "$last":
+                row[field] = _clone(value) if present else None
+            elif op == "$push":
+                row.setdefault(field, [])
+                if present:
+                    row[field].append(_clone(value))
+            elif op == "$addToSet":
+                row.setdefault(field, [])
+                if present and not any(_equal(v, value) for v in row[field]):
+                    row[field].append(_clone(value))
+            elif op in ("$sum", "$avg"):
+                row.setdefault(field, 0)
+                if present and _bracket(value) == 2:
+                    row[field] += value
+                    counts[key][field] = counts[key].get(field, 0) + 1
+            elif op in ("$min", "$max"):
+                if present and value is not None:
+                    best = row.get(field)
+                    if best is None or (_sort_key(value) < _sort_key(best)) == (op == "$min"):
+                        row[field] = _clone(value)
+                row.setdefault(field, None)
+            else:
+                raise OperationFailure(f"unknown group operator {op}")
+    for key, row in groups.items():
+        for field, accumulator in spec.items():
+            if field != "_id" and "$avg" in accumulator:
+                n = counts[key].get(field, 0)
+                row[field] = row[field] / n if n else None
+    return list(groups.values())
+
+
+def _aggregate(docs: List[dict], pipeline: List[dict]) -> List[dict]:
+    for stage in pipeline:
+        (op, arg), = stage.items()
+        if op == "$match":
+            docs = [d for d in docs if _matches(d, arg)]
+        elif op == "$sort":
+            docs = _sorted(docs, arg.items())
+        elif op == "$skip":
+            docs = docs[arg:]
+        elif op == "$limit":
+            docs = docs[:arg]
+        elif op == "$count":
+            docs = [{arg: len(docs)}] if docs else []
+        elif op == "$group":
+            docs = _group(docs, arg)
+        elif op == "$facet":
+            docs = [{name: _aggregate([_clone(d) for d in docs], sub) for name, sub in arg.items()}]
+        else:
+            raise OperationFailure(f"Unrecognized pipeline stage name: {op!r}")
+    return docs
+
+
+# ── client / database / collection ────────────────────────────────────────────
+class MemoryCursor:
+    """find() / aggregate() results; runs when first iterated, like a cursor."""
+
+    def __init__(self, run: Callable[[List[Tuple[str, int]], int, int], List[dict]], command=None):
+        self._run = run
+        self._command = command
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=None) -> "MemoryCursor":
+        self._sort = _sort_spec(key_or_list, direction)
+        return self
+
+    def skip(self, n: int) -> "MemoryCursor":
+        self._skip = n
+        return self
+
+    def limit(self, n: int) -> "MemoryCursor":
+        self._limit = n
+        return self
+
+    def batch_size(self, n: int) -> "MemoryCursor":
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        if self._command is None:
+            docs = self._run(self._sort, self._skip, self._limit)
+        else:
+            with self._command():
+                docs = self._run(self._sort, self._skip, self._limit)
+        return docs if length is None else docs[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in await self.to_list(None):
+            yield doc
+
+
+class MemoryCollection:
+    def __init__(self, database: "MemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        # _key(_id) -> stored document, in insertion (natural) order.
+        self._docs: Dict[tuple, dict] = {}
+        self._indexes: Dict[str, dict] = {"_id_": {"key": [("_id", 1)]}}
+        # Single-field indexes as hash maps: field -> _key(value) -> doc keys.
+        # Equality and $in lookups (e.g. {"id": ...}) use them instead of a scan.
+        self._lookup: Dict[str, Dict[tuple, Dict[tuple, None]]] = {}
+        self._swept = 0.0
+
+    @contextmanager
+    def _command(self, name: str, **fields):
+        """Report the operation in the block to the client's command listeners."""
+        listeners = self.database.client._listeners
+        if not listeners:
+            yield
+            return
+        request_id = next(_request_ids)
+        command = {name: self.name, **fields}
+        for listener in listeners:
+            listener.started(monitoring.CommandStartedEvent(
+                command, self.database.name, request_id, _CONNECTION, request_id,
+            ))
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as exc:
+            duration = timedelta(seconds=time.perf_counter() - start)
+            for listener in listeners:
+                listener.failed(monitoring.CommandFailedEvent(
+                    duration, {"ok": 0, "errmsg": str(exc)}, name, request_id, _CONNECTION, request_id,
+                ))
+            raise
+        duration = timedelta(seconds=time.perf_counter() - start)
+        for listener in listeners:
+            listener.succeeded(monitoring.CommandSucceededEvent(
+                duration, {"ok": 1}, name, request_id, _CONNECTION, request_id,
+            ))
+
+    # ── indexes and TTL ──────────────────────────────────────────────────────
+    async def create_indexes(self, indexes: List[IndexModel], **kwargs) -> List[str]:
+        names = []
+        for model in indexes:
+            spec = dict(model.document)
+            name = spec.pop("name")
+            spec["key"] = list(spec["key"].items())
+            existing = self._indexes.get(name)
+            if existing is not None and existing != spec:
+                raise OperationFailure(
+                    f"An existing index has the same name as the requested index: {name}", code=85
+                )
+            if spec.get("unique"):
+                seen = set()
+                for doc in self._docs.values():
+                    key = self._unique_key(doc, spec["key"])
+                    if key in seen:
+                        raise DuplicateKeyError(f"E11000 duplicate key error index: {name}", code=11000)
+                    seen.add(key)
+            self._indexes[name] = spec
+            field = spec["key"][0][0]
+            if len(spec["key"]) == 1 and field != "_id" and field not in self._lookup:
+                self._lookup[field] = {}
+                for key, doc in self._docs.items():
+                    self._index_doc(field, key, doc)
+            names.append(name)
+        return names
+
+    async def create_index(self, keys, **kwargs) -> str:
+        return (await self.create_indexes([IndexModel(keys, **kwargs)]))[0]
+
+    async def index_information(self) -> Dict[str, dict]:
+        return {name: _clone(spec) for name, spec in self._indexes.items()}
+
+    async def drop_indexes(self) -> None:
+        self._indexes = {"_id_": {"key": [("_id", 1)]}}
+        self._lookup = {}
+
+    async def drop(self) -> None:
+        self._docs.clear()
+        await self.drop_indexes()
+
+    @staticmethod
+    def _index_values(doc: dict, field: str) -> List[tuple]:
+        value = _get(doc, field)
+        if value is _MISSING:
+            value = None
+        return [_key(v) for v in value] if isinstance(value, list) and value else [_key(value)]
+
+    def _index_doc(self, field: str, key: tuple, doc: dict) -> None:
+        entries = self._lookup[field]
+        for value in self._index_values(doc, field):
+            entries.setdefault(value, {})[key] = None
+
+    def _put(self, key: tuple, doc: dict) -> None:
+        old = self._docs.get(key)
+        for field, entries in self._lookup.items():
+            if old is not None:
+                if _get(old, field) == _get(doc, field):
+                    continue
+                for value in self._index_values(old, field):
+                    entries[value].pop(key, None)
+            self._index_doc(field, key, doc)
+        self._docs[key] = doc
+
+    def _remove(self, key: tuple) -> None:
+        doc = self._docs.pop(key)
+        for field, entries in self._lookup.items():
+            for value in self._index_values(doc, field):
+                bucket = entries.get(value)
+                if bucket is not None:
+                    bucket.pop(key, None)
+                    if not bucket:
+                        del entries[value]
+
+    def _sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._swept < TTL_SWEEP_SECONDS:
+            return
+        self._swept = now
+        ttls = [(spec["key"][0][0], spec["expireAfterSeconds"])
+                for spec in self._indexes.values() if "expireAfterSeconds" in spec]
+        if not ttls:
+            return
+        wall = datetime.now(timezone.utc).timestamp()
+        for key, doc in list(self._docs.items()):
+            for field, seconds in ttls:
+                value = _get(doc, field)
+                dates = [v for v in (value if isinstance(value, list) else [value]) if isinstance(v, datetime)]
+                if dates and min(dates).timestamp() + seconds <= wall:
+                    self._remove(key)
+                    break
+
+    @staticmethod
+    def _unique_key(doc: dict, fields: List[Tuple[str, int]]) -> tuple:
+        return tuple(_key(None if (v := _get(doc, f)) is _MISSING else v) for f, _ in fields)
+
+    def _check_unique(self, doc: dict, replacing: Optional[tuple] = None) -> None:
+        key = _key(doc["_id"])
+        if key != replacing and key in self._docs:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error collection: {self.database.name}.{self.name} "
+                f"index: _id_ dup key: {{ _id: {doc['_id']!r} }}",
+                code=11000,
+            )
+        for name, spec in self._indexes.items():
+            if not spec.get("unique"):
+                continue
+            value = self._unique_key(doc, spec["key"])
+            for other_key, other in self._docs.items():
+                if other_key != replacing and self._unique_key(other, spec["key"]) == value:
+                    raise DuplicateKeyError(f"E11000 duplicate key error index: {name}", code=11000)
+
+    # ── reads ────────────────────────────────────────────────────────────────
+    def _select(self, query: Optional[dict]) -> List[Tuple[tuple, dict]]:
+        self._sweep()
+        query = _bsonify(query or {})
+        _id = query.get("_id", _MISSING)
+        if len(query) == 1 and _id is not _MISSING and not isinstance(_id, (dict, list)):
+            doc = self._docs.get(_key(_id))
+            return [(_key(_id), doc)] if doc is not None else []
+        query = _compile(query)
+        for field, entries in self._lookup.items():
+            value = query.get(field, _MISSING)
+            if isinstance(value, dict) and list(value) == ["$in"] and None not in value["$in"]:
+                probes = value["$in"]
+            elif value is not _MISSING and value is not None and not isinstance(value, (dict, list)):
+                probes = [value]
+            else:
+                continue
+            # Like an index scan, results come back grouped by probe value.
+            keys = dict.fromkeys(k for probe in probes for k in entries.get(_key(probe), {}))
+            return [(key, self._docs[key]) for key in keys if _matches(self._docs[key], query)]
+        return [(key, doc) for key, doc in self._docs.items() if _matches(doc, query)]
+
+    def find(self, filter: Optional[dict] = None, projection=None, *, sort=None,
+             skip: int = 0, limit: int = 0) -> MemoryCursor:
+        def run(sort_spec, n_skip, n_limit):
+            docs = [doc for _, doc in self._select(filter)]
+            if sort_spec:
+                docs = _sorted(docs, sort_spec)
+            docs = docs[n_skip:]
+            if n_limit:
+                docs = docs[:abs(n_limit)]
+            return [_project(doc, projection) for doc in docs]
+
+        cursor = MemoryCursor(run, lambda: self._command("find", filter=filter or {}))
+        if sort:
+            cursor.sort(sort)
+        return cursor.skip(skip).limit(limit)
+
+    async def find_one(self, filter=None, projection=None, *, sort=None) -> Optional[dict]:
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        docs = await self.find(filter, projection, sort=sort, limit=1).to_list(1)
+        return docs[0] if docs else None
+
+    async def count_documents(self, filter: dict, *, skip: int = 0, limit: int = 0) -> int:
+        with self._command("count", query=filter):
+            n = max(0, len(self._select(filter)) - skip)
+        return min(n, limit) if limit else n
+
+    async def estimated_document_count(self) -> int:
+        with self._command("count"):
+            self._sweep()
+            return len(self._docs)
+
+    async def distinct(self, key: str, filter: Optional[dict] = None) -> List[Any]:
+        values: List[Any] = []
+        with self._command("distinct", key=key, query=filter or {}):
+            matched = self._select(filter)
+        for _, doc in matched:
+            value = _get(doc, key)
+            for item in value if isinstance(value, list) else [value]:
+                if item is not _MISSING and not any(_equal(item, v) for v in values):
+                    values.append(_clone(item))
+        return values
+
+    def aggregate(self, pipeline: List[dict], **kwargs) -> MemoryCursor:
+        pipeline = _bsonify(pipeline)
+        return MemoryCursor(
+            lambda *_: _aggregate([_clone(doc) for _, doc in self._select({})], pipeline),
+            lambda: self._command("aggregate", pipeline=pipeline),
+        )
+
+    # ── writes ───────────────────────────────────────────────────────────────
+    def _insert(self, document: dict) -> Any:
+        if "_id" not in document:
+            # Like pymongo, the generated _id is added to the caller's dict.
+            document["_id"] = ObjectId()
+        doc = _bsonify(document)
+        self._check_unique(doc)
+        self._put(_key(doc["_id"]), doc)
+        return doc["_id"]
+
+    async def insert_one(self, document: dict, **kwargs) -> InsertOneResult:
+        with self._command("insert"):
+            self._sweep()
+            return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(self, documents: Iterable[dict], ordered: bool = True, **kwargs) -> InsertManyResult:
+        with self._command("insert"):
+            self._sweep()
+            return InsertManyResult([self._insert(doc) for doc in documents], True)
+
+    def _update(self, filter: dict, update: dict, upsert: bool, many: bool,
+                replacement: bool = False) -> Tuple[dict, Optional[dict], Optional[dict]]:
+        """Apply an update; returns (raw result, first document before, after)."""
+        matched = self._select(filter)
+        if not many:
+            matched = matched[:1]
+        if not matched:
+            if not upsert:
+                return {"n": 0, "nModified": 0}, None, None
+            doc = _upsert_seed(filter)
+            if replacement:
+                doc = {**({"_id": doc["_id"]} if "_id" in doc else {}), **_bsonify(update)}
+            else:
+                _apply_update(doc, update, inserting=True)
+            _id = self._insert(doc)
+            return {"n": 1, "nModified": 0, "upserted": _id}, None, doc
+        modified = 0
+        before = after = None
+        for key, old in matched:
+            if replacement:
+                new = {"_id": old["_id"], **_bsonify(update)}
+            else:
+                new = _clone(old)
+                _apply_update(new, update)
+            if _key(new.get("_id")) != key:
+                raise OperationFailure("Performing an update on the path '_id' would modify the immutable field '_id'")
+            if new != old:
+                self._check_unique(new, replacing=key)
+                self._put(key, new)
+                modified += 1
+            if before is None:
+                before, after = old, new
+        return {"n": len(matched), "nModified": modified}, before, after
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        with self._command("update", updates=[{"q": filter}]):
+            return UpdateResult(self._update(filter, update, upsert, many=False)[0], True)
+
+    async def update_many(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        with self._command("update", updates=[{"q": filter}]):
+            return UpdateResult(self._update(filter, update, upsert, many=True)[0], True)
+
+    async def replace_one(self, filter: dict, replacement: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        with self._command("update", updates=[{"q": filter}]):
+            return UpdateResult(
+                self._update(filter, replacement, upsert, many=False, replacement=True)[0], True
+            )
+
+    async def find_one_and_update(self, filter: dict, update: dict, projection=None, sort=None,
+                                  upsert: bool = False,
+                                  return_document: bool = ReturnDocument.BEFORE, **kwargs) -> Optional[dict]:
+        with self._command("findAndModify", query=filter):
+            if sort:
+                matched = _sorted([doc for _, doc in self._select(filter)], _sort_spec(sort, None))
+                if matched:
+                    filter = {"_id": matched[0]["_id"]}
+            _, before, after = self._update(filter, update, upsert, many=False)
+        doc = after if return_document == ReturnDocument.AFTER else before
+        return None if doc is None else _project(doc, projection)
+
+    def _delete(self, filter: dict, many: bool) -> int:
+        matched = self._select(filter)
+        if not many:
+            matched = matched[:1]
+        for key, _ in matched:
+            self._remove(key)
+        return len(matched)
+
+    async def delete_one(self, filter: dict, **kwargs) -> DeleteResult:
+        with self._command("delete", deletes=[{"q": filter}]):
+            return DeleteResult({"n": self._delete(filter, many=False)}, True)
+
+    async def delete_many(self, filter: dict, **kwargs) -> DeleteResult:
+        with self._command("delete", deletes=[{"q": filter}]):
+            return DeleteResult({"n": self._delete(filter, many=True)}, True)
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True, **kwargs) -> BulkWriteResult:
+        first = type(requests[0]).__name__ if requests else ""
+        name = "insert" if first == "InsertOne" else "delete" if first.startswith("Delete") else "update"
+        with self._command(name):
+            return self._bulk_write(requests, ordered)
+
+    def _bulk_write(self, requests: List[Any], ordered: bool) -> BulkWriteResult:
+        result = {"nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0,
+                  "nRemoved": 0, "upserted": [], "writeErrors": []}
+        for index, request in enumerate(requests):
+            kind = type(request).__name__
+            try:
+                if kind == "InsertOne":
+                    self._insert(request._doc)
+                    result["nInserted"] += 1
+                elif kind in ("UpdateOne", "UpdateMany", "ReplaceOne"):
+                    raw, _, _ = self._update(
+                        request._filter, request._doc, request._upsert,
+                        many=kind == "UpdateMany", replacement=kind == "ReplaceOne",
+                    )
+                    if "upserted" in raw:
+                        result["nUpserted"] += 1
+                        result["upserted"].append({"index": index, "_id": raw["upserted"]})
+                    else:
+                        result["nMatched"] += raw["n"]
+                        result["nModified"] += raw["nModified"]
+                elif kind in ("DeleteOne", "DeleteMany"):
+                    result["nRemoved"] += self._delete(request._filter, many=kind == "DeleteMany")
+                else:
+                    raise TypeError(f"{request!r} is not a valid request")
+            except DuplicateKeyError as exc:
+                result["writeErrors"].append({"index": index, "code": 11000, "errmsg": str(exc)})
+                if ordered:
+                    break
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+
+class MemoryDatabase:
+    def __init__(self, client: "MemoryClient", name: str, read_preference=None):
+        self.client = client
+        self.name = name
+        self.read_preference = read_preference or Primary()
+        # Shared by every handle on this database (e.g. one per read preference).
+        self._collections: Dict[str, MemoryCollection] = client._databases.setdefault(name, {})
+
+    def get_collection(self, name: str, **kwargs) -> MemoryCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = MemoryCollection(self, name)
+        return collection
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        return self.get_collection(name)
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self.get_collection(name)
+
+    async def list_collection_names(self) -> List[str]:
+        return list(self._collections)
+
+    async def drop_collection(self, name: str) -> None:
+        self._collections.pop(name, None)
+
+
+class MemoryClient:
+    """Drop-in for AsyncIOMotorClient; every database lives in this object."""
+
+    def __init__(self, *args, event_listeners=None, **kwargs):
+        self._databases: Dict[str, Dict[str, MemoryCollection]] = {}
+        self._listeners = list(event_listeners or ())
+
+    def get_database(self, name: str, read_preference=None, **kwargs) -> MemoryDatabase:
+        return MemoryDatabase(self, name, read_preference)
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        return self.get_database(name)
+
+    async def list_database_names(self) -> List[str]:
+        return list(self._databases)
+
+    async def drop_database(self, name: str) -> None:
+        self._databases.pop(name, None)
+
+    def close(self) -> None:
+        pass
@@ -1,9 +1,11 @@
 """
 Pytest configuration for the backend test suite.
 
-Tests run against a DEDICATED test database (community_map_test by default) on
-the same MongoDB connection, so they never touch production data. The whole
-test database is dropped at the end of the session.
+Tests run against the in-memory storage backend by default (storage.py), so
+the suite needs no MongoDB. Set TEST_STORAGE_BACKEND=mongo to run it against
+MONGO_URL instead: it then uses a DEDICATED test database (community_map_test
+by default) on that connection, so it never touches production data, and the
+whole test database is emptied at the end of the session.
 
 Environment is configured BEFORE importing server.py, because server.py reads
 configuration (MONGO_URL, DB_NAME, admin creds, JWT secret) at import time.
@@ -20,6 +22,7 @@ BACKEND_DIR = Path(__file__).resolve().parent.parent
 load_dotenv(BACKEND_DIR / ".env", override=True)
 
 os.environ["ENVIRONMENT"] = "development"
+os.environ["STORAGE_BACKEND"] = os.environ.get("TEST_STORAGE_BACKEND", "memory")
 os.environ["DB_NAME"] = os.environ.get("TEST_DB_NAME", "community_map_test")
 os.environ.setdefault("ADMIN_ACCOUNT", "admin")
 os.environ.setdefault("ADMIN_PIN", "123456")
@@ -49,14 +52,14 @@ def client():
 def reset_rate_limit():
     """Clear the in-memory rate-limit buckets around every test so limits from
     one test never bleed into the next."""
-    server._rate_store.clear()
+    server._rate_limiter.clear()
     yield
-    server._rate_store.clear()
+    server._rate_limiter.clear()
 
 
 @pytest.fixture
 def admin_token(client):
-    server._rate_store.clear()
+    server._rate_limiter.clear()
     res = client.post(
         "/api/admin/verify",
         json={"account": ADMIN_ACCOUNT, "pin": ADMIN_PIN},
@@ -77,7 +80,7 @@ def _clean_test_db_at_end():
     # DB. We empty each collection (a normal write) rather than dropDatabase,
     # which the Atlas app user is not permitted to do.
     db_name = os.environ["DB_NAME"]
-    if not db_name.endswith("_test"):
+    if os.environ["STORAGE_BACKEND"] != "mongo" or not db_name.endswith("_test"):
         return
     from pymongo import MongoClient
 
@@ -0,0 +1,123 @@
+"""
+Response compression (compression.py) and precompressed content-cache variants.
+
+Covered:
+  - Accept-Encoding negotiation honours q-values and falls back to gzip
+  - large JSON feeds are compressed; small or unaccepted responses are not
+  - max-quality precompression always runs in a worker thread
+  - cached content is compressed once per version and revalidates (304) with
+    its weak ETag
+  - admin writes to street highlights replace the cached copy
+"""
+import asyncio
+import gzip
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import compression
+import server
+
+
+def test_choose_encoding():
+    assert compression.choose_encoding(None) is None
+    assert compression.choose_encoding("identity") is None
+    assert compression.choose_encoding("gzip;q=0, deflate") is None
+    assert compression.choose_encoding("deflate, gzip;q=0.5") == "gzip"
+    assert compression.choose_encoding("*") == compression.supported()[0]
+    if compression.brotli is not None:
+        assert compression.choose_encoding("gzip, br") == "br"
+        assert compression.choose_encoding("gzip, br;q=0") == "gzip"
+
+
+def test_precompression_runs_off_the_event_loop(monkeypatch):
+    threaded = []
+
+    async def to_thread(fn, *args):
+        threaded.append(args[1:])
+        return fn(*args)
+
+    monkeypatch.setattr(compression.asyncio, "to_thread", to_thread)
+    body = b'{"content":"' + b"tram works " * 200 + b'"}'
+
+    async def run():
+        await compression.compress_async(body, "gzip")
+        return await compression.compress_async(body, "gzip", precompress=True)
+
+    packed = asyncio.run(run())
+    # Small bodies stay inline at request levels, but never at max quality.
+    assert threaded == [("gzip", True)]
+    assert gzip.decompress(packed) == body
+
+
+def test_large_feed_compressed(client):
+    now = datetime.now(timezone.utc)
+    client.portal.call(server.db.incidents.insert_many, [
+        {"id": str(uuid.uuid4()), "category": "other", "urgency": "low",
+         "description": f"compression test incident {i}", "latitude": -37.81, "longitude": 144.96,
+         "timestamp": now - timedelta(minutes=i), "like_count": 0, "dislike_count": 0}
+        for i in range(20)
+    ])
+    res = client.get("/api/incidents", headers={"Accept-Encoding": "gzip"})
+    assert res.status_code == 200
+    assert res.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in res.headers["vary"]
+    assert len(res.json()) >= 20
+
+    plain = client.get("/api/incidents", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == res.json()
+
+    small = client.get("/api/", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+
+def test_cached_content_precompressed_once(client, auth_headers, monkeypatch):
+    banner = "Precompressed banner " + "tram works on Swanston Street. " * 60
+    assert client.post(
+        "/api/admin/live-updates", headers=auth_headers, json={"content": banner}
+    ).status_code == 200
+
+    calls = []
+    compress_async = compression.compress_async
+
+    async def counting(body, encoding, precompress=False):
+        calls.append((encoding, precompress))
+        return await compress_async(body, encoding, precompress)
+
+    monkeypatch.setattr(compression, "compress_async", counting)
+    for _ in range(3):
+        res = client.get("/api/live-updates", headers={"Accept-Encoding": "gzip"})
+        assert res.headers["content-encoding"] == "gzip"
+        assert res.json()["content"] == banner
+    assert calls == [("gzip", True)]
+
+    _, rendered, etag, variants = server._content_cache["live_updates"]
+    assert gzip.decompress(variants["gzip"]) == rendered
+    assert res.headers["etag"] == f"W/{etag}"
+    again = client.get(
+        "/api/live-updates",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": res.headers["etag"]},
+    )
+    assert again.status_code == 304
+
+
+def test_highlight_writes_replace_cached_copy(client, auth_headers):
+    assert client.get("/api/street-highlights").headers["cache-control"] == "no-cache"
+    res = client.post("/api/admin/street-highlights", headers=auth_headers, json={
+        "start_lat": -37.81, "start_lng": 144.96, "end_lat": -37.812, "end_lng": 144.962,
+        "color": "red", "reason": "poor_lighting",
+    })
+    assert res.status_code == 200
+    highlight_id = res.json()["highlight"]["id"]
+    assert highlight_id in [h["id"] for h in client.get("/api/street-highlights").json()]
+
+    res = client.put(f"/api/admin/street-highlights/{highlight_id}",
+                     headers=auth_headers, json={"color": "green"})
+    assert res.status_code == 200
+    current = {h["id"]: h for h in client.get("/api/street-highlights").json()}
+    assert current[highlight_id]["color"] == "green"
+
+    assert client.delete(
+        f"/api/admin/street-highlights/{highlight_id}", headers=auth_headers
+    ).status_code == 200
+    assert highlight_id not in [h["id"] for h in client.get("/api/street-highlights").json()]
@@ -0,0 +1,55 @@
+"""
+Singleton content cache for /api/live-updates and /api/welcome-notice.
+
+Covered:
+  - responses carry an ETag + long Cache-Control, and If-None-Match gets a 304
+  - an admin edit is served immediately (the cache entry is replaced, not
+    left to expire) and changes the ETag
+  - street highlights expire on their own short TTL, bounding how long
+    another worker serves a copy from before an admin edit
+"""
+import time
+import uuid
+
+import server
+
+
+class TestContentCache:
+    def test_etag_revalidation_returns_304(self, client):
+        # Uncompressed, so the tag is strong and can be weakened below.
+        first = client.get("/api/welcome-notice", headers={"Accept-Encoding": "identity"})
+        assert first.status_code == 200
+        etag = first.headers["ETag"]
+        assert "max-age" in first.headers["Cache-Control"]
+
+        again = client.get("/api/welcome-notice", headers={"If-None-Match": etag})
+        assert again.status_code == 304
+        assert again.content == b""
+
+        weak = client.get("/api/welcome-notice", headers={"If-None-Match": f"W/{etag}"})
+        assert weak.status_code == 304
+
+    def test_admin_update_replaces_cached_copy(self, client, auth_headers):
+        before = client.get("/api/live-updates")
+        banner = f"Cache test banner {uuid.uuid4()}"
+        res = client.post(
+            "/api/admin/live-updates",
+            headers=auth_headers,
+            json={"content": banner},
+        )
+        assert res.status_code == 200
+
+        after = client.get("/api/live-updates")
+        assert after.json() == {"success": True, "content": banner}
+        assert after.headers["ETag"] != before.headers["ETag"]
+        stale = client.get(
+            "/api/live-updates", headers={"If-None-Match": before.headers["ETag"]}
+        )
+        assert stale.status_code == 200
+
+    def test_street_highlights_use_short_ttl(self, client):
+        server._content_cache.pop("street_highlights", None)
+        assert client.get("/api/street-highlights").status_code == 200
+        expires = server._content_cache["street_highlights"][0]
+        assert expires - time.monotonic() <= server.STREET_HIGHLIGHTS_CACHE_TTL_SECONDS
+        assert server.STREET_HIGHLIGHTS_CACHE_TTL_SECONDS < server.CONTENT_CACHE_TTL_SECONDS
@@ -0,0 +1,63 @@
+"""
+Compact amenity dataset builds (scripts/dataset_artifacts.py).
+
+Covered:
+  - compact() hoists constants and id prefixes, packs flags, and expand()
+    restores the rows
+  - the committed build matches the readable JSON and is within its size check
+  - a missing .br sibling is reported when brotli is installed
+"""
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+
+import dataset_artifacts  # noqa: E402
+
+
+def test_round_trip():
+    rows = [
+        {"id": "city-toilet-3", "name": "A", "lat": -37.81746989209639, "lng": 144.96,
+         "emoji": "🚽", "female": True, "wheelchair": False},
+        {"id": "city-toilet-10", "name": "B", "lat": -37.8, "lng": 144.9,
+         "emoji": "🚽", "female": False, "wheelchair": True},
+    ]
+    payload = dataset_artifacts.compact(rows, ("female", "wheelchair"))
+    assert payload["constants"] == {"emoji": "🚽"}
+    assert payload["idPrefix"] == "city-toilet-"
+    assert payload["columns"]["id"] == [3, 10]
+    assert payload["columns"]["flags"] == [1, 2]
+    assert payload["columns"]["lat"][0] == -37.81747
+
+    expanded = dataset_artifacts.expand(payload)
+    assert expanded[1] == rows[1]
+    assert expanded[0]["lat"] == -37.81747
+
+
+def test_committed_build_is_current():
+    assert dataset_artifacts.check() == []
+
+
+@pytest.mark.skipif(dataset_artifacts.brotli is None, reason="brotli not installed")
+def test_missing_brotli_sibling_is_reported(tmp_path, monkeypatch):
+    build = tmp_path / "build"
+    shutil.copytree(dataset_artifacts.BUILD, build)
+    for br in build.glob("*.br"):
+        br.unlink()
+    monkeypatch.setattr(dataset_artifacts, "ROOT", tmp_path)
+    monkeypatch.setattr(dataset_artifacts, "BUILD", build)
+    problems = dataset_artifacts.check()
+    assert len(problems) == len(dataset_artifacts.DATASETS)
+    assert all(problem.endswith(".json.br") and "missing" in problem for problem in problems)
+
+
+def test_size_regression_per_row():
+    previous = {"toilets": {"count": 100, "gzip": 3000}}
+    # More rows at the same density is fine; denser rows are not.
+    assert dataset_artifacts.size_regression("toilets", {"count": 200, "gzip": 6100}, previous) == ""
+    assert "limit" in dataset_artifacts.size_regression(
+        "toilets", {"count": 100, "gzip": 3400}, previous
+    )
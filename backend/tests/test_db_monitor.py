@@ -0,0 +1,90 @@
+"""
+MongoDB command instrumentation (db_monitor.py).
+
+Covered:
+  - filter shapes keep keys and operators but never values
+  - the listener times commands per collection/command and per request, and
+    logs slow ones with the redacted filter
+  - dev responses carry X-Db-Time-ms / X-Db-Calls
+"""
+import contextvars
+import logging
+import threading
+from datetime import timedelta
+
+from pymongo import monitoring
+
+from db_monitor import DbCommandListener, filter_shape, redact, track_request
+from metrics import Registry
+
+
+def _run_command(listener, command, micros, request_id=1):
+    name = next(iter(command))
+    connection = ("localhost", 27017)
+    listener.started(monitoring.CommandStartedEvent(command, "db", request_id, connection, request_id))
+    listener.succeeded(monitoring.CommandSucceededEvent(
+        timedelta(microseconds=micros), {"ok": 1}, name,
+        request_id, connection, request_id,
+    ))
+
+
+class TestRedaction:
+    def test_values_are_replaced(self):
+        shape = redact({"_id": "abc", "expires_at": {"$gt": 5}, "tags": ["a", "b"]})
+        assert shape == {"_id": "?", "expires_at": {"$gt": "?"}, "tags": "[2]"}
+
+    def test_filter_found_per_command(self):
+        update = {"update": "incidents", "updates": [{"q": {"id": "x"}, "u": {"$inc": {"n": 1}}}]}
+        assert filter_shape("update", update) == {"id": "?"}
+        assert filter_shape("find", {"find": "notes", "filter": {"$or": [{"a": 1}, {"b": 2}]}}) == {
+            "$or": [{"a": "?"}, "..."]
+        }
+        assert filter_shape("ping", {"ping": 1}) is None
+
+
+class TestListener:
+    def test_commands_timed_per_request(self):
+        registry = Registry()
+        histogram = registry.histogram("cmd_seconds", "x", ("collection", "command"))
+        listener = DbCommandListener(histogram, slow_ms=1000)
+
+        def request():
+            stats = track_request()
+            # Motor runs pymongo on a worker thread with a copy of the context.
+            context = contextvars.copy_context()
+            worker = threading.Thread(target=context.run, args=(
+                _run_command, listener, {"find": "incidents", "filter": {}}, 2500,
+            ))
+            worker.start()
+            worker.join()
+            _run_command(listener, {"insert": "incidents", "documents": []}, 1500, request_id=2)
+            return stats
+
+        stats = contextvars.copy_context().run(request)
+        assert stats.calls == 2
+        assert stats.time_ms == 4.0
+        text = registry.render()
+        assert 'cmd_seconds_count{collection="incidents",command="find"} 1' in text
+        assert 'cmd_seconds_count{collection="incidents",command="insert"} 1' in text
+
+    def test_slow_command_logged_without_values(self, caplog):
+        listener = DbCommandListener(slow_ms=100)
+        with caplog.at_level(logging.WARNING, logger="db_monitor"):
+            _run_command(listener, {"find": "street_notes", "filter": {"owner": "secret-id"}}, 250_000)
+            _run_command(listener, {"find": "street_notes", "filter": {}}, 50_000, request_id=2)
+        [record] = caplog.records
+        assert "collection=street_notes command=find elapsed_ms=250.0" in record.getMessage()
+        assert "{'owner': '?'}" in record.getMessage()
+        assert "secret-id" not in record.getMessage()
+
+
+class TestDbHeaders:
+    def test_dev_responses_carry_db_totals(self, client):
+        # The in-memory store reports its operations as command events too.
+        res = client.get("/api/incidents")
+        assert int(res.headers["x-db-calls"]) >= 1
+        assert float(res.headers["x-db-time-ms"]) >= 0
+
+        res = client.get("/api/")
+        assert res.headers["x-db-calls"] == "0"
+        assert float(res.headers["x-db-time-ms"]) == 0
@@ -0,0 +1,72 @@
+"""
+Columnar map feeds (feed_format.py; `?format=columnar` on incidents, street
+notes and peers).
+
+Covered:
+  - encode/decode round-trips: dictionaries, 1e-5 coordinate deltas, epoch times
+  - each feed's columnar form carries the same rows as its JSON form
+  - MessagePack is served when accepted (if msgpack is installed); bad formats 422
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import feed_format
+import server
+
+
+def test_round_trip():
+    now = datetime(2026, 3, 1, 9, 30, tzinfo=timezone.utc)
+    rows = [
+        {"id": "a", "category": "theft", "urgency": "high", "latitude": -37.8136, "longitude": 144.96311,
+         "timestamp": now, "like_count": 2},
+        {"id": "b", "category": "protest", "urgency": "high", "latitude": -37.80001, "longitude": 144.97,
+         "timestamp": now.isoformat(), "like_count": 0},
+    ]
+    payload = feed_format.encode(rows, feed_format.INCIDENT_COLUMNS)
+    columns = payload["columns"]
+    assert payload["dictionaries"]["category"] == ["theft", "protest"]
+    assert columns["category"] == [0, 1] and columns["urgency"] == [0, 0]
+    assert columns["latitude"] == [-3781360, 1359]
+    assert columns["timestamp"] == [int(now.timestamp())] * 2
+
+    decoded = feed_format.decode(payload)
+    assert [r["category"] for r in decoded] == ["theft", "protest"]
+    assert [r["longitude"] for r in decoded] == [144.96311, 144.97]
+    assert decoded[1]["timestamp"] == now
+    assert decoded[0]["image_url"] is None
+
+
+def _incident(lat, lng, category):
+    return {"id": str(uuid.uuid4()), "category": category, "urgency": "low", "description": "x",
+            "latitude": lat, "longitude": lng, "image_url": None, "is_verified": False,
+            "cluster_count": 1, "like_count": 0, "dislike_count": 0,
+            "timestamp": datetime.now(timezone.utc) - timedelta(minutes=5)}
+
+
+def test_feeds_match_json(client):
+    client.portal.call(server.db.incidents.insert_many, [
+        _incident(-37.81, 144.96, "theft"), _incident(-37.82, 144.95, "other"),
+    ])
+    for path, key in (("/api/incidents", "id"), ("/api/street-notes", "id"), ("/api/peers", "token")):
+        rows = client.get(path).json()
+        res = client.get(path, params={"format": "columnar"})
+        assert res.status_code == 200, path
+        assert "Accept" in [v.strip() for v in res.headers["vary"].split(",")]
+        payload = res.json()
+        assert payload["format"] == "columnar" and payload["count"] == len(rows)
+        assert payload["columns"][key] == [r[key] for r in rows]
+        if path == "/api/incidents":
+            decoded = feed_format.decode(payload)
+            assert [d["category"] for d in decoded] == [r["category"] for r in rows]
+            assert [d["latitude"] for d in decoded] == [round(r["latitude"], 5) for r in rows]
+
+    assert client.get("/api/incidents", params={"format": "xml"}).status_code == 422
+
+
+def test_msgpack_when_accepted(client):
+    msgpack = pytest.importorskip("msgpack")
+    res = client.get("/api/peers", headers={"Accept": "application/x-msgpack"})
+    assert res.headers["content-type"] == "application/x-msgpack"
+    assert msgpack.unpackb(res.content)["format"] == "columnar"
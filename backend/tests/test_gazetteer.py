@@ -0,0 +1,122 @@
+"""
+Offline gazetteer (gazetteer.py) and the endpoints it backs.
+
+Covered:
+  - an index built to disk round-trips through the memory-mapped reader
+  - geocode() needs a whole name or alias, ignoring state/postcode suffixes,
+    and returns the best-ranked matches when there are more than `limit`
+  - suggest() matches any word start, whole names and higher ranks first
+  - nearest() (KD-tree) agrees with a brute-force scan
+  - /api/geocode answers known places locally; /api/geocode/suggest
+  - /api/reverse-geocode, cached per grid cell
+"""
+import math
+import random
+
+import server
+from gazetteer import Gazetteer, KdTree, build_index
+
+PLACES = [
+    {"name": "Fitzroy", "display": "Fitzroy, VIC 3065", "kind": "suburb",
+     "lat": -37.798, "lng": 144.978, "rank": 4},
+    {"name": "Fitzroy Gardens", "kind": "landmark", "lat": -37.813, "lng": 144.980, "rank": 3},
+    {"name": "Flinders Street Station", "kind": "landmark", "lat": -37.818, "lng": 144.967,
+     "aliases": ["Flinders St Station"], "rank": 3},
+    {"name": "Public Toilet - Fitzroy Gardens", "kind": "toilet", "lat": -37.812, "lng": 144.979,
+     "rank": 1},
+]
+
+
+class TestGazetteer:
+    def _open(self, tmp_path):
+        path = tmp_path / "test.idx"
+        build_index(PLACES, path)
+        return Gazetteer(path)
+
+    def test_geocode_exact_name_or_alias(self, tmp_path):
+        gaz = self._open(tmp_path)
+        assert len(gaz) == 4
+        [hit] = gaz.geocode("Fitzroy VIC 3065, Australia")
+        assert hit["display_name"] == "Fitzroy, VIC 3065"
+        assert hit["latitude"] == -37.798 and hit["kind"] == "suburb"
+        assert gaz.geocode("flinders st. station")[0]["display_name"] == "Flinders Street Station"
+        # A word inside a longer name is not a geocode match.
+        assert gaz.geocode("Station") == []
+        gaz.close()
+
+    def test_geocode_ranks_all_matches_before_limit(self, tmp_path):
+        path = tmp_path / "same-name.idx"
+        build_index([
+            {"name": "Richmond", "display": f"Richmond street {i}", "kind": "street",
+             "lat": -37.82, "lng": 144.99 + i / 1000, "rank": 2}
+            for i in range(3)
+        ] + [{"name": "Richmond", "display": "Richmond, VIC 3121", "kind": "suburb",
+              "lat": -37.823, "lng": 144.998, "rank": 4}], path)
+        gaz = Gazetteer(path)
+        [best] = gaz.geocode("Richmond", limit=1)
+        assert best["display_name"] == "Richmond, VIC 3121"
+        assert len(gaz.geocode("Richmond", limit=10)) == 4
+        gaz.close()
+
+    def test_suggest_ranks_matches(self, tmp_path):
+        gaz = self._open(tmp_path)
+        names = [p["display_name"] for p in gaz.suggest("fitz")]
+        assert names == ["Fitzroy, VIC 3065", "Fitzroy Gardens", "Public Toilet - Fitzroy Gardens"]
+        assert [p["display_name"] for p in gaz.suggest("gard", limit=1)] == ["Fitzroy Gardens"]
+        assert gaz.suggest("xyz") == []
+        gaz.close()
+
+    def test_nearest_matches_brute_force(self):
+        rng = random.Random(7)
+        lats = [-37.8 + rng.uniform(-0.2, 0.2) for _ in range(500)]
+        lngs = [144.96 + rng.uniform(-0.2, 0.2) for _ in range(500)]
+        tree = KdTree(lats, lngs)
+        scale = math.cos(math.radians(sum(lats) / len(lats)))
+        for _ in range(100):
+            q_lat, q_lng = -37.8 + rng.uniform(-0.25, 0.25), 144.96 + rng.uniform(-0.25, 0.25)
+            expected = min(
+                range(500),
+                key=lambda i: ((lats[i] - q_lat) ** 2 + ((lngs[i] - q_lng) * scale) ** 2),
+            )
+            assert tree.nearest(q_lat, q_lng)[0][1] == expected
+
+    def test_nearest_filters_kinds_and_radius(self, tmp_path):
+        gaz = self._open(tmp_path)
+        hit = gaz.nearest(-37.8129, 144.9795, kinds=("landmark",))
+        assert hit["display_name"] == "Fitzroy Gardens"
+        assert hit["distance_m"] < 100
+        assert gaz.nearest(-37.8129, 144.9795, kinds=("suburb",), max_distance_m=100) is None
+        gaz.close()
+
+    def test_missing_index_is_tolerated(self, tmp_path):
+        assert Gazetteer.open(tmp_path / "missing.idx") is None
+
+
+class TestGeocodeEndpoints:
+    def test_known_place_geocoded_locally(self, client):
+        res = client.post("/api/geocode", json={"address": "Federation Square, Melbourne VIC"})
+        assert res.status_code == 200
+        body = res.json()
+        assert body["success"] is True
+        assert body["locations"][0]["display_name"].startswith("Federation Square")
+
+    def test_suggest(self, client):
+        res = client.get("/api/geocode/suggest", params={"q": "queen vic"})
+        assert res.status_code == 200
+        suggestions = res.json()["suggestions"]
+        assert suggestions[0]["display_name"].startswith("Queen Victoria Market")
+        assert client.get("/api/geocode/suggest", params={"q": ""}).json()["suggestions"] == []
+
+    def test_reverse_geocode_cached_per_cell(self, client):
+        server._reverse_cache.clear()
+        first = client.get("/api/reverse-geocode", params={"lat": -37.81802, "lng": 144.96912})
+        assert first.status_code == 200
+        body = first.json()
+        assert body["success"] is True
+        assert body["location_text"] == "Federation Square, Melbourne"
+        # Another point in the same ~110 m cell is answered from the cache.
+        again = client.get("/api/reverse-geocode", params={"lat": -37.81795, "lng": 144.96905})
+        assert again.json() == body
+        assert len(server._reverse_cache) == 1
+        bad = client.get("/api/reverse-geocode", params={"lat": 123, "lng": 0})
+        assert bad.status_code == 422
@@ -0,0 +1,112 @@
+"""
+Geocode cache (geocoder.py), with a fake upstream in place of Nominatim.
+
+Covered:
+  - address normalization shares cache entries between spellings, while
+    the upstream is asked with the address as typed
+  - repeat lookups are served from memory; errors are not cached
+  - identical concurrent lookups share one upstream call (single-flight)
+  - upstream calls are paced, and a full queue is refused instead of waiting
+"""
+import asyncio
+import time
+
+import pytest
+
+from geocoder import GeocodeCache, GeocodeUnavailable, normalize_address
+
+
+class _FakeUpstream:
+    def __init__(self, delay=0.0, fail=False):
+        self.calls = []
+        self.delay = delay
+        self.fail = fail
+
+    async def __call__(self, query):
+        self.calls.append((query, time.monotonic()))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise GeocodeUnavailable("down")
+        return [{"display_name": query, "latitude": -37.8, "longitude": 144.9}]
+
+
+class TestGeocodeCache:
+    def test_normalize_address(self):
+        assert normalize_address("  12  Smith St., FITZROY ") == "12 smith st, fitzroy"
+        assert normalize_address("12 smith st ,fitzroy,") == "12 smith st, fitzroy"
+
+    def test_upstream_gets_the_address_as_typed(self):
+        upstream = _FakeUpstream()
+        cache = GeocodeCache(upstream, min_interval=0)
+
+        async def run():
+            await cache.lookup(" 12/34 Smith St, Fitzroy ")
+            await cache.lookup("12-34 Smith St, Fitzroy")
+            await cache.lookup("12/34 smith st., fitzroy")
+
+        asyncio.run(run())
+        # Unit/number and range spellings are different places; case and
+        # punctuation alone are not.
+        assert [query for query, _ in upstream.calls] == [
+            "12/34 Smith St, Fitzroy", "12-34 Smith St, Fitzroy",
+        ]
+        assert cache.stats()["memory_hits"] == 1
+
+    def test_repeat_lookup_served_from_memory(self):
+        upstream = _FakeUpstream()
+        cache = GeocodeCache(upstream, min_interval=0)
+
+        async def run():
+            first = await cache.lookup("Flinders St Station")
+            again = await cache.lookup("flinders st. station")
+            return first, again
+
+        first, again = asyncio.run(run())
+        assert first == again
+        assert len(upstream.calls) == 1
+        assert cache.stats()["memory_hits"] == 1
+        assert cache.stats()["hit_rate"] == 0.5
+
+    def test_concurrent_lookups_are_coalesced(self):
+        upstream = _FakeUpstream(delay=0.05)
+        cache = GeocodeCache(upstream, min_interval=0)
+
+        async def run():
+            return await asyncio.gather(*(cache.lookup("Queen Vic Market") for _ in range(5)))
+
+        results = asyncio.run(run())
+        assert len(upstream.calls) == 1
+        assert all(r == results[0] for r in results)
+        assert cache.stats()["coalesced"] == 4
+
+    def test_errors_are_not_cached(self):
+        upstream = _FakeUpstream(fail=True)
+        cache = GeocodeCache(upstream, min_interval=0)
+
+        async def run():
+            for _ in range(2):
+                with pytest.raises(GeocodeUnavailable):
+                    await cache.lookup("Fed Square")
+
+        asyncio.run(run())
+        assert len(upstream.calls) == 2
+        assert cache.stats()["entries"] == 0
+
+    def test_upstream_calls_are_paced(self):
+        upstream = _FakeUpstream()
+        cache = GeocodeCache(upstream, min_interval=0.05, max_queue=2)
+
+        async def run():
+            return await asyncio.gather(
+                *(cache.lookup(f"address {i}") for i in range(4)),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(run())
+        # The first call goes straight out, two wait their turn, the fourth is
+        # refused because the queue is full.
+        assert isinstance(results[3], GeocodeUnavailable)
+        assert len(upstream.calls) == 3
+        times = [t for _, t in upstream.calls]
+        assert all(b - a >= 0.045 for a, b in zip(times, times[1:]))
+        assert cache.stats()["rejected"] == 1
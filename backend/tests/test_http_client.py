@@ -0,0 +1,95 @@
+"""
+Pooled outbound HTTP client and circuit breaker (http_client.py), against a
+local stub HTTP server.
+
+Covered:
+  - sequential calls reuse one keep-alive connection
+  - repeated 5xx responses open the circuit, after which calls fail fast
+    without reaching the upstream
+  - after the reset timeout a single half-open probe closes the circuit again
+"""
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from http_client import CircuitBreaker, CircuitOpenError, HttpClient
+
+
+async def _with_stub(status, test):
+    """Run `test(client, url, stats)` against a stub answering `status()`."""
+    stats = {"hits": 0, "peers": set()}
+
+    async def handler(request):
+        stats["hits"] += 1
+        stats["peers"].add(request.transport.get_extra_info("peername"))
+        return web.json_response({"ok": True}, status=status())
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    client = HttpClient(failure_threshold=3, reset_timeout=0.2)
+    await client.start()
+    try:
+        await test(client, f"http://127.0.0.1:{port}/", stats)
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+class TestHttpClient:
+    def test_connections_are_reused(self):
+        async def test(client, url, stats):
+            for _ in range(5):
+                assert await client.request_json("GET", url) == (200, {"ok": True})
+            assert stats["hits"] == 5
+            assert len(stats["peers"]) == 1
+
+        asyncio.run(_with_stub(lambda: 200, test))
+
+    def test_circuit_opens_and_fails_fast(self):
+        async def test(client, url, stats):
+            for _ in range(3):
+                status, _ = await client.request_json("GET", url)
+                assert status == 503
+            with pytest.raises(CircuitOpenError):
+                await client.request_json("GET", url)
+            assert stats["hits"] == 3
+
+        asyncio.run(_with_stub(lambda: 503, test))
+
+    def test_half_open_probe_closes_circuit(self):
+        statuses = iter([503, 503, 503, 200, 200])
+
+        async def test(client, url, stats):
+            for _ in range(3):
+                await client.request_json("GET", url)
+            with pytest.raises(CircuitOpenError):
+                await client.request_json("GET", url)
+            await asyncio.sleep(0.25)
+            assert (await client.request_json("GET", url))[0] == 200
+            assert (await client.request_json("GET", url))[0] == 200
+            assert stats["hits"] == 5
+
+        asyncio.run(_with_stub(lambda: next(statuses), test))
+
+
+class TestCircuitBreaker:
+    def test_half_open_admits_one_probe_at_a_time(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        assert not breaker.allow()
+        now[0] = 10.0
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        now[0] = 20.0
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
@@ -0,0 +1,104 @@
+"""
+Prometheus metrics (metrics.py) and the /metrics endpoint.
+
+Covered:
+  - histograms render cumulative buckets, _sum and _count per label set
+  - label values are escaped; cache hit ratios are derived from hits/misses
+  - observations from other threads (the DB listener) during a render are
+    neither lost nor break the scrape
+  - /metrics needs METRICS_TOKEN (or a loopback client)
+  - requests are labelled by route template, not raw path; 429s by scope
+"""
+import threading
+import uuid
+
+import server
+from metrics import Registry
+
+
+class TestRegistry:
+    def test_histogram_renders_cumulative_buckets(self):
+        registry = Registry()
+        latency = registry.histogram("op_seconds", "Op latency.", ("op",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            latency.labels("read").observe(value)
+        text = registry.render()
+        assert "# TYPE op_seconds histogram" in text
+        assert 'op_seconds_bucket{op="read",le="0.1"} 1' in text
+        assert 'op_seconds_bucket{op="read",le="1.0"} 3' in text
+        assert 'op_seconds_bucket{op="read",le="+Inf"} 4' in text
+        assert 'op_seconds_sum{op="read"} 4.05' in text
+        assert 'op_seconds_count{op="read"} 4' in text
+
+    def test_observe_from_threads_while_rendering(self):
+        registry = Registry()
+        latency = registry.histogram("db_seconds", "DB latency.", ("collection",))
+        per_thread, threads = 2000, 4
+
+        def work(n):
+            for i in range(per_thread):
+                # New label sets keep appearing while render iterates.
+                latency.labels(f"c{n}-{i % 50}").observe(0.001)
+
+        workers = [threading.Thread(target=work, args=(n,)) for n in range(threads)]
+        for worker in workers:
+            worker.start()
+        while any(worker.is_alive() for worker in workers):
+            registry.render()
+        for worker in workers:
+            worker.join()
+        total = sum(
+            int(line.rsplit(" ", 1)[1]) for line in registry.render().splitlines()
+            if line.startswith("db_seconds_count")
+        )
+        assert total == per_thread * threads
+
+    def test_counters_gauges_and_caches(self):
+        registry = Registry()
+        errors = registry.counter("errors_total", "Errors.", ("kind",))
+        errors.labels('say "hi"\n').inc()
+        in_flight = registry.gauge("in_flight", "In flight.")
+        in_flight.inc()
+        in_flight.inc()
+        in_flight.dec()
+        cache = registry.cache("things")
+        cache.hits, cache.misses = 3, 1
+        text = registry.render()
+        assert 'errors_total{kind="say \\"hi\\"\\n"} 1' in text
+        assert "in_flight 1" in text
+        assert 'cache_hit_ratio{cache="things"} 0.75' in text
+        assert 'cache_hits_total{cache="things"} 3' in text
+        assert 'cache_misses_total{cache="things"} 1' in text
+
+
+class TestMetricsEndpoint:
+    def test_token_required(self, client, monkeypatch):
+        monkeypatch.setattr(server, "METRICS_TOKEN", "")
+        # The test client's peer is not loopback.
+        assert client.get("/metrics").status_code == 403
+        monkeypatch.setattr(server, "METRICS_TOKEN", "s3cret")
+        assert client.get("/metrics").status_code == 401
+        assert client.get("/metrics", headers={"Authorization": "Bearer nope"}).status_code == 401
+        res = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+        assert res.status_code == 200
+        assert res.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+    def test_routes_labelled_by_template(self, client, monkeypatch):
+        monkeypatch.setattr(server, "METRICS_TOKEN", "s3cret")
+        client.delete(f"/api/admin/incidents/{uuid.uuid4()}")
+        client.get("/no/such/path")
+        text = client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).text
+        assert 'route="/api/admin/incidents/{incident_id}",method="DELETE",status="401"' in text
+        assert 'route="unmatched",method="GET",status="404"' in text
+        assert "/no/such/path" not in text
+        assert 'http_requests_in_flight{method="GET"} 1' in text  # the scrape itself
+        assert 'cache_hit_ratio{cache="geocode"}' in text
+
+    def test_rate_limit_rejections_counted(self, client, monkeypatch):
+        monkeypatch.setattr(server, "METRICS_TOKEN", "s3cret")
+        before = server.RATE_LIMIT_REJECTIONS.labels("admin_verify").value
+        for _ in range(8):
+            client.post("/api/admin/verify", json={"account": "x", "pin": "0000"})
+        assert server.RATE_LIMIT_REJECTIONS.labels("admin_verify").value > before
+        text = client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).text
+        assert 'rate_limit_rejections_total{scope="admin_verify"}' in text
@@ -0,0 +1,141 @@
+"""
+Background migrations (migrations.py) and the dates shim in server.py.
+
+Covered:
+  - a migration runs in batches, checkpoints, and resumes after a crash
+  - a worker whose lease is taken over mid-step stops backfilling
+  - markers written before the framework count as applied
+  - date-range filters match legacy string dates until the migration is done
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import server
+from migrations import BackfillStep, Migration, MigrationRunner
+
+
+def _to_date(doc):
+    if doc["n"] == 3 and _to_date.fail:
+        raise RuntimeError("worker died")
+    return {"when": datetime.fromisoformat(doc["when"])}
+
+
+class TestMigrationRunner:
+    COLL = "migration_test_docs"
+
+    def _migration(self, migration_id):
+        return Migration(migration_id, 1, "test", [
+            BackfillStep(self.COLL, {"when": {"$type": "string"}}, _to_date, {"when": 1, "n": 1}),
+        ])
+
+    def test_resumes_from_checkpoint(self, client):
+        migration_id = "test_resume_v1"
+        coll = server.db[self.COLL]
+
+        async def setup():
+            await coll.delete_many({})
+            await server.db.migrations.delete_one({"_id": migration_id})
+            await coll.insert_many([
+                {"_id": i, "n": i, "when": f"2024-01-0{i + 1}T00:00:00+00:00"} for i in range(5)
+            ])
+
+        client.portal.call(setup)
+        migration = self._migration(migration_id)
+
+        _to_date.fail = True
+        crashed = MigrationRunner(server.db, [migration], batch_size=2, pause=0, lease_seconds=0)
+        client.portal.call(crashed.run_pending)
+        assert not crashed.is_complete(migration_id)
+        marker = client.portal.call(server.db.migrations.find_one, {"_id": migration_id})
+        assert marker["status"] == "running"
+        assert marker["last_id"] == 1 and marker["processed"] == 2
+
+        _to_date.fail = False
+        resumed = MigrationRunner(server.db, [migration], batch_size=2, pause=0)
+        client.portal.call(resumed.run_pending)
+        assert resumed.is_complete(migration_id)
+        marker = client.portal.call(server.db.migrations.find_one, {"_id": migration_id})
+        assert marker["status"] == "done" and marker["processed"] == 5
+        left = client.portal.call(coll.count_documents, {"when": {"$type": "string"}})
+        assert left == 0
+
+    def test_stops_when_lease_is_taken_over(self, client):
+        migration_id = "test_takeover_v1"
+        coll = server.db[self.COLL]
+        seen = []
+
+        async def setup():
+            await coll.delete_many({})
+            await server.db.migrations.delete_one({"_id": migration_id})
+            await coll.insert_many([
+                {"_id": i, "n": i, "when": f"2024-01-0{i + 1}T00:00:00+00:00"} for i in range(6)
+            ])
+
+        client.portal.call(setup)
+
+        def transform(doc):
+            seen.append(doc["_id"])
+            return {"when": datetime.fromisoformat(doc["when"])}
+
+        migration = Migration(migration_id, 1, "test", [
+            BackfillStep(self.COLL, {"when": {"$type": "string"}}, transform, {"when": 1}),
+        ])
+        runner = MigrationRunner(
+            server.db, [migration], batch_size=2, pause=0.2, poll_seconds=0.01,
+        )
+
+        async def run_until_finished_elsewhere():
+            task = runner.start()
+            while len(seen) < 2:
+                await asyncio.sleep(0.005)
+            # A second worker takes the lease while the first pauses between
+            # batches of the step.
+            await server.db.migrations.update_one({"_id": migration_id}, {"$set": {
+                "lease_owner": "other-worker",
+                "lease_until": datetime.now(timezone.utc) + timedelta(minutes=5),
+            }})
+            while len(seen) < 4:
+                await asyncio.sleep(0.005)
+            await asyncio.sleep(0.3)
+            marker = await server.db.migrations.find_one({"_id": migration_id})
+            # The new owner finishes the work.
+            await server.db.migrations.update_one(
+                {"_id": migration_id}, {"$set": {"status": "done"}, "$unset": {"lease_owner": ""}}
+            )
+            await asyncio.wait_for(task, 5)
+            return marker
+
+        marker = client.portal.call(run_until_finished_elsewhere)
+        # The batch in flight is applied (transforms are idempotent), but its
+        # checkpoint is refused and the rest of the step is left to the new owner.
+        assert seen == [0, 1, 2, 3]
+        assert marker["lease_owner"] == "other-worker" and marker["status"] == "running"
+        assert marker["last_id"] == 1
+        assert runner.is_complete(migration_id)
+
+    def test_legacy_marker_counts_as_applied(self, client):
+        migration_id = "test_legacy_v1"
+
+        async def setup():
+            await server.db.migrations.delete_one({"_id": migration_id})
+            await server.db.migrations.insert_one(
+                {"_id": migration_id, "applied_at": datetime.now(timezone.utc)}
+            )
+
+        client.portal.call(setup)
+        runner = MigrationRunner(server.db, [self._migration(migration_id)])
+        client.portal.call(runner.run_pending)
+        assert runner.is_complete(migration_id)
+
+
+class TestDateShim:
+    def test_legacy_strings_matched_until_migrated(self, client, monkeypatch):
+        cutoff = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        pending = MigrationRunner(server.db, server.MIGRATIONS)
+        monkeypatch.setattr(server, "_migrations", pending)
+        assert server._date_range("timestamp", lt=cutoff) == {"$or": [
+            {"timestamp": {"$lt": cutoff}},
+            {"timestamp": {"$lt": "2024-01-01T00:00:00+00:00"}},
+        ]}
+        pending._done.add(server.DATES_MIGRATION_ID)
+        assert server._date_range("timestamp", lt=cutoff) == {"timestamp": {"$lt": cutoff}}
@@ -0,0 +1,90 @@
+"""
+Admin request profiling (profiler.py) and /api/admin/profiles.
+
+Covered:
+  - the ring keeps only the newest profiles; one profile runs at a time
+  - only admin requests are profiled; anyone else's flagged request is served
+    normally; a profiled response names its profile
+  - profiles list newest first and download as text or a loadable .prof
+"""
+import asyncio
+import marshal
+
+import pytest
+
+import server
+from profiler import ProfilerBusy, ProfileStore
+
+
+class TestProfileStore:
+    def test_ring_is_bounded(self):
+        store = ProfileStore(max_profiles=2)
+
+        async def work():
+            await asyncio.sleep(0)
+
+        async def run():
+            for i in range(3):
+                await store.run(f"p{i}", {"path": f"/{i}"}, work)
+
+        asyncio.run(run())
+        assert [p["id"] for p in store.list()] == ["p2", "p1"]
+        assert "text" not in store.list()[0]
+        assert store.get("p0") is None
+
+    def test_one_profile_at_a_time(self):
+        store = ProfileStore()
+
+        async def run():
+            release = asyncio.Event()
+            first = asyncio.create_task(store.run("a", {}, release.wait))
+            await asyncio.sleep(0)
+            with pytest.raises(ProfilerBusy):
+                await store.run("b", {}, release.wait)
+            release.set()
+            await first
+
+        asyncio.run(run())
+        assert [p["id"] for p in store.list()] == ["a"]
+
+
+class TestProfileEndpoints:
+    def test_non_admin_requests_run_unprofiled(self, client):
+        server._profiles.clear()
+        for headers, query in (
+            ({"X-Profile": "1"}, ""),
+            ({}, "?_profile=1"),
+            ({"Authorization": "Bearer nope"}, "?_profile=1"),
+            ({"Authorization": "Bearer nope"}, "?_profile=true"),
+        ):
+            res = client.get(f"/api/incidents{query}", headers=headers)
+            assert res.status_code == 200, (headers, query)
+            assert isinstance(res.json(), list)
+            assert "x-profile-id" not in res.headers
+        # Without the flag nothing is profiled, including look-alike parameters.
+        assert "x-profile-id" not in client.get("/api/").headers
+        for query in ("x_profile=10", "q=_profile=1", "_profile=0"):
+            assert client.get(f"/api/?{query}").status_code == 200, query
+        assert server._profiles.list() == []
+
+    def test_profile_round_trip(self, client, auth_headers):
+        server._profiles.clear()
+        res = client.get("/api/incidents", headers={**auth_headers, "X-Profile": "1"})
+        assert res.status_code == 200
+        profile_id = res.headers["x-profile-id"]
+
+        listed = client.get("/api/admin/profiles", headers=auth_headers).json()["profiles"]
+        assert listed[0]["id"] == profile_id
+        assert listed[0]["path"] == "/api/incidents" and listed[0]["status"] == 200
+
+        text = client.get(f"/api/admin/profiles/{profile_id}", headers=auth_headers)
+        assert "function calls" in text.text
+        raw = client.get(
+            f"/api/admin/profiles/{profile_id}", params={"format": "pstats"}, headers=auth_headers
+        )
+        assert raw.headers["content-disposition"].endswith(f'profile-{profile_id}.prof"')
+        assert isinstance(marshal.loads(raw.content), dict)
+
+        assert client.get("/api/admin/profiles").status_code == 401
+        missing = client.get("/api/admin/profiles/nope", headers=auth_headers)
+        assert missing.status_code == 404
@@ -0,0 +1,182 @@
+"""
+Rate limiting backends (rate_limiter.py).
+
+Covered:
+  - a key gets a burst of `limit`, then one request per `window / limit`
+  - keys and scopes are independent
+  - memory is fixed: a flood of distinct keys evicts instead of growing, and
+    idle keys are reclaimed without counting as evictions
+  - the shared-memory backend enforces one limit across processes attached to
+    the same segment, and its local leases never over-admit
+  - the Mongo backend (on the in-memory store): allow until the limit, hand
+    back a partly granted lease, the sliding window rolling into a new bucket,
+    and the in-process fallback when the collection raises
+"""
+import asyncio
+import uuid
+
+from rate_limiter import PROBE_WINDOW, GcraRateLimiter, MongoRateLimiter, SharedMemoryRateLimiter
+from storage import MemoryClient
+
+
+class TestGcraRateLimiter:
+    def test_burst_then_steady_rate(self):
+        rl = GcraRateLimiter(max_keys=64)
+        assert [rl.hit("ip", 5, 60, now=0.0) for _ in range(5)] == [0.0] * 5
+        assert rl.hit("ip", 5, 60, now=0.0) == 12.0
+        # One request is earned back every 12s.
+        assert rl.hit("ip", 5, 60, now=11.0) > 0
+        assert rl.hit("ip", 5, 60, now=12.0) == 0.0
+        assert rl.hit("ip", 5, 60, now=12.0) > 0
+
+    def test_rejected_requests_are_not_counted(self):
+        rl = GcraRateLimiter(max_keys=64)
+        for _ in range(3):
+            rl.hit("ip", 3, 30, now=0.0)
+        for _ in range(100):
+            assert rl.hit("ip", 3, 30, now=1.0) > 0
+        assert rl.hit("ip", 3, 30, now=10.0) == 0.0
+
+    def test_keys_are_independent(self):
+        rl = GcraRateLimiter(max_keys=64)
+        rl.hit(("chat", "a"), 1, 60, now=0.0)
+        assert rl.hit(("chat", "a"), 1, 60, now=0.0) > 0
+        assert rl.hit(("chat", "b"), 1, 60, now=0.0) == 0.0
+        assert rl.hit(("react", "a"), 1, 60, now=0.0) == 0.0
+
+    def test_memory_is_fixed_under_a_key_flood(self):
+        rl = GcraRateLimiter(max_keys=1024)
+        size = rl.memory_bytes
+        for i in range(50_000):
+            rl.hit(f"10.0.{i // 256}.{i % 256}", 10, 60, now=0.0)
+        assert rl.memory_bytes == size
+        assert rl.evictions > 0
+        assert rl.active_keys(now=0.0) <= rl.capacity + PROBE_WINDOW
+
+    def test_idle_keys_are_reused_without_eviction(self):
+        rl = GcraRateLimiter(max_keys=16)
+        for i in range(64):
+            rl.hit(f"ip{i}", 10, 60, now=0.0)
+        evicted = rl.evictions
+        # Every key has fully refilled by t=60, so new keys reuse their slots.
+        for i in range(64, 68):
+            rl.hit(f"ip{i}", 10, 60, now=61.0)
+        assert rl.evictions == evicted
+        assert rl.active_keys(now=61.0) == 4
+
+    def test_take_grants_at_most_what_is_left(self):
+        rl = GcraRateLimiter(max_keys=64)
+        assert rl.take("ip", 10, 60, want=4, now=0.0) == (4, 0.0)
+        assert rl.take("ip", 10, 60, want=8, now=0.0) == (6, 0.0)
+        granted, wait = rl.take("ip", 10, 60, want=1, now=0.0)
+        assert granted == 0 and wait == 6.0
+
+
+class TestSharedMemoryRateLimiter:
+    def _pair(self, **kwargs):
+        name = f"community-map-test-{uuid.uuid4().hex[:8]}"
+        first = SharedMemoryRateLimiter(name=name, max_keys=64, **kwargs)
+        second = SharedMemoryRateLimiter(name=name, max_keys=64, **kwargs)
+        return first, second
+
+    def _cleanup(self, *limiters):
+        shm = limiters[0]._shm
+        for rl in limiters:
+            rl.close()
+        shm.unlink()
+
+    def test_workers_share_one_limit(self):
+        a, b = self._pair()
+        try:
+            assert [a.hit("ip", 4, 60, now=0.0) for _ in range(2)] == [0.0, 0.0]
+            assert [b.hit("ip", 4, 60, now=0.0) for _ in range(2)] == [0.0, 0.0]
+            assert a.hit("ip", 4, 60, now=0.0) > 0
+            assert b.hit("ip", 4, 60, now=0.0) > 0
+        finally:
+            self._cleanup(a, b)
+
+    def test_leases_answer_locally_without_over_admitting(self):
+        a, b = self._pair(lease_fraction=0.25, lease_ttl=60)
+
+        async def burst(rl, n):
+            return [await rl.acquire("ip", 20, 60) for _ in range(n)]
+
+        try:
+            allowed_a = sum(1 for w in asyncio.run(burst(a, 30)) if w == 0.0)
+            allowed_b = sum(1 for w in asyncio.run(burst(b, 30)) if w == 0.0)
+            assert allowed_a + allowed_b <= 20
+            assert allowed_a == 20 and allowed_b == 0
+            # 30 requests from `a` cost it one store visit per 5-request lease
+            # plus one for the cached rejection.
+            assert a.leases.remote_decisions == 5
+        finally:
+            self._cleanup(a, b)
+
+
+class _BrokenCollection:
+    async def find_one_and_update(self, *args, **kwargs):
+        raise ConnectionError("mongo down")
+
+    async def find_one(self, *args, **kwargs):
+        raise ConnectionError("mongo down")
+
+
+class TestMongoRateLimiter:
+    def _limiter(self, **kwargs):
+        coll = MemoryClient()["rate_limit_test"]["rate_limits"]
+        return MongoRateLimiter(coll, **kwargs), coll
+
+    def test_allows_until_limit_then_denies(self):
+        rl, coll = self._limiter()
+
+        async def run():
+            grants = [await rl.take("ip", 5, 60, now=10.0) for _ in range(5)]
+            denied = await rl.take("ip", 5, 60, now=10.0)
+            doc = await coll.find_one({"_id": rl._bucket_id("ip", 60, 0)})
+            return grants, denied, doc["n"]
+
+        grants, denied, stored = asyncio.run(run())
+        assert grants == [(1, 0.0)] * 5
+        # Nothing from the previous bucket: wait for this one to close.
+        assert denied == (0, 50.0)
+        assert stored == 5
+
+    def test_partial_grant_is_handed_back(self):
+        rl, coll = self._limiter()
+
+        async def run():
+            first = await rl.take("ip", 5, 60, want=3, now=0.0)
+            second = await rl.take("ip", 5, 60, want=4, now=0.0)
+            doc = await coll.find_one({"_id": rl._bucket_id("ip", 60, 0)})
+            return first, second, doc["n"]
+
+        first, second, stored = asyncio.run(run())
+        assert first == (3, 0.0) and second == (2, 0.0)
+        # The two requests not granted were taken back off the shared count.
+        assert stored == 5
+
+    def test_window_rolls_over(self):
+        rl, _ = self._limiter()
+
+        async def run():
+            for _ in range(5):
+                await rl.take("ip", 5, 60, now=0.0)
+            # 10s into the next bucket the old one still weighs 5 * 50/60.
+            blocked = await rl.take("ip", 5, 60, now=70.0)
+            # Enough has decayed 12s in (5 * 48/60 = 4) for one more.
+            allowed = await rl.take("ip", 5, 60, now=72.5)
+            return blocked, allowed
+
+        blocked, allowed = asyncio.run(run())
+        assert blocked[0] == 0 and abs(blocked[1] - 2.0) < 1e-6
+        assert allowed == (1, 0.0)
+
+    def test_store_errors_fall_back_to_in_process_limits(self):
+        rl = MongoRateLimiter(_BrokenCollection())
+
+        async def run():
+            return [await rl.acquire("ip", 3, 60) for _ in range(4)]
+
+        waits = asyncio.run(run())
+        assert waits[:3] == [0.0, 0.0, 0.0]
+        assert waits[3] > 0
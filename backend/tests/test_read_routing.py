@@ -0,0 +1,48 @@
+"""
+Read/write routing: public feeds read through `feed_db` (secondaryPreferred),
+everything else through the primary `db`.
+
+Covered:
+  - feed_db prefers secondaries within the staleness bound; db stays primary
+  - each public feed endpoint reads through feed_db; admin views don't
+"""
+import server
+from pymongo.read_preferences import Primary, SecondaryPreferred
+
+
+class _RecordingDb:
+    """Stands in for feed_db: records which collections are read, then
+    delegates to the primary database so the handlers still work."""
+
+    def __init__(self, target):
+        self.target = target
+        self.collections = set()
+
+    def __getattr__(self, name):
+        self.collections.add(name)
+        return getattr(self.target, name)
+
+
+def test_read_preferences():
+    preference = server._feed_read_preference
+    assert isinstance(preference, SecondaryPreferred)
+    assert preference.max_staleness == server.MONGO_FEED_MAX_STALENESS_SECONDS
+    assert server._mongo_options["maxPoolSize"] == server.MONGO_MAX_POOL_SIZE
+    assert isinstance(server.client[server.db.name].read_preference, Primary)
+
+
+def test_public_feeds_use_feed_db(client, auth_headers, monkeypatch):
+    recorder = _RecordingDb(server.db)
+    monkeypatch.setattr(server, "feed_db", recorder)
+
+    client.get("/api/admin/incidents", headers=auth_headers)
+    assert recorder.collections == set()
+
+    # Highlights are served from the content cache; make this read a miss.
+    server._content_cache.pop("street_highlights", None)
+    for path in ("/api/incidents", "/api/street-notes", "/api/street-highlights",
+                 "/api/peers", "/api/chat/messages"):
+        assert client.get(path).status_code == 200, path
+    assert recorder.collections == {
+        "incidents", "street_notes", "street_highlights", "peers", "chat_messages",
+    }
@@ -0,0 +1,111 @@
+"""
+Full-text search: the in-memory inverted index and the /api/search endpoint.
+
+Covered:
+  - ranking, conjunctive matching and prefix (autocomplete) expansion
+  - bbox and type filters
+  - expiry sweeps documents out together with their TTL
+  - write handlers and moderation keep the index in step with Mongo
+"""
+import uuid
+
+from search_index import MAX_PREFIX_EXPANSIONS, SearchIndex, tokenize
+
+
+# ── Index unit tests (no database) ────────────────────────────────────────────
+class TestSearchIndex:
+    def _index(self):
+        idx = SearchIndex()
+        idx.add("street_note", "n1", "Lost dog near Fitzroy Gardens", -37.81, 144.98, 100.0)
+        idx.add("street_note", "n2", "Free coffee at the café", -37.82, 144.96, 200.0)
+        idx.add("incident", "i1", "Dog off leash, lost owner", -37.70, 145.10, 300.0)
+        idx.add("chat_message", "c1", "has anyone seen a lost dog?", None, None, 400.0)
+        return idx
+
+    def test_tokenize_folds_case_and_accents(self):
+        assert tokenize("Free COFFEE at the Café!") == ["free", "coffee", "cafe"]
+
+    def test_all_terms_must_match(self):
+        ids = {r["id"] for r in self._index().search("lost dog", prefix=False)}
+        assert ids == {"n1", "i1", "c1"}
+        assert self._index().search("lost coffee", prefix=False) == []
+
+    def test_prefix_matches_partial_last_word(self):
+        idx = self._index()
+        assert {r["id"] for r in idx.search("fitz")} == {"n1"}
+        assert idx.search("fitz", prefix=False) == []
+        assert idx.suggest("co") == ["coffee"]
+
+    def test_suggest_ranks_every_completion(self):
+        idx = SearchIndex()
+        # More completions than a search may expand to, alphabetically ahead
+        # of the one that is actually common.
+        for n in range(MAX_PREFIX_EXPANSIONS + 10):
+            idx.add("street_note", f"rare{n}", f"pa{n:03d}", created_at=float(n))
+        for n in range(3):
+            idx.add("street_note", f"park{n}", "parking here", created_at=float(n))
+        assert idx.suggest("p", limit=3) == ["parking", "pa000", "pa001"]
+        assert "parking" not in idx._prefix_terms("p")
+
+    def test_type_and_bbox_filters(self):
+        idx = self._index()
+        only_notes = idx.search("dog", kinds={"street_note"})
+        assert [r["id"] for r in only_notes] == ["n1"]
+        # CBD viewport excludes the incident further out; chat has no location.
+        cbd = idx.search("dog", bbox=(-37.85, 144.90, -37.78, 145.00))
+        assert [r["id"] for r in cbd] == ["n1"]
+
+    def test_expired_documents_are_skipped_and_swept(self):
+        idx = SearchIndex()
+        idx.add("street_note", "old", "umbrella to share", 0, 0, 0.0, expires_at=50.0)
+        idx.add("street_note", "forever", "umbrella stand", 0, 0, 0.0, expires_at=None)
+        assert {r["id"] for r in idx.search("umbrella", now=60.0)} == {"forever"}
+        assert idx.expire(now=60.0) == 1
+        assert ("street_note", "old") not in idx
+        assert idx.suggest("umb") == ["umbrella"]
+
+    def test_remove_and_reindex(self):
+        idx = self._index()
+        idx.add("street_note", "n1", "Found the dog!", -37.81, 144.98, 100.0)
+        assert {r["id"] for r in idx.search("fitzroy")} == set()
+        assert idx.remove("street_note", "n1")
+        assert not idx.remove("street_note", "n1")
+        assert {r["id"] for r in idx.search("found")} == set()
+
+
+# ── API ───────────────────────────────────────────────────────────────────────
+class TestSearchEndpoint:
+    def _note(self, client, text):
+        res = client.post(
+            "/api/street-notes",
+            json={"text": text, "latitude": -37.81, "longitude": 144.96},
+        )
+        assert res.status_code == 200, res.text
+        return res.json()["note"]["id"]
+
+    def test_new_note_is_searchable(self, client):
+        word = f"zq{uuid.uuid4().hex[:8]}"
+        note_id = self._note(client, f"lost kitten {word}")
+        res = client.get("/api/search", params={"q": word})
+        assert res.status_code == 200
+        assert [r["id"] for r in res.json()["results"]] == [note_id]
+
+    def test_hidden_content_is_not_searchable(self, client, auth_headers):
+        word = f"zq{uuid.uuid4().hex[:8]}"
+        note_id = self._note(client, f"spam {word}")
+        client.post(
+            "/api/reports",
+            json={"target_type": "street_note", "target_id": note_id, "reason": "spam"},
+        )
+        queue = client.get("/api/admin/reports", headers=auth_headers).json()
+        report = next(r for r in queue["reports"] if r["target_id"] == note_id)
+        client.post(
+            f"/api/admin/reports/{report['id']}/action",
+            headers=auth_headers,
+            json={"action": "hide"},
+        )
+        assert client.get("/api/search", params={"q": word}).json()["results"] == []
+
+    def test_unknown_type_rejected(self, client):
+        res = client.get("/api/search", params={"q": "dog", "types": "users"})
+        assert res.status_code == 422
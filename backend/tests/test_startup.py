@@ -0,0 +1,42 @@
+"""
+Cold start: lazy imports, the startup timing report, and time-to-first-200.
+
+Covered:
+  - importing server.py does not import aiohttp or jwt
+  - every startup hook appears in the startup report
+  - import + startup + the first GET /api/ stay within STARTUP_BUDGET_MS
+"""
+import os
+import subprocess
+import sys
+import time
+
+import server
+from conftest import BACKEND_DIR
+
+# Generous next to the ~1-2 s a healthy cold start takes, so it only trips on
+# a real regression (e.g. a blocking startup hook or a heavy eager import).
+STARTUP_BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", "8000"))
+
+
+def test_heavy_imports_are_lazy():
+    out = subprocess.run(
+        [sys.executable, "-c", "import sys, server; print('aiohttp' in sys.modules, 'jwt' in sys.modules)"],
+        cwd=BACKEND_DIR, env=os.environ.copy(), capture_output=True, text=True, timeout=60,
+    )
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.split() == ["False", "False"]
+
+
+def test_startup_report_and_time_to_first_200(client):
+    report = server.STARTUP_REPORT
+    assert {
+        "run_content_migrations", "start_migrations", "ensure_indexes",
+        "build_search_index", "load_gazetteer", "start_http_client",
+    } <= set(report["hooks_ms"])
+    assert report["imports_ms"] > 0 and report["module_ms"] > 0
+
+    start = time.perf_counter()
+    assert client.get("/api/").status_code == 200
+    first_request_ms = (time.perf_counter() - start) * 1000
+    assert report["total_ms"] + first_request_ms < STARTUP_BUDGET_MS, report
@@ -0,0 +1,156 @@
+"""
+The in-memory storage backend (storage.py) against MongoDB's semantics.
+
+Covered:
+  - comparisons are type-bracketed; $or / $in / $exists / array elements
+  - projections, sort / skip / limit; pymongo-style write results
+  - upserts with $setOnInsert; duplicate _id and unique indexes
+  - TTL indexes expire documents; equality indexes follow writes; conflicting
+    index options are rejected
+  - $group / $facet pipelines like the moderation queue's
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pymongo import DeleteOne, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+import storage
+from storage import MemoryClient
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def coll():
+    return MemoryClient()["storage_test"].things
+
+
+NOW = datetime.now(timezone.utc)
+
+
+class TestQueries:
+    def test_type_bracketed_comparisons(self, coll):
+        _run(coll.insert_many([
+            {"n": 1, "when": NOW},
+            {"n": 2, "when": NOW.isoformat()},  # legacy string date
+            {"n": 3},
+        ]))
+        cutoff = NOW + timedelta(seconds=1)
+        found = _run(coll.find({"when": {"$lt": cutoff}}, {"_id": 0, "n": 1}).to_list(None))
+        assert found == [{"n": 1}]
+        found = _run(coll.find({"when": {"$type": "string"}}).to_list(None))
+        assert [d["n"] for d in found] == [2]
+        assert _run(coll.count_documents({"when": {"$exists": False}})) == 1
+        assert _run(coll.count_documents({"when": None})) == 1
+
+    def test_or_in_ne_and_arrays(self, coll):
+        _run(coll.insert_many([
+            {"n": 1, "tags": ["a", "b"], "hidden": True},
+            {"n": 2, "tags": ["c"]},
+            {"n": 3, "tags": []},
+        ]))
+        assert _run(coll.count_documents({"tags": "b"})) == 1
+        assert _run(coll.count_documents({"tags": {"$in": ["a", "c"]}})) == 2
+        assert _run(coll.count_documents({"hidden": {"$ne": True}})) == 2
+        assert _run(coll.count_documents({"$or": [{"n": 1}, {"n": {"$gte": 3}}]})) == 2
+        assert _run(coll.distinct("tags")) == ["a", "b", "c"]
+
+    def test_projection_sort_skip_limit(self, coll):
+        _run(coll.insert_many([{"n": n, "secret": "x"} for n in (3, 1, 2, 5, 4)]))
+        docs = _run(coll.find({}, {"_id": 0, "secret": 0}).sort("n", -1).skip(1).limit(3).to_list(None))
+        assert docs == [{"n": 4}, {"n": 3}, {"n": 2}]
+        docs[0]["n"] = 99  # results are copies
+        assert _run(coll.count_documents({"n": 99})) == 0
+        with pytest.raises(OperationFailure):
+            _run(coll.find({}, {"n": 1, "secret": 0}).to_list(None))
+
+
+class TestWrites:
+    def test_insert_sets_id_and_update_results(self, coll):
+        doc = {"n": 1}
+        _run(coll.insert_one(doc))
+        assert "_id" in doc  # like pymongo
+        with pytest.raises(DuplicateKeyError):
+            _run(coll.insert_one(doc))
+        result = _run(coll.update_one({"n": 1}, {"$set": {"n": 1}}))
+        assert (result.matched_count, result.modified_count) == (1, 0)
+        result = _run(coll.update_one({"n": 1}, {"$inc": {"likes": 2}, "$unset": {"x": ""}}))
+        assert result.modified_count == 1
+        assert _run(coll.find_one({"n": 1}))["likes"] == 2
+
+    def test_upsert_and_find_one_and_update(self, coll):
+        for _ in range(2):
+            doc = _run(coll.find_one_and_update(
+                {"_id": "bucket"},
+                {"$inc": {"n": 1}, "$setOnInsert": {"created": NOW}},
+                upsert=True, return_document=ReturnDocument.AFTER, projection={"n": 1},
+            ))
+        assert doc == {"_id": "bucket", "n": 2}
+        # A filter that doesn't match an existing _id makes the upsert collide.
+        with pytest.raises(DuplicateKeyError):
+            _run(coll.find_one_and_update({"_id": "bucket", "n": 0}, {"$set": {"x": 1}}, upsert=True))
+
+    def test_bulk_write_and_unique_index(self, coll):
+        _run(coll.create_indexes([IndexModel("key", unique=True)]))
+        _run(coll.insert_many([{"key": k} for k in ("a", "b", "c")]))
+        with pytest.raises(DuplicateKeyError):
+            _run(coll.insert_one({"key": "a"}))
+        result = _run(coll.bulk_write([
+            UpdateOne({"key": "a"}, {"$set": {"v": 1}}),
+            DeleteOne({"key": "b"}),
+            UpdateOne({"key": "z"}, {"$set": {"v": 2}}, upsert=True),
+        ]))
+        assert (result.modified_count, result.deleted_count, result.upserted_count) == (1, 1, 1)
+        assert sorted(_run(coll.distinct("key"))) == ["a", "c", "z"]
+
+
+class TestIndexes:
+    def test_ttl_index_expires_documents(self, coll, monkeypatch):
+        monkeypatch.setattr(storage, "TTL_SWEEP_SECONDS", 0)
+        _run(coll.create_indexes([IndexModel("expires_at", expireAfterSeconds=0)]))
+        _run(coll.insert_many([
+            {"n": 1, "expires_at": NOW - timedelta(seconds=1)},
+            {"n": 2, "expires_at": NOW + timedelta(hours=1)},
+            {"n": 3, "expires_at": None},  # TTL ignores non-dates
+        ]))
+        assert sorted(d["n"] for d in _run(coll.find({}).to_list(None))) == [2, 3]
+
+    def test_equality_index_follows_updates(self, coll):
+        _run(coll.create_indexes([IndexModel("id")]))
+        _run(coll.insert_many([{"id": "a", "v": 1}, {"id": "b", "v": 2}]))
+        _run(coll.update_one({"id": "a"}, {"$set": {"id": "c"}}))
+        _run(coll.delete_one({"id": "b"}))
+        assert _run(coll.find_one({"id": "a"})) is None
+        assert _run(coll.find_one({"id": "c"}))["v"] == 1
+        assert _run(coll.count_documents({"id": "c", "v": 2})) == 0
+        assert _run(coll.count_documents({"id": {"$in": ["a", "c"]}})) == 1
+        assert _run(coll.count_documents({})) == 1
+
+    def test_conflicting_index_options_rejected(self, coll):
+        _run(coll.create_indexes([IndexModel("ts", expireAfterSeconds=60)]))
+        with pytest.raises(OperationFailure) as exc:
+            _run(coll.create_indexes([IndexModel("ts", expireAfterSeconds=30)]))
+        assert exc.value.code == 85
+
+
+def test_group_and_facet(coll):
+    _run(coll.insert_many([
+        {"target": "t1", "reason": "spam", "at": 1},
+        {"target": "t1", "reason": "spam", "at": 3},
+        {"target": "t1", "reason": "abuse", "at": 2},
+        {"target": "t2", "reason": "spam", "at": 4},
+    ]))
+    pipeline = [
+        {"$sort": {"at": -1}},
+        {"$group": {"_id": {"t": "$target", "r": "$reason"}, "latest": {"$first": "$$ROOT"}, "n": {"$sum": 1}}},
+        {"$sort": {"latest.at": -1}},
+        {"$group": {"_id": "$_id.t", "count": {"$sum": "$n"}, "reasons": {"$push": {"k": "$_id.r", "v": "$n"}}}},
+        {"$facet": {"rows": [{"$skip": 0}, {"$limit": 1}], "total": [{"$count": "n"}]}},
+    ]
+    facet = _run(coll.aggregate(pipeline).to_list(1))[0]
+    assert facet["total"] == [{"n": 2}]
+    assert facet["rows"] == [{"_id": "t2", "count": 1, "reasons": [{"k": "spam", "v": 1}]}]
@@ -1747,8 +1747,18 @@ async function reverseGeocode(lat, lng) {
     return description;
   } catch (e) {
     console.error('Reverse geocoding error:', e);
-    // Fallback to coordinates
-    const fallback = `Location: ${lat.toFixed(4)}, ${lng.toFixed(4)}`;
+    // Fallback: our own offline gazetteer (nearest landmark / street), then
+    // plain coordinates.
+    let fallback = `Location: ${lat.toFixed(4)}, ${lng.toFixed(4)}`;
+    try {
+      const res = await fetch(`${API_BASE}/reverse-geocode?lat=${lat}&lng=${lng}`);
+      const local = res.ok ? await res.json() : null;
+      if (local && local.success && local.location_text) {
+        fallback = `Near ${local.location_text},`;
+      }
+    } catch (_) {
+      // keep the coordinates
+    }
     locationDescriptionCache.set(cacheKey, fallback);
     return fallback;
   }
@@ -2218,6 +2228,8 @@ function buildModerationCard(report) {
   left.style.cssText = "font-weight:600;font-size:0.85rem;";
   const reasonLabel = REPORT_REASON_LABELS[report.reason] || report.reason;
   left.textContent = `${REPORT_TYPE_LABELS[report.target_type] || report.target_type} · ${reasonLabel}`;
+  // The queue collapses every open report on the same item into one card.
+  if (report.report_count > 1) left.textContent += ` · ${report.report_count} reports`;
   const when = document.createElement("div");
   when.style.cssText = "font-size:0.72rem;color:var(--ui-muted,#888);";
   when.textContent = humanTimeAgo(report.created_at);
@@ -3544,11 +3556,61 @@ async function fetchStreetNotes() {
   }
 }
 
+// Official amenity datasets ship as compact columnar builds under content-
+// hashed names (scripts/dataset_artifacts.py). The small manifest is
+// revalidated (and network-first in sw.js); the build files themselves never
+// change, so the HTTP cache keeps them for good. Falls back to the readable JSON if the manifest or build is
+// missing.
+let datasetManifestPromise = null;
+
+function fetchDatasetManifest() {
+  if (!datasetManifestPromise) {
+    datasetManifestPromise = fetch("/data/datasets.json", { cache: "no-cache" })
+      .then((response) => (response.ok ? response.json() : {}))
+      .catch(() => ({}));
+  }
+  return datasetManifestPromise;
+}
+
+// Inverse of compact() in scripts/dataset_artifacts.py.
+function expandDataset(payload) {
+  const { columns, constants, idPrefix } = payload;
+  const flags = payload.flags || [];
+  const fields = Object.keys(columns).filter((field) => field !== "flags");
+  const rows = new Array(payload.count);
+  for (let i = 0; i < payload.count; i++) {
+    const row = {};
+    for (const field of fields) {
+      const value = columns[field][i];
+      row[field] = field === "id" && idPrefix != null ? `${idPrefix}${value}` : value;
+    }
+    Object.assign(row, constants);
+    flags.forEach((field, bit) => {
+      row[field] = ((columns.flags[i] >> bit) & 1) === 1;
+    });
+    rows[i] = row;
+  }
+  return rows;
+}
+
+async function loadDataset(name) {
+  const entry = (await fetchDatasetManifest())[name];
+  if (entry && entry.file) {
+    try {
+      const response = await fetch(entry.file);
+      if (response.ok) return expandDataset(await response.json());
+    } catch (error) {
+      console.warn(`Compact ${name} unavailable, using readable JSON:`, error);
+    }
+  }
+  const response = await fetch(`/data/${name}.json`);
+  if (!response.ok) throw new Error(`HTTP ${response.status}`);
+  return response.json();
+}
+
 async function loadCityDrinkingFountains() {
   try {
-    const response = await fetch("/data/melbourne-drinking-fountains.json");
-    if (!response.ok) throw new Error(`HTTP ${response.status}`);
-    cityDrinkingFountains = await response.json();
+    cityDrinkingFountains = await loadDataset("melbourne-drinking-fountains");
     renderCityDrinkingFountains();
     renderList();
   } catch (error) {
@@ -3581,9 +3643,7 @@ function renderCityDrinkingFountains() {
 
 async function loadCityPublicToilets() {
   try {
-    const response = await fetch("/data/melbourne-public-toilets.json");
-    if (!response.ok) throw new Error(`HTTP ${response.status}`);
-    cityPublicToilets = await response.json();
+    cityPublicToilets = await loadDataset("melbourne-public-toilets");
     renderCityPublicToilets();
     renderList();
   } catch (error) {
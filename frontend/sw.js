@@ -1,4 +1,4 @@
-const CACHE_NAME = 'community-map-v41';
+const CACHE_NAME = 'community-map-v43';
 const PRECACHE_URLS = [
   '/',
   '/index.html',
@@ -36,6 +36,18 @@ self.addEventListener('activate', (event) => {
   self.clients.claim();
 });
 
+// Fetch from the network and refresh the cached copy; offline, resolve to the
+// cached copy (undefined if there is none).
+function networkFirst(request) {
+  return fetch(request)
+    .then((response) => {
+      const clone = response.clone();
+      caches.open(CACHE_NAME).then((cache) => cache.put(request, clone)).catch(() => {});
+      return response;
+    })
+    .catch(() => caches.match(request));
+}
+
 self.addEventListener('fetch', (event) => {
   const { request } = event;
 
@@ -63,20 +75,26 @@ self.addEventListener('fetch', (event) => {
   // Never cache backend API calls.
   if (url.pathname.includes('/api/')) return;
 
+  // Content-hashed dataset builds never change, so the HTTP cache keeps them
+  // (immutable in _headers). Caching them here too would keep every old build
+  // in Cache Storage, since nothing ever evicts a stale hash.
+  if (url.pathname.startsWith('/data/build/')) return;
+
   // Navigation requests: network-first, fall back to cached shell when offline.
   if (request.mode === 'navigate') {
     event.respondWith(
-      fetch(request)
-        .then((response) => {
-          const clone = response.clone();
-          caches.open(CACHE_NAME).then((cache) => cache.put(request, clone)).catch(() => {});
-          return response;
-        })
-        .catch(() => caches.match(request).then((c) => c || caches.match('/index.html')))
+      networkFirst(request).then((c) => c || caches.match('/index.html'))
     );
     return;
   }
 
+  // The dataset manifest names the current build, so it is network-first as
+  // well: served cache-first it would point the app at the previous build.
+  if (url.pathname === '/data/datasets.json') {
+    event.respondWith(networkFirst(request));
+    return;
+  }
+
   // Same-origin static assets: cache-first, with a background refresh.
   event.respondWith(
     caches.match(request).then((cached) => {
@@ -1,8 +1,11 @@
 """Build frontend/data/melbourne-drinking-fountains.json from City of Melbourne open data."""
+import argparse
 import json
 import urllib.request
 from pathlib import Path
 
+import dataset_artifacts
+
 ROOT = Path(__file__).resolve().parent.parent
 TSV = ROOT / "frontend" / "data" / "drinking-fountains-source.tsv"
 OUT = ROOT / "frontend" / "data" / "melbourne-drinking-fountains.json"
@@ -66,10 +69,15 @@ def from_open_data() -> list[dict]:
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--allow-growth", action="store_true",
+                        help="accept a compact build that is larger per row than the last one")
+    args = parser.parse_args()
     fountains = from_tsv() if TSV.is_file() else from_open_data()
     OUT.parent.mkdir(parents=True, exist_ok=True)
     OUT.write_text(json.dumps(fountains, indent=2), encoding="utf-8")
     print(f"Wrote {len(fountains)} fountains to {OUT}")
+    dataset_artifacts.write(OUT.stem, fountains, allow_growth=args.allow_growth)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,70 @@
+"""Build backend/data/melbourne-gazetteer.idx for offline geocoding/autocomplete.
+
+Sources: the hand-compiled suburbs/streets/landmarks list in
+backend/data/melbourne-places-source.csv (approximate centre points), plus the
+public toilets and drinking fountains already published in frontend/data/.
+"""
+import csv
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from gazetteer import build_index  # noqa: E402
+
+PLACES_CSV = ROOT / "backend" / "data" / "melbourne-places-source.csv"
+TOILETS = ROOT / "frontend" / "data" / "melbourne-public-toilets.json"
+FOUNTAINS = ROOT / "frontend" / "data" / "melbourne-drinking-fountains.json"
+OUT = ROOT / "backend" / "data" / "melbourne-gazetteer.idx"
+
+# Ties in autocomplete go to the kind of place people most often mean.
+RANKS = {"suburb": 4, "landmark": 3, "street": 2, "toilet": 1, "fountain": 0}
+
+
+def load_places():
+    with PLACES_CSV.open(encoding="utf-8", newline="") as handle:
+        for row in csv.DictReader(handle):
+            name = row["name"].strip()
+            kind = row["kind"].strip()
+            context = (row.get("context") or "").strip()
+            yield {
+                "name": name,
+                "display": f"{name}, {context}" if context else name,
+                "kind": kind,
+                "lat": float(row["lat"]),
+                "lng": float(row["lng"]),
+                "aliases": [a.strip() for a in (row.get("aliases") or "").split(";") if a.strip()],
+                "rank": RANKS[kind],
+            }
+
+
+def load_amenities(path: Path, kind: str, name_field: str):
+    for item in json.loads(path.read_text(encoding="utf-8")):
+        name = (item.get(name_field) or "").strip()
+        if not name:
+            continue
+        yield {
+            "name": name,
+            "display": f"{name}, Melbourne VIC",
+            "kind": kind,
+            "lat": item["lat"],
+            "lng": item["lng"],
+            "rank": RANKS[kind],
+        }
+
+
+def main() -> None:
+    places = [
+        *load_places(),
+        *load_amenities(TOILETS, "toilet", "name"),
+        *load_amenities(FOUNTAINS, "fountain", "description"),
+    ]
+    OUT.parent.mkdir(parents=True, exist_ok=True)
+    n_places, n_keys = build_index(places, OUT)
+    print(f"Wrote {n_places} places / {n_keys} keys ({OUT.stat().st_size} bytes) to {OUT}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
 """Build frontend/data/melbourne-public-toilets.json from City of Melbourne CSV."""
+import argparse
 import csv
 import json
 from pathlib import Path
 
+import dataset_artifacts
+
 ROOT = Path(__file__).resolve().parent.parent
 CSV = ROOT / "frontend" / "data" / "public-toilets-source.csv"
 OUT = ROOT / "frontend" / "data" / "melbourne-public-toilets.json"
@@ -13,6 +16,10 @@ def is_yes(value: str) -> bool:
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--allow-growth", action="store_true",
+                        help="accept a compact build that is larger per row than the last one")
+    args = parser.parse_args()
     toilets = []
     with CSV.open(encoding="utf-8", newline="") as handle:
         for i, row in enumerate(csv.DictReader(handle), 1):
@@ -38,6 +45,7 @@ def main() -> None:
     OUT.parent.mkdir(parents=True, exist_ok=True)
     OUT.write_text(json.dumps(toilets, indent=2), encoding="utf-8")
     print(f"Wrote {len(toilets)} toilets to {OUT}")
+    dataset_artifacts.write(OUT.stem, toilets, allow_growth=args.allow_growth)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,226 @@
+"""Compact, precompressed builds of the amenity datasets in frontend/data/.
+
+The readable datasets (melbourne-public-toilets.json and friends) stay as they
+are: build_gazetteer.py and people read them. Next to them the build writes
+what the browser actually fetches:
+
+  frontend/data/build/<name>.<hash>.json       minified columnar JSON
+  frontend/data/build/<name>.<hash>.json.gz    gzip -9 sibling
+  frontend/data/build/<name>.<hash>.json.br    brotli 11 sibling (needs `brotli`)
+  frontend/data/datasets.json                  name -> hashed file, sizes
+
+The columnar form sends one array per field. Values shared by every row
+(emoji, source) are sent once in "constants". An id prefix shared by every row
+is sent once, with only the numbers in the id column. Boolean facilities are
+packed into one bitmask per row, with bit i set for flags[i]. Coordinates are
+rounded to 6 decimals (about 0.1 m):
+
+    {"version": 1, "count": 74, "idPrefix": "city-toilet-",
+     "constants": {"emoji": "🚽", "source": "City of Melbourne"},
+     "flags": ["female", "male", "wheelchair", "babyChanging"],
+     "columns": {"id": [1, 2, ...], "lat": [...], "lng": [...], "flags": [7, ...]}}
+
+`expand()` inverts it and is the reference for expandDataset() in app.js.
+The hash in the file name changes with the content, so the build files are
+served as immutable and only the small manifest is revalidated.
+
+Size check: each build compares gzipped bytes per row against the manifest
+it replaces. More rows are fine; more bytes per row means the format has
+bloated. More than MAX_GROWTH fails the build unless --allow-growth is given.
+
+    python scripts/dataset_artifacts.py            # rebuild from the readable JSON
+    python scripts/dataset_artifacts.py --check    # verify; exit 1 on drift or growth
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # optional: no .br siblings
+    brotli = None
+
+ROOT = Path(__file__).resolve().parent.parent
+DATA = ROOT / "frontend" / "data"
+BUILD = DATA / "build"
+MANIFEST = DATA / "datasets.json"
+URL_PREFIX = "/data/build/"
+
+VERSION = 1
+COORD_DIGITS = 6
+MAX_GROWTH = 0.10
+
+# Dataset name -> boolean fields packed into the bitmask, in bit order.
+DATASETS = {
+    "melbourne-public-toilets": ("female", "male", "wheelchair", "babyChanging"),
+    "melbourne-drinking-fountains": (),
+}
+
+_ID = re.compile(r"^(.*?)(\d+)$")
+
+
+def compact(rows: list[dict], flags: tuple[str, ...] = ()) -> dict:
+    fields = list(dict.fromkeys(key for row in rows for key in row))
+    constants = {}
+    for field in fields:
+        values = [row.get(field) for row in rows]
+        if rows and all(field in row for row in rows) and all(v == values[0] for v in values):
+            constants[field] = values[0]
+    payload = {"version": VERSION, "count": len(rows)}
+
+    columns = {}
+    ids = [_ID.match(str(row.get("id", ""))) for row in rows]
+    if rows and all(ids) and len({m.group(1) for m in ids}) == 1 and "id" not in constants:
+        payload["idPrefix"] = ids[0].group(1)
+        columns["id"] = [int(m.group(2)) for m in ids]
+    for field in fields:
+        if field in constants or field in flags or field in columns:
+            continue
+        values = [row.get(field) for row in rows]
+        if field in ("lat", "lng"):
+            values = [round(v, COORD_DIGITS) for v in values]
+        columns[field] = values
+    packed = [field for field in flags if field not in constants]
+    if packed:
+        columns["flags"] = [
+            sum(1 << i for i, field in enumerate(packed) if row.get(field)) for row in rows
+        ]
+        payload["flags"] = packed
+    payload["constants"] = constants
+    payload["columns"] = columns
+    return payload
+
+
+def expand(payload: dict) -> list[dict]:
+    columns = payload["columns"]
+    prefix = payload.get("idPrefix")
+    rows = []
+    for i in range(payload["count"]):
+        row = {}
+        for field, values in columns.items():
+            if field == "flags":
+                continue
+            row[field] = f"{prefix}{values[i]}" if field == "id" and prefix is not None else values[i]
+        row.update(payload["constants"])
+        for bit, field in enumerate(payload.get("flags", ())):
+            row[field] = bool(columns["flags"][i] >> bit & 1)
+        rows.append(row)
+    return rows
+
+
+def render(payload: dict) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _sizes(body: bytes) -> dict:
+    sizes = {"bytes": len(body), "gzip": len(gzip.compress(body, 9, mtime=0))}
+    sizes["br"] = len(brotli.compress(body, quality=11)) if brotli is not None else None
+    return sizes
+
+
+def _load_manifest() -> dict:
+    return json.loads(MANIFEST.read_text(encoding="utf-8")) if MANIFEST.is_file() else {}
+
+
+def size_regression(name: str, entry: dict, previous: dict) -> str:
+    """A message when gzipped bytes per row grew past MAX_GROWTH, else ""."""
+    before = previous.get(name)
+    if not before or not before.get("count") or not entry["count"]:
+        return ""
+    old = before["gzip"] / before["count"]
+    new = entry["gzip"] / entry["count"]
+    if new > old * (1 + MAX_GROWTH):
+        return (f"{name}: {new:.1f} gzipped bytes/row, was {old:.1f} "
+                f"(+{new / old - 1:.0%}, limit +{MAX_GROWTH:.0%})")
+    return ""
+
+
+def build(name: str, rows: list[dict]) -> tuple[dict, bytes]:
+    """The manifest entry and minified body for `rows` (nothing is written)."""
+    body = render(compact(rows, DATASETS[name]))
+    digest = hashlib.sha256(body).hexdigest()[:10]
+    entry = {"file": f"{URL_PREFIX}{name}.{digest}.json", "count": len(rows), **_sizes(body)}
+    return entry, body
+
+
+def write(name: str, rows: list[dict], allow_growth: bool = False) -> dict:
+    """Write the hashed build files for `rows` and update the manifest."""
+    manifest = _load_manifest()
+    entry, body = build(name, rows)
+    problem = size_regression(name, entry, manifest)
+    if problem and not allow_growth:
+        sys.exit(f"size check failed: {problem}\nrerun with --allow-growth if this is intended")
+
+    BUILD.mkdir(parents=True, exist_ok=True)
+    path = BUILD / entry["file"].removeprefix(URL_PREFIX)
+    for stale in BUILD.glob(f"{name}.*"):
+        if not stale.name.startswith(path.name):
+            stale.unlink()
+    path.write_bytes(body)
+    path.with_name(path.name + ".gz").write_bytes(gzip.compress(body, 9, mtime=0))
+    if brotli is not None:
+        path.with_name(path.name + ".br").write_bytes(brotli.compress(body, quality=11))
+    else:
+        print("brotli not installed: skipped the .br sibling (pip install brotli)")
+
+    manifest[name] = entry
+    MANIFEST.write_text(json.dumps(dict(sorted(manifest.items())), indent=2) + "\n", encoding="utf-8")
+    readable = DATA / f"{name}.json"
+    if readable.is_file():
+        print(f"{name}: {readable.stat().st_size:,} B readable -> {entry['bytes']:,} B compact, "
+              f"{entry['gzip']:,} B gzip" + (f", {entry['br']:,} B br" if entry["br"] else ""))
+    return entry
+
+
+def check() -> list[str]:
+    """Problems with the committed build: stale files, missing files, size growth.
+
+    The .br sibling is only required when `brotli` is importable here.
+    """
+    manifest = _load_manifest()
+    problems = []
+    for name in DATASETS:
+        rows = json.loads((DATA / f"{name}.json").read_text(encoding="utf-8"))
+        entry, body = build(name, rows)
+        committed = manifest.get(name)
+        if committed is None:
+            problems.append(f"{name}: not in {MANIFEST.name}")
+            continue
+        if committed["file"] != entry["file"]:
+            problems.append(f"{name}: build is stale ({committed['file']}, expected {entry['file']})")
+        path = BUILD / committed["file"].removeprefix(URL_PREFIX)
+        siblings = [path, path.with_name(path.name + ".gz")]
+        if brotli is not None:
+            siblings.append(path.with_name(path.name + ".br"))
+            if committed.get("br") is None:
+                problems.append(f"{name}: no br size in {MANIFEST.name}")
+        for sibling in siblings:
+            if not sibling.is_file():
+                problems.append(f"{name}: missing {sibling.relative_to(ROOT)}")
+        problem = size_regression(name, entry, manifest)
+        if problem:
+            problems.append(problem)
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="verify the committed build only")
+    parser.add_argument("--allow-growth", action="store_true", help="accept a larger size per row")
+    args = parser.parse_args()
+    if args.check:
+        problems = check()
+        for problem in problems:
+            print(problem)
+        sys.exit(1 if problems else 0)
+    for name in DATASETS:
+        rows = json.loads((DATA / f"{name}.json").read_text(encoding="utf-8"))
+        write(name, rows, allow_growth=args.allow_growth)
+
+
+if __name__ == "__main__":
+    main()